@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals
+
+        # The serializers of the whole process are changed, so they are only measured if the timing is reported
+        if getattr(settings, "REQUEST_TIMING", False):
+            from canvas.timing import install_serializer_timing
+
+            install_serializer_timing()
@@ -0,0 +1,130 @@
+"""
+Compact binary representation of a project, used by the editor to load big fields quickly.
+
+The payload starts with the length of a JSON header as little endian uint32, followed by the header itself.
+The header contains the project name, receivers, light sources and settings like the JSON representation,
+and describes the heliostat columns, which follow as little endian typed arrays.
+The column data starts at the first multiple of 4 bytes after the header, column offsets are relative to it.
+Names and kinematic types of the heliostats are stored as indices into the string table of the header.
+"""
+
+import json
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+
+from .serializers import (
+    ReceiverSerializer,
+    LightsourceSerializer,
+    SettingsSerializer,
+)
+
+# Alignment of every column, so the client can create typed arrays directly on the buffer
+ALIGNMENT = 4
+
+
+class ColumnarRenderer(BaseRenderer):
+    """
+    Renderer for the binary project representation created by encode_project.
+    """
+
+    media_type = "application/vnd.canvas.project"
+    format = "columnar"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        # Errors are still reported as JSON
+        return json.dumps(data).encode()
+
+
+def encode_project(project):
+    """
+    Converts the project into the binary representation.
+
+    Parameters
+    ----------
+    project : Project
+        The project that gets encoded.
+
+    Returns
+    -------
+    bytes
+        The encoded project.
+    """
+
+    rows = list(
+        project.heliostats.order_by("id").values_list(
+            "id",
+            "position_x",
+            "position_y",
+            "position_z",
+            "aimpoint_x",
+            "aimpoint_y",
+            "aimpoint_z",
+            "number_of_facets",
+            "name",
+            "kinematic_type",
+        )
+    )
+    count = len(rows)
+    columns = list(zip(*rows)) if rows else [()] * 10
+
+    strings = {}
+
+    def string_indices(values):
+        return [strings.setdefault(value, len(strings)) for value in values]
+
+    arrays = {
+        "id": np.array(columns[0], dtype="<i4"),
+        "position": np.array(columns[1:4], dtype="<f4").T.reshape(-1),
+        "aimpoint": np.array(columns[4:7], dtype="<f4").T.reshape(-1),
+        "number_of_facets": np.array(columns[7], dtype="<i4"),
+        "name": np.array(string_indices(columns[8]), dtype="<i4"),
+        "kinematic_type": np.array(string_indices(columns[9]), dtype="<i4"),
+    }
+
+    # Offsets are relative to the start of the column data following the header
+    offset = 0
+    descriptions = []
+    for name, array in arrays.items():
+        descriptions.append(
+            {
+                "name": name,
+                "dtype": "int32" if array.dtype.kind == "i" else "float32",
+                "offset": offset,
+                "length": len(array),
+            }
+        )
+        offset += array.nbytes
+
+    header = {
+        "name": project.name,
+        "receivers": ReceiverSerializer(project.receivers.all(), many=True).data,
+        "lightsources": LightsourceSerializer(
+            project.lightsources.all(), many=True
+        ).data,
+        "settings": SettingsSerializer(project.settings).data,
+        "heliostats": {
+            "count": count,
+            "strings": list(strings),
+            "columns": descriptions,
+        },
+    }
+    encoded_header = json.dumps(header).encode()
+    padding = _align(4 + len(encoded_header)) - 4 - len(encoded_header)
+
+    return b"".join(
+        [
+            len(encoded_header).to_bytes(4, "little"),
+            encoded_header,
+            b"\0" * padding,
+            *(array.tobytes() for array in arrays.values()),
+        ]
+    )
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,124 @@
+"""
+File downloads supporting HTTP range requests, so clients can fetch parts of big results or resume downloads.
+
+Only single byte ranges are served as partial content, requests for multiple ranges get the whole file.
+"""
+
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    Parses the value of a Range header for a file of the given size.
+
+    Returns
+    -------
+    tuple or None
+        The first and the last requested byte, None if the whole file has to be sent, which is always the case
+        for empty files.
+
+    Raises
+    ------
+    ValueError
+        If the range lies outside of the file.
+    """
+
+    # An empty file has no byte range to describe
+    if size == 0:
+        return None
+
+    match = RANGE_PATTERN.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # A suffix range requests the last bytes of the file
+        if int(last) == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - int(last)), size - 1
+    first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        raise ValueError("Unsatisfiable range")
+    return first, last
+
+
+def _read(file, start, length, block_size=FileResponse.block_size):
+    with file:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(block_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def ranged_file_response(request, path, filename, etag, content_type=None):
+    """
+    Sends a file that doesn't change anymore, either completely or the byte range requested by the Range header.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request for the file.
+    path : str
+        The path of the file.
+    filename : str
+        The name the file is saved as by the browser.
+    etag : str
+        The quoted entity tag identifying the contents of the file.
+    content_type : str or None
+        The media type of the file, guessed from the file name if it's None.
+
+    Returns
+    -------
+    HttpResponse
+        The whole file, the requested part with status 206, 304 if the client has the file already
+        or 416 if the range lies outside of the file.
+    """
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponse(status=304)
+    else:
+        size = os.path.getsize(path)
+        header = request.headers.get("Range", "")
+        # Ranges of an older version of the file the client has are ignored
+        if request.headers.get("If-Range", etag) != etag:
+            header = ""
+
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range is None:
+            response = FileResponse(
+                open(path, "rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type=content_type,
+            )
+        else:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                _read(open(path, "rb"), first, last - first + 1),
+                status=206,
+                content_type=content_type or "application/octet-stream",
+            )
+            response["Content-Length"] = str(last - first + 1)
+            response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response["Accept-Ranges"] = "bytes"
+
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60)
+    return response
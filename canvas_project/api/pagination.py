@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class HeliostatCursorPagination(CursorPagination):
+    """
+    Paginates heliostats by their id, so every page costs the same no matter how big the field is.
+    """
+
+    ordering = "id"
+    page_size = 500
+    page_size_query_param = "page_size"
+    max_page_size = 5000
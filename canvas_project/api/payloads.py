@@ -0,0 +1,62 @@
+"""
+Cache of the rendered representations of whole projects, so loading an unchanged project again skips the serializers.
+
+Every entry is stored with the revision of the project it was rendered from and only used while the revision is
+the same. Saving or deleting an object of the project removes the entries right away, see signals.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from canvas.metrics import increment
+
+from .columnar import ColumnarRenderer
+
+# Formats of the project representation that are cached
+FORMATS = ["json", ColumnarRenderer.format]
+
+
+def _key(project_id, format):
+    return f"project-payload:{project_id}:{format}"
+
+
+def get_payload(project_id, revision, format):
+    """
+    Returns the cached representation of the project in the given format.
+
+    Parameters
+    ----------
+    project_id : int
+        The id of the project.
+    revision : int
+        The current revision of the project.
+    format : str
+        One of FORMATS.
+
+    Returns
+    -------
+    bytes or None
+        The rendered representation, None if it isn't cached for the current revision.
+    """
+    entry = caches[settings.PROJECT_CACHE].get(_key(project_id, format))
+    if entry is None or entry[0] != revision:
+        increment("canvas_cache_requests_total", cache="payloads", result="miss")
+        return None
+    increment("canvas_cache_requests_total", cache="payloads", result="hit")
+    return entry[1]
+
+
+def set_payload(project_id, revision, format, content):
+    """
+    Caches the rendered representation of a revision of the project.
+    """
+    caches[settings.PROJECT_CACHE].set(_key(project_id, format), (revision, content))
+
+
+def invalidate_payloads(project_id):
+    """
+    Removes all cached representations of the project.
+    """
+    caches[settings.PROJECT_CACHE].delete_many(
+        [_key(project_id, format) for format in FORMATS]
+    )
@@ -1,4 +1,9 @@
+import math
+
 from rest_framework import serializers
+from job_interface_mockup.models import Job
+from job_interface_mockup.tasks import TASKS
+from project_management.layout import PATTERNS
 from project_management.models import (
     Project,
     Heliostat,
@@ -6,6 +11,10 @@ from project_management.models import (
     Lightsource,
     Settings,
 )
+from project_management.raytracing import MAX_NUMBER_OF_RAYS
+
+# Largest coordinate of a point in spatial queries in meters, far beyond any real field
+MAX_COORDINATE = 1e6
 
 
 class HeliostatSerializer(serializers.ModelSerializer):
@@ -18,6 +27,161 @@ class HeliostatSerializer(serializers.ModelSerializer):
         exclude = ["project"]
 
 
+class HeliostatBulkUpdateSerializer(HeliostatSerializer):
+    """
+    Serializer for a partial heliostat update inside a bulk request, the id selects the heliostat to update.
+    """
+
+    id = serializers.IntegerField()
+
+
+class HeliostatBulkSerializer(serializers.Serializer):
+    """
+    Serializer to validate a bulk request containing heliostats to create, heliostats to update and ids of heliostats to delete.
+    """
+
+    create = HeliostatSerializer(many=True, required=False, default=list)
+    update = HeliostatBulkUpdateSerializer(many=True, required=False, default=list)
+    delete = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+
+class ExclusionZoneSerializer(serializers.Serializer):
+    """
+    Serializer for a circular zone of the field where no heliostats may be placed.
+    """
+
+    x = serializers.FloatField()
+    z = serializers.FloatField()
+    radius = serializers.FloatField(min_value=0)
+
+
+class HeliostatLayoutSerializer(serializers.Serializer):
+    """
+    Serializer to validate the parameters of a generated heliostat field layout.
+    """
+
+    # Upper bound for the number of heliostats generated at once
+    max_heliostats = 100000
+
+    pattern = serializers.ChoiceField(choices=PATTERNS)
+    tower_x = serializers.FloatField(default=0)
+    tower_z = serializers.FloatField(default=0)
+    min_radius = serializers.FloatField(default=50, min_value=0)
+    max_radius = serializers.FloatField(default=300, min_value=0)
+    spacing = serializers.FloatField(default=10, min_value=1)
+    spiral_exponent = serializers.FloatField(default=0.65, min_value=0.5, max_value=1)
+    exclusion_zones = ExclusionZoneSerializer(many=True, default=list)
+    aimpoint_x = serializers.FloatField(required=False)
+    aimpoint_y = serializers.FloatField(default=50)
+    aimpoint_z = serializers.FloatField(required=False)
+    number_of_facets = serializers.IntegerField(default=4, min_value=1)
+    kinematic_type = serializers.CharField(default="ideal", max_length=300)
+    replace = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data["max_radius"] <= data["min_radius"]:
+            raise serializers.ValidationError(
+                {"max_radius": ["Has to be bigger than the minimal radius."]}
+            )
+        # Estimate the size of the field before computing it, the inner part is computed as well
+        area = math.pi * data["max_radius"] ** 2
+        if area / data["spacing"] ** 2 > self.max_heliostats:
+            raise serializers.ValidationError(
+                f"The layout would contain more than {self.max_heliostats} heliostats."
+            )
+        return data
+
+
+class LayoutValidationSerializer(serializers.Serializer):
+    """
+    Serializer to validate the parameters of a check of the whole heliostat field, the terrain bounds are optional.
+    """
+
+    tower_radius = serializers.FloatField(default=10, min_value=0)
+    margin = serializers.FloatField(default=0, min_value=0)
+    min_x = serializers.FloatField(required=False)
+    min_y = serializers.FloatField(required=False)
+    min_z = serializers.FloatField(required=False)
+    max_x = serializers.FloatField(required=False)
+    max_y = serializers.FloatField(required=False)
+    max_z = serializers.FloatField(required=False)
+
+
+class RaytracingSerializer(serializers.Serializer):
+    """
+    Serializer to validate the parameters of a ray tracing job, by default the first receiver and light source are used.
+    """
+
+    sun_azimuth = serializers.FloatField(default=180, min_value=0, max_value=360)
+    sun_elevation = serializers.FloatField(default=45, min_value=0.1, max_value=90)
+    dni = serializers.FloatField(default=1000, min_value=0)
+    receiver = serializers.CharField(required=False, max_length=200)
+    number_of_rays = serializers.IntegerField(
+        required=False, min_value=1, max_value=MAX_NUMBER_OF_RAYS
+    )
+    seed = serializers.IntegerField(default=0, min_value=0)
+
+
+class SpatialBoxSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of an axis aligned box, bounds that are left out are unbounded.
+    """
+
+    min_x = serializers.FloatField(default=-math.inf)
+    min_y = serializers.FloatField(default=-math.inf)
+    min_z = serializers.FloatField(default=-math.inf)
+    max_x = serializers.FloatField(default=math.inf)
+    max_y = serializers.FloatField(default=math.inf)
+    max_z = serializers.FloatField(default=math.inf)
+
+
+class SpatialNearestSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of a nearest neighbour search around a point.
+    """
+
+    x = serializers.FloatField(min_value=-MAX_COORDINATE, max_value=MAX_COORDINATE)
+    y = serializers.FloatField(
+        default=0, min_value=-MAX_COORDINATE, max_value=MAX_COORDINATE
+    )
+    z = serializers.FloatField(min_value=-MAX_COORDINATE, max_value=MAX_COORDINATE)
+    k = serializers.IntegerField(default=1, min_value=1, max_value=1000)
+
+
+class SpatialPairsSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of a search for heliostats closer to each other than a distance.
+    """
+
+    # Bigger distances would compare almost every pair of heliostats of a field
+    distance = serializers.FloatField(min_value=0, max_value=100)
+    # Stacked heliostats form a pair with each other, so the number of pairs is bounded separately
+    limit = serializers.IntegerField(default=1000, min_value=1, max_value=10000)
+
+
+class FluxWindowSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of a window of a flux density map in pixels, bounds that are left out are the edges of the map.
+    """
+
+    e_min = serializers.IntegerField(default=0, min_value=0)
+    e_max = serializers.IntegerField(required=False, min_value=1)
+    u_min = serializers.IntegerField(default=0, min_value=0)
+    u_max = serializers.IntegerField(required=False, min_value=1)
+    factor = serializers.IntegerField(default=1, min_value=1, max_value=4096)
+
+
+class FluxTileSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of an image tile of a flux density map.
+    """
+
+    # The flux density shown with the brightest color, by default the maximum of the map
+    maximum = serializers.FloatField(required=False, min_value=0)
+
+
 class ReceiverSerializer(serializers.ModelSerializer):
     """
     Serializer to convert a receiver into JSON or to convert JSON into a receiver.
@@ -77,3 +241,51 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
             "lightsources",
             "settings",
         ]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Serializer to convert a job into JSON, only the project, the job type and the parameters can be set when submitting it.
+    """
+
+    # Parameters of each job type are validated by these serializers
+    parameter_serializers = {
+        "validation": LayoutValidationSerializer,
+        "raytracing": RaytracingSerializer,
+    }
+
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.none())
+    job_type = serializers.ChoiceField(choices=[])
+    parameters = serializers.DictField(required=False, default=dict)
+
+    class Meta:
+        model = Job
+        exclude = ["owner", "snapshot", "worker", "heartbeat", "preview", "input_hash"]
+        read_only_fields = [
+            "project_name",
+            "project_revision",
+            "status",
+            "progress",
+            "message",
+            "result",
+            "created",
+            "started",
+            "finished",
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Jobs can only be submitted for projects of the user and for registered tasks
+        request = self.context.get("request")
+        if request is not None:
+            self.fields["project"].queryset = Project.objects.filter(owner=request.user)
+        self.fields["job_type"].choices = sorted(TASKS)
+
+    def validate(self, data):
+        parameter_serializer = self.parameter_serializers.get(data["job_type"])
+        if parameter_serializer is not None:
+            parameters = parameter_serializer(data=data["parameters"])
+            if not parameters.is_valid():
+                raise serializers.ValidationError({"parameters": parameters.errors})
+            data["parameters"] = parameters.validated_data
+        return data
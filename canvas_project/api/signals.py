@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from project_management.models import (
+    Project,
+    Heliostat,
+    Receiver,
+    Lightsource,
+    Settings,
+)
+from .payloads import invalidate_payloads
+
+
+# Fields of the project itself that are part of its cached representations
+PAYLOAD_FIELDS = {"name"}
+
+
+@receiver(post_save, sender=Project)
+def invalidate_saved_project(sender, instance, update_fields=None, **kwargs):
+    """
+    Removes the cached representations of a changed project.
+
+    Saves of other fields, e.g. the time the project was last opened in the editor, keep them.
+    """
+    if update_fields is None or PAYLOAD_FIELDS & set(update_fields):
+        invalidate_payloads(instance.pk)
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_project(sender, instance, **kwargs):
+    """
+    Removes the cached representations of a deleted project.
+    """
+    invalidate_payloads(instance.pk)
+
+
+# Heliostats have no post_delete receiver, as any receiver stops Django from deleting the heliostats of a project
+# with a single query. All views deleting heliostats increase the revision, which outdates the cached representations.
+@receiver(post_save, sender=Heliostat)
+@receiver(post_save, sender=Receiver)
+@receiver(post_delete, sender=Receiver)
+@receiver(post_save, sender=Lightsource)
+@receiver(post_delete, sender=Lightsource)
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def invalidate_project_object(sender, instance, **kwargs):
+    """
+    Removes the cached representations of the project a changed or deleted object belongs to.
+    """
+    invalidate_payloads(instance.project_id)
@@ -1,3 +1,799 @@
-from django.test import TestCase
+import json
+import os
+import pstats
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from rest_framework.serializers import BaseSerializer
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from canvas import metrics, timing
+from canvas.profiling import StackSampler
+from canvas.queries import count_queries
+from job_interface_mockup.models import Job
+from .downloads import parse_range
+from project_management.models import Heliostat, Project
+
+
+class HeliostatBulkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.heliostats = Heliostat.objects.bulk_create(
+            Heliostat(project=self.project, name=f"Heliostat {index}")
+            for index in range(3)
+        )
+        self.url = f"/api/projects/{self.project.pk}/heliostats/bulk/"
+
+    def test_create_update_and_delete(self):
+        first, second, third = self.heliostats
+        response = self.client.post(
+            self.url,
+            {
+                "create": [{"name": "new", "position_x": 5}],
+                "update": [
+                    {"id": first.pk, "position_x": 1},
+                    {"id": first.pk, "name": "renamed"},
+                ],
+                "delete": [third.pk],
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 1)
+        self.assertEqual(response.json()["deleted"], 1)
+        created = Heliostat.objects.get(pk=response.json()["created"][0])
+        self.assertEqual((created.name, created.position_x), ("new", 5))
+        first.refresh_from_db()
+        self.assertEqual((first.name, first.position_x), ("renamed", 1))
+        self.assertFalse(Heliostat.objects.filter(pk=third.pk).exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.revision, 1)
+
+    def test_unknown_heliostats_change_nothing(self):
+        other = Project.objects.create(
+            name="other", description="", last_edited=timezone.now(), owner=self.user
+        )
+        foreign = Heliostat.objects.create(project=other)
+        response = self.client.post(
+            self.url,
+            {
+                "update": [{"id": foreign.pk, "name": "renamed"}],
+                "delete": [self.heliostats[0].pk],
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.project.heliostats.count(), 3)
+        foreign.refresh_from_db()
+        self.assertNotEqual(foreign.name, "renamed")
+
+
+class ColumnarProjectTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        Heliostat.objects.bulk_create(
+            Heliostat(
+                project=self.project,
+                name=f"Heliostat {index % 2}",
+                position_x=index,
+                position_y=0.5,
+                position_z=-index,
+                number_of_facets=index + 1,
+            )
+            for index in range(5)
+        )
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def decode(self, content):
+        length = struct.unpack_from("<I", content)[0]
+        header = json.loads(content[4 : 4 + length])
+        data = content[-(-(4 + length) // 4) * 4 :]
+        columns = {
+            column["name"]: np.frombuffer(
+                data,
+                dtype="<f4" if column["dtype"] == "float32" else "<i4",
+                count=column["length"],
+                offset=column["offset"],
+            )
+            for column in header["heliostats"]["columns"]
+        }
+        return header, columns
+
+    def test_columns_match_the_json_representation(self):
+        heliostats = self.client.get(self.url).json()["heliostats"]
+        response = self.client.get(
+            self.url, HTTP_ACCEPT="application/vnd.canvas.project"
+        )
+        self.assertEqual(response["Content-Type"], "application/vnd.canvas.project")
+        header, columns = self.decode(response.content)
+
+        self.assertEqual(header["name"], "field")
+        self.assertEqual(header["heliostats"]["count"], 5)
+        strings = header["heliostats"]["strings"]
+        self.assertEqual(
+            [strings[index] for index in columns["name"]],
+            [heliostat["name"] for heliostat in heliostats],
+        )
+        self.assertEqual(
+            list(columns["id"]), [heliostat["id"] for heliostat in heliostats]
+        )
+        self.assertEqual(
+            columns["position"].reshape(-1, 3).tolist(),
+            [
+                [heliostat[f"position_{axis}"] for axis in "xyz"]
+                for heliostat in heliostats
+            ],
+        )
+        self.assertEqual(
+            list(columns["number_of_facets"]),
+            [heliostat["number_of_facets"] for heliostat in heliostats],
+        )
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.heliostat = Heliostat.objects.create(project=self.project)
+        self.url = f"/api/projects/{self.project.pk}/heliostats/"
+
+    def test_unchanged_projects_are_not_sent_again(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_changes_create_a_new_tag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.patch(
+            f"{self.url}{self.heliostat.pk}/",
+            {"position_x": 3},
+            content_type="application/json",
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_representations_have_different_tags(self):
+        url = f"/api/projects/{self.project.pk}/"
+        json_etag = self.client.get(url)["ETag"]
+        response = self.client.get(
+            url,
+            HTTP_ACCEPT="application/vnd.canvas.project",
+            HTTP_IF_NONE_MATCH=json_etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], json_etag)
+        self.assertIn("Accept", response["Vary"])
+
+    def test_projects_of_other_users_have_no_tag(self):
+        other = User.objects.create_user("other", password="password")
+        self.client.force_login(other)
+        response = self.client.get(self.url)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.json()["results"], [])
+
+
+class HeliostatListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.heliostats = Heliostat.objects.bulk_create(
+            Heliostat(
+                project=self.project,
+                name=f"{'North' if index % 3 else 'South'} {index}",
+                position_x=index % 20,
+                position_y=index % 2,
+                position_z=index // 20,
+                kinematic_type="ideal" if index % 10 else "rigid body",
+            )
+            for index in range(400)
+        )
+        self.url = f"/api/projects/{self.project.pk}/heliostats/"
+
+    def list_all(self, **parameters):
+        ids = []
+        response = self.client.get(self.url, {"page_size": 30, **parameters})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [heliostat["id"] for heliostat in response.json()["results"]]
+            if response.json()["next"] is None:
+                return ids
+            response = self.client.get(response.json()["next"])
+
+    def expected(self, condition):
+        return [heliostat.pk for heliostat in self.heliostats if condition(heliostat)]
+
+    def test_filters(self):
+        cases = [
+            ({}, lambda heliostat: True),
+            ({"name": "South"}, lambda heliostat: heliostat.name.startswith("South")),
+            (
+                {"kinematic_type": "rigid body"},
+                lambda heliostat: heliostat.kinematic_type == "rigid body",
+            ),
+            (
+                {"min_x": 5, "max_x": 7.5, "min_y": 1, "max_z": 10},
+                lambda heliostat: 5 <= heliostat.position_x <= 7.5
+                and heliostat.position_y >= 1
+                and heliostat.position_z <= 10,
+            ),
+            (
+                {"name": "North", "kinematic_type": "ideal", "min_z": 15},
+                lambda heliostat: heliostat.name.startswith("North")
+                and heliostat.kinematic_type == "ideal"
+                and heliostat.position_z >= 15,
+            ),
+        ]
+        for parameters, condition in cases:
+            with self.subTest(parameters=parameters):
+                self.assertEqual(self.list_all(**parameters), self.expected(condition))
+
+    def test_invalid_bounds(self):
+        response = self.client.get(self.url, {"min_x": "west"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_every_page_needs_the_same_queries(self):
+        response = self.client.get(
+            self.url, {"page_size": 10, "kinematic_type": "ideal"}
+        )
+        # The session, the user, the revision for the ETag and the page
+        for _ in range(3):
+            with self.assertNumQueries(4):
+                response = self.client.get(response.json()["next"])
+
+    def plan(self, **parameters):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"page_size": 10, **parameters})
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries.captured_queries[-1]['sql']}")
+            return " ".join(row[-1] for row in cursor.fetchall())
+
+    def test_filters_use_the_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        # Heliostats of one type are read from the index in the order of the pages
+        plan = self.plan(kinematic_type="rigid body")
+        self.assertIn("USING INDEX heliostat_kinematic_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+        cases = [
+            ({"name": "South"}, "heliostat_name_id_idx"),
+            ({"min_x": 18, "max_x": 19}, "heliostat_x_id_idx"),
+            ({"min_z": 0, "max_z": 1}, "heliostat_z_id_idx"),
+        ]
+        for parameters, index in cases:
+            with self.subTest(parameters=parameters):
+                self.assertIn(f"USING INDEX {index}", self.plan(**parameters))
+
+
+class HeliostatLayoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.existing = Heliostat.objects.create(project=self.project)
+        self.url = f"/api/projects/{self.project.pk}/heliostats/layout/"
+        schedule = patch("api.views.schedule_layout_preview")
+        self.schedule = schedule.start()
+        self.addCleanup(schedule.stop)
+
+    def generate(self, **parameters):
+        return self.client.post(
+            self.url,
+            {
+                "pattern": "cornfield",
+                "tower_x": 10,
+                "min_radius": 20,
+                "max_radius": 60,
+                "spacing": 10,
+                **parameters,
+            },
+            content_type="application/json",
+        )
+
+    def test_heliostats_aim_at_the_tower(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 201)
+        created = Heliostat.objects.filter(pk__in=response.json()["created"])
+        self.assertGreater(len(created), 0)
+        self.assertEqual(
+            set(created.values_list("aimpoint_x", "aimpoint_y", "aimpoint_z")),
+            {(10, 50, 0)},
+        )
+        self.assertEqual(self.project.heliostats.count(), len(created) + 1)
+
+    def test_replace(self):
+        response = self.generate(replace=True)
+        self.assertEqual(
+            self.project.heliostats.count(), len(response.json()["created"])
+        )
+        self.assertFalse(Heliostat.objects.filter(pk=self.existing.pk).exists())
+
+    def test_too_many_heliostats(self):
+        response = self.generate(max_radius=10000, spacing=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.project.heliostats.count(), 1)
+
+    def test_plan_of_the_new_field_is_drawn(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.generate()
+        self.schedule.assert_called_once_with(self.project.pk)
+
+
+class HeliostatValidationTests(TestCase):
+    def test_overlapping_heliostats(self):
+        user = User.objects.create_user("owner", password="password")
+        self.client.force_login(user)
+        project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=user
+        )
+        first, second, _ = Heliostat.objects.bulk_create(
+            [
+                Heliostat(project=project, position_x=50),
+                Heliostat(project=project, position_x=51),
+                Heliostat(project=project, position_x=80),
+            ]
+        )
+        response = self.client.post(
+            f"/api/projects/{project.pk}/heliostats/validate/",
+            {"max_x": 100},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["valid"])
+        self.assertEqual(response.json()["spacing"], [first.pk, second.pk])
+        self.assertEqual(response.json()["bounds"], [])
+
+
+class HeliostatSpatialQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.heliostats = Heliostat.objects.bulk_create(
+            Heliostat(project=self.project, position_x=x, position_z=z)
+            for x in range(-100, 101, 20)
+            for z in range(-100, 101, 20)
+        )
+        self.url = f"/api/projects/{self.project.pk}/heliostats"
+
+    def test_box_with_omitted_bounds(self):
+        response = self.client.get(f"{self.url}/box/", {"min_x": 50})
+        self.assertEqual(response.status_code, 200)
+        expected = sorted(
+            heliostat.pk for heliostat in self.heliostats if heliostat.position_x >= 50
+        )
+        self.assertEqual(response.json()["ids"], expected)
+
+    def test_box_without_bounds(self):
+        response = self.client.get(f"{self.url}/box/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["ids"]), len(self.heliostats))
+
+    def test_nearest_far_away(self):
+        response = self.client.get(
+            f"{self.url}/nearest/", {"x": 20000, "z": 20000, "k": 1}
+        )
+        self.assertEqual(response.status_code, 200)
+        corner = next(
+            heliostat
+            for heliostat in self.heliostats
+            if heliostat.position_x == 100 and heliostat.position_z == 100
+        )
+        self.assertEqual(response.json()[0]["id"], corner.pk)
+
+    def test_pairs(self):
+        response = self.client.get(f"{self.url}/pairs/", {"distance": 20.5})
+        self.assertEqual(response.status_code, 200)
+        # Every heliostat of the 11 x 11 grid is 20 m away from its neighbours in x and z
+        self.assertEqual(len(response.json()["pairs"]), 2 * 11 * 10)
+        self.assertFalse(response.json()["truncated"])
+
+    def test_pairs_are_limited(self):
+        response = self.client.get(f"{self.url}/pairs/", {"distance": 20.5, "limit": 7})
+        self.assertEqual(len(response.json()["pairs"]), 7)
+        self.assertTrue(response.json()["truncated"])
+
+    def test_nearest_rejects_points_out_of_range(self):
+        response = self.client.get(f"{self.url}/nearest/", {"x": 1e12, "z": 0})
+        self.assertEqual(response.status_code, 400)
+
+
+# Entries of earlier test runs must not be found
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "projects": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-projects",
+        },
+    }
+)
+class ProjectPayloadCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.url = f"/api/projects/{self.project.pk}/"
+
+    def test_opening_the_editor_keeps_the_payload(self):
+        self.client.get(self.url)
+        self.client.get(f"/editor/{self.project.name}")
+        with patch("api.views.set_payload") as set_payload:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        set_payload.assert_not_called()
+
+    def test_renaming_removes_the_payload(self):
+        self.client.get(self.url)
+        self.project.name = "renamed"
+        self.project.save()
+        self.assertEqual(self.client.get(self.url).json()["name"], "renamed")
+
+
+class JobFluxTileTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(JOB_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        job = Job.objects.create(
+            owner=self.user,
+            project_name="field",
+            project_revision=1,
+            job_type="raytracing",
+            status=Job.FINISHED,
+            result="flux.npy",
+        )
+        os.makedirs(job.directory)
+        # Two levels, the second one shows the whole map in one tile
+        np.save(job.path(job.result), np.random.default_rng(0).random((300, 500)))
+        self.url = f"/api/jobs/{job.pk}/flux/tiles"
+
+    def test_tiles_inside_the_map(self):
+        for level, column, row in [(0, 0, 0), (0, 1, 1), (1, 0, 0)]:
+            response = self.client.get(f"{self.url}/{level}/{column}/{row}.png")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "image/png")
+
+    def test_tiles_outside_of_the_map(self):
+        for level, column, row in [
+            (2, 0, 0),
+            (70, 0, 0),
+            (0, 2, 0),
+            (0, 0, 2),
+            (1, 1, 0),
+        ]:
+            response = self.client.get(f"{self.url}/{level}/{column}/{row}.png")
+            self.assertEqual(response.status_code, 404)
+
+
+class RangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        for header, expected in [
+            ("", None),
+            ("bytes=2-4", (2, 4)),
+            ("bytes=2-", (2, 9)),
+            ("bytes=-3", (7, 9)),
+            ("bytes=-30", (0, 9)),
+            ("bytes=5-30", (5, 9)),
+            ("bytes=0-1,4-5", None),
+            ("items=0-1", None),
+        ]:
+            self.assertEqual(parse_range(header, 10), expected, header)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ["bytes=10-", "bytes=4-2", "bytes=-0"]:
+            with self.assertRaises(ValueError, msg=header):
+                parse_range(header, 10)
+
+    def test_empty_files_are_sent_whole(self):
+        for header in ["bytes=0-", "bytes=-5", "bytes=3-4"]:
+            self.assertIsNone(parse_range(header, 0), header)
+
+
+class JobResultDownloadTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(JOB_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.job = Job.objects.create(
+            owner=self.user,
+            project_name="field",
+            project_revision=1,
+            job_type="validation",
+            status=Job.FINISHED,
+            result="validation.json",
+        )
+        os.makedirs(self.job.directory)
+        self.write(b"0123456789")
+        self.url = f"/api/jobs/{self.job.pk}/result/"
+
+    def write(self, content):
+        Path(self.job.path(self.job.result)).write_bytes(content)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        if response.streaming:
+            return response, b"".join(response.streaming_content)
+        return response, response.content
+
+    def test_whole_file(self):
+        response, content = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b"0123456789")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+        etag = response["ETag"]
+        self.assertEqual(self.get(If_None_Match=etag)[0].status_code, 304)
+
+    def test_ranges(self):
+        for header, expected, content_range in [
+            ("bytes=2-4", b"234", "bytes 2-4/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+        ]:
+            response, content = self.get(Range=header)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(content, expected)
+            self.assertEqual(response["Content-Range"], content_range)
+
+        response, _ = self.get(Range="bytes=20-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_ranges_of_other_versions_are_ignored(self):
+        response, content = self.get(Range="bytes=2-4", If_Range='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b"0123456789")
+
+    def test_empty_file(self):
+        self.write(b"")
+        response, content = self.get(Range="bytes=-5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b"")
+        self.assertNotIn("Content-Range", response)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        Heliostat.objects.create(project=project)
+        self.url = f"/api/projects/{project.pk}/heliostats/"
+
+    def timings(self, response):
+        metrics = {}
+        for metric in response["Server-Timing"].split(", "):
+            name, duration, *description = metric.split(";")
+            metrics[name] = (float(duration.removeprefix("dur=")), *description)
+        return metrics
+
+    def test_parts_of_the_request(self):
+        metrics = self.timings(self.client.get(self.url))
+        self.assertEqual(list(metrics), ["db", "serialize", "render", "view", "total"])
+        self.assertRegex(metrics["db"][1], r'^desc="[1-9]\d* queries"$')
+        self.assertGreater(metrics["serialize"][0], 0)
+        self.assertGreaterEqual(metrics["total"][0], metrics["view"][0])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs("canvas.timing", "WARNING") as logs:
+            self.client.get(self.url)
+        entry = json.loads(logs.records[0].args[0])
+        self.assertEqual((entry["path"], entry["status"]), (self.url, 200))
+        self.assertGreater(entry["queries"], 0)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+    def test_serializers_are_patched_once(self):
+        # The api app installed the timing at startup, as it's enabled in the settings
+        measured = BaseSerializer.data.fget
+        self.assertTrue(measured.measured)
+        timing.install_serializer_timing()
+        self.assertIs(BaseSerializer.data.fget, measured)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILE_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        self.url = f"/api/projects/{project.pk}/heliostats/"
+
+    def test_staff_users_request_profiles(self):
+        self.user.is_staff = True
+        self.user.save()
+        name = self.client.get(self.url, {"profile": ""})["X-Profile"]
+
+        stats = pstats.Stats(str(self.directory / f"{name}.prof"))
+        self.assertGreater(stats.total_calls, 0)
+        collapsed = (self.directory / f"{name}.collapsed").read_text()
+        for line in collapsed.splitlines():
+            self.assertRegex(line, r"^\S.* \d+$")
+
+    def test_other_users_are_not_profiled(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_MAX_COUNT=2)
+    def test_only_the_newest_profiles_are_kept(self):
+        names = [self.client.get(self.url)["X-Profile"] for _ in range(3)]
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            sorted(
+                f"{name}{suffix}"
+                for name in names[1:]
+                for suffix in [".prof", ".collapsed"]
+            ),
+        )
+
+
+class StackSamplerTests(SimpleTestCase):
+    def test_stacks_of_the_thread(self):
+        sampler = StackSampler(threading.get_ident(), interval=0.001)
+        sampler.start()
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+        sampler.stop()
+        self.assertIn("test_stacks_of_the_thread (tests.py:", sampler.collapsed())
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(METRICS_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write_process(self, pid, started, requests):
+        snapshot = {
+            "pid": pid,
+            "started": started,
+            "counters": [
+                [
+                    "canvas_responses_total",
+                    [["status", "200"], ["view", "index"]],
+                    requests,
+                ]
+            ],
+            "histograms": [],
+            "gauges": [["canvas_background_queue_depth", [["worker", "w"]], 3]],
+        }
+        path = self.directory / f"process-{pid}-{started}.json"
+        path.write_text(json.dumps(snapshot))
+        return path
+
+    def responses(self):
+        return metrics.collect()["canvas_responses_total"][
+            (("status", "200"), ("view", "index"))
+        ]
+
+    def test_ended_processes_are_kept_in_the_totals(self):
+        ended = self.write_process(os.getpid(), "ended", 5)
+        self.assertEqual(self.responses(), 5)
+        self.assertFalse(ended.exists())
+        self.write_process(os.getpid(), "ended again", 2)
+        self.assertEqual(self.responses(), 7)
+        self.assertEqual(self.responses(), 7)
+
+    def test_gauges_of_ended_processes_are_left_out(self):
+        self.write_process(os.getpid(), "ended", 5)
+        self.assertNotIn(
+            (("worker", "w"),), metrics.collect()["canvas_background_queue_depth"]
+        )
+
+    def test_recycled_ids_do_not_overwrite_files(self):
+        ended = self.write_process(os.getpid(), "ended", 5)
+        metrics.flush()
+        self.assertEqual(ended.read_text().count('"ended"'), 1)
+        self.assertEqual(len(list(self.directory.glob("process-*.json"))), 2)
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            METRICS_ROOT=directory.name, METRICS_TOKEN="secret"
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def scrape(self, token="secret"):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        return self.client.get("/metrics", headers=headers)
+
+    def test_token_is_required(self):
+        for token in [None, "wrong", "secret2"]:
+            response = self.scrape(token)
+            self.assertEqual(response.status_code, 401, token)
+            self.assertTrue(response["WWW-Authenticate"].startswith("Bearer"))
+        # Requests forwarded by a reverse proxy on the same machine need the token as well
+        response = self.client.get("/metrics", REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(response.status_code, 401)
+
+        with override_settings(METRICS_TOKEN=None):
+            self.assertEqual(self.scrape().status_code, 404)
+
+    def test_requests_and_jobs_are_counted(self):
+        user = User.objects.create_user("owner", password="password")
+        Job.objects.create(
+            owner=user, project_name="field", project_revision=1, job_type="validation"
+        )
+        self.client.force_login(user)
+        self.client.get("/api/projects/")
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('canvas_jobs{status="queued"} 1\n', content)
+        self.assertRegex(
+            content, r'canvas_request_queries_count\{view="[^"]*ProjectList"\} [1-9]'
+        )
+
+
+class QueryCounterTests(TestCase):
+    def test_queries_of_the_block(self):
+        with count_queries() as queries:
+            User.objects.count()
+            User.objects.exists()
+        User.objects.count()
+        self.assertEqual(queries.queries, 2)
+        self.assertGreater(queries.duration, 0)
@@ -4,11 +4,24 @@ from .views import (
     ProjectDetailList,
     HeliostatList,
     HeliostatDetail,
+    HeliostatBulk,
+    HeliostatLayout,
+    HeliostatValidation,
+    HeliostatBox,
+    HeliostatNearest,
+    HeliostatPairs,
     ReceiverList,
     ReceiverDetail,
     LightsourceList,
     LightsourceDetail,
     SettingsDetail,
+    JobList,
+    JobDetail,
+    JobCancel,
+    JobResultDownload,
+    JobFlux,
+    JobFluxWindow,
+    JobFluxTile,
 )
 
 urlpatterns = [
@@ -19,6 +32,15 @@ urlpatterns = [
         "projects/<int:project_id>/heliostats/<int:pk>/",
         HeliostatDetail.as_view(),
     ),
+    path("projects/<int:project_id>/heliostats/bulk/", HeliostatBulk.as_view()),
+    path("projects/<int:project_id>/heliostats/layout/", HeliostatLayout.as_view()),
+    path(
+        "projects/<int:project_id>/heliostats/validate/",
+        HeliostatValidation.as_view(),
+    ),
+    path("projects/<int:project_id>/heliostats/box/", HeliostatBox.as_view()),
+    path("projects/<int:project_id>/heliostats/nearest/", HeliostatNearest.as_view()),
+    path("projects/<int:project_id>/heliostats/pairs/", HeliostatPairs.as_view()),
     path("projects/<int:project_id>/receivers/", ReceiverList.as_view()),
     path("projects/<int:project_id>/receivers/<int:pk>/", ReceiverDetail.as_view()),
     path("projects/<int:project_id>/lightsources/", LightsourceList.as_view()),
@@ -26,4 +48,14 @@ urlpatterns = [
         "projects/<int:project_id>/lightsources/<int:pk>/", LightsourceDetail.as_view()
     ),
     path("projects/<int:project_id>/settings/", SettingsDetail.as_view()),
+    path("jobs/", JobList.as_view()),
+    path("jobs/<int:pk>/", JobDetail.as_view()),
+    path("jobs/<int:pk>/cancel/", JobCancel.as_view()),
+    path("jobs/<int:pk>/result/", JobResultDownload.as_view()),
+    path("jobs/<int:pk>/flux/", JobFlux.as_view()),
+    path("jobs/<int:pk>/flux/window/", JobFluxWindow.as_view()),
+    path(
+        "jobs/<int:pk>/flux/tiles/<int:level>/<int:column>/<int:row>.png",
+        JobFluxTile.as_view(),
+    ),
 ]
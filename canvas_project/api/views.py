@@ -1,7 +1,21 @@
+import hashlib
+import os
+
+import numpy as np
+
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
 from rest_framework import generics
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from job_interface_mockup.jobs import cancel_job, submit_job
+from job_interface_mockup.models import Job
 from project_management.models import (
     Project,
     Heliostat,
@@ -13,10 +27,110 @@ from .serializers import (
     ProjectSerializer,
     ProjectDetailSerializer,
     HeliostatSerializer,
+    HeliostatBulkSerializer,
+    HeliostatLayoutSerializer,
+    LayoutValidationSerializer,
+    SpatialBoxSerializer,
+    SpatialNearestSerializer,
+    SpatialPairsSerializer,
     ReceiverSerializer,
     LightsourceSerializer,
     SettingsSerializer,
+    JobSerializer,
+    FluxWindowSerializer,
+    FluxTileSerializer,
+)
+from .columnar import ColumnarRenderer, encode_project
+from .downloads import ranged_file_response
+from .payloads import FORMATS as PAYLOAD_FORMATS, get_payload, set_payload
+from .pagination import HeliostatCursorPagination
+from project_management.fluxmaps import (
+    encode_png,
+    flux_statistics,
+    open_flux,
+    read_tile,
+    read_window,
 )
+from project_management.layout import generate_layout
+from project_management.previews import schedule_layout_preview
+from project_management.validation import validate_layout
+from project_management.spatial import heliostat_indexes
+
+
+class RevisionMixin:
+    """
+    Increases the revision of the affected project after every update or deletion through the view.
+    """
+
+    def get_revised_project_id(self, instance):
+        return instance.project_id
+
+    def revise(self, project_id, changed_heliostats=(), removed_heliostat_ids=()):
+        """
+        Increases the revision of the project and passes changed heliostats on to its spatial index.
+        """
+        revision = Project.bump_revision(project_id)
+        heliostat_indexes.update(
+            project_id,
+            revision,
+            changed=changed_heliostats,
+            removed=removed_heliostat_ids,
+        )
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        instance = serializer.instance
+        self.revise(
+            self.get_revised_project_id(instance),
+            changed_heliostats=[instance] if isinstance(instance, Heliostat) else [],
+        )
+
+    def perform_destroy(self, instance):
+        project_id = self.get_revised_project_id(instance)
+        removed = [instance.pk] if isinstance(instance, Heliostat) else []
+        super().perform_destroy(instance)
+        self.revise(project_id, removed_heliostat_ids=removed)
+
+
+class ConditionalMixin:
+    """
+    Adds strong ETags derived from the revision of the project to GET responses and answers matching If-None-Match headers with 304.
+    """
+
+    def get_conditional_project_id(self):
+        return self.kwargs["project_id"]
+
+    def get_etag(self, request):
+        project_id = self.get_conditional_project_id()
+        revision = (
+            Project.objects.filter(pk=project_id, owner=request.user)
+            .values_list("revision", flat=True)
+            .first()
+        )
+        if revision is None:
+            return None
+        self.revision = revision
+
+        # Different representations and query parameters of the same revision need different tags
+        key = f"{project_id}:{revision}:{request.accepted_renderer.format}:{request.get_full_path()}"
+        return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is not None and etag in parse_etags(
+            request.headers.get("If-None-Match", "")
+        ):
+            # Neither the objects nor the serializers are needed for an unchanged project
+            response = Response(status=304)
+        else:
+            response = super().get(request, *args, **kwargs)
+
+        if etag is not None and response.status_code in (200, 304):
+            response["ETag"] = etag
+            # Browsers may keep the response, but have to revalidate it every time
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Accept"])
+        return response
 
 
 class ProjectList(generics.ListCreateAPIView):
@@ -39,13 +153,18 @@ class ProjectList(generics.ListCreateAPIView):
         return Project.objects.filter(owner=self.request.user)
 
 
-class ProjectDetailList(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailList(
+    ConditionalMixin, RevisionMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     Creates a view to list a specific project, specified by the given pk in the url, where you can also delete the project.
     """
 
     serializer_class = ProjectDetailSerializer
 
+    # Besides JSON the project can be requested in the compact binary representation
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarRenderer]
+
     # Accepted authentication classes and the needed permissions to access the API
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated]
@@ -54,13 +173,54 @@ class ProjectDetailList(generics.RetrieveUpdateDestroyAPIView):
         # Select only the projects the user owns
         return Project.objects.filter(owner=self.request.user)
 
-
-class HeliostatList(generics.ListCreateAPIView):
+    def retrieve(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        # Only the plain representations are cached, not the browsable API or indented JSON
+        revision = getattr(self, "revision", None)
+        if (
+            revision is None
+            or renderer.format not in PAYLOAD_FORMATS
+            or request.accepted_media_type != renderer.media_type
+        ):
+            if renderer.format == ColumnarRenderer.format:
+                return Response(encode_project(self.get_object()))
+            return super().retrieve(request, *args, **kwargs)
+
+        project_id = self.kwargs["pk"]
+        content = get_payload(project_id, revision, renderer.format)
+        if content is None:
+            project = self.get_object()
+            if renderer.format == ColumnarRenderer.format:
+                data = encode_project(project)
+            else:
+                data = self.get_serializer(project).data
+            content = renderer.render(
+                data, request.accepted_media_type, self.get_renderer_context()
+            )
+            set_payload(project_id, revision, renderer.format, content)
+        return HttpResponse(content, content_type=renderer.media_type)
+
+    def get_revised_project_id(self, instance):
+        return instance.pk
+
+    def get_conditional_project_id(self):
+        return self.kwargs["pk"]
+
+
+class HeliostatList(ConditionalMixin, RevisionMixin, generics.ListCreateAPIView):
     """
-    Creates a view to list all heliostats and create new ones.
+    Creates a view to list the heliostats page by page and create new ones.
+    The heliostats can be filtered by a name prefix, a bounding box and the kinematic type.
+
+    Pages are ordered by id. The index of the kinematic type is ordered by id as well, so a page of one type
+    costs the same no matter how big the field is. Name prefixes and the x and z bounds of the box have indexes
+    followed by the id, so small selections only read and sort the matching heliostats, wide ones are read in the
+    order of the ids. The y bound isn't indexed, as the height hardly varies within a field, it is checked on the
+    heliostats selected by the other filters.
     """
 
     serializer_class = HeliostatSerializer
+    pagination_class = HeliostatCursorPagination
 
     # Accepted authentication classes and the needed permissions to access the API
     authentication_classes = [SessionAuthentication, BasicAuthentication]
@@ -74,15 +234,41 @@ class HeliostatList(generics.ListCreateAPIView):
             Project, id=project_id, owner=self.request.user
         )
         serializer.save(project=project)
+        self.revise(project.pk, changed_heliostats=[serializer.instance])
 
     def get_queryset(self):
         project_id = self.kwargs["project_id"]
-        return Heliostat.objects.filter(
+        queryset = Heliostat.objects.filter(
             project__id=project_id, project__owner=self.request.user
         )
-
-
-class HeliostatDetail(generics.RetrieveUpdateDestroyAPIView):
+        params = self.request.query_params
+
+        # Filter by a prefix of the name, as range so the index can be used
+        if params.get("name"):
+            prefix = params["name"]
+            queryset = queryset.filter(name__gte=prefix, name__lt=prefix + "\U0010ffff")
+
+        if params.get("kinematic_type"):
+            queryset = queryset.filter(kinematic_type=params["kinematic_type"])
+
+        # Filter by a bounding box, every bound is optional
+        for axis in ("x", "y", "z"):
+            for bound, lookup in (("min", "gte"), ("max", "lte")):
+                value = params.get(f"{bound}_{axis}")
+                if value is None:
+                    continue
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValidationError(
+                        {f"{bound}_{axis}": ["A number is required."]}
+                    )
+                queryset = queryset.filter(**{f"position_{axis}__{lookup}": value})
+
+        return queryset
+
+
+class HeliostatDetail(RevisionMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Creates a view to retrieve, edit or delete a specific heliostat, defined by the pk in the url.
     """
@@ -97,7 +283,280 @@ class HeliostatDetail(generics.RetrieveUpdateDestroyAPIView):
         return Heliostat.objects.filter(project__owner=self.request.user)
 
 
-class ReceiverList(generics.ListCreateAPIView):
+class HeliostatBulk(RevisionMixin, generics.GenericAPIView):
+    """
+    Creates a view to create, update and delete many heliostats of a project at once in a single transaction.
+    """
+
+    serializer_class = HeliostatBulkSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    # Number of rows written per statement
+    batch_size = 1000
+
+    def post(self, request, project_id):
+        project = generics.get_object_or_404(
+            Project, id=project_id, owner=self.request.user
+        )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        creates = serializer.validated_data["create"]
+        updates = serializer.validated_data["update"]
+        deletes = serializer.validated_data["delete"]
+
+        with transaction.atomic():
+            heliostats = project.heliostats.all()
+
+            # Merge multiple updates of the same heliostat, later values win
+            changes = {}
+            for update in updates:
+                changes.setdefault(update.pop("id"), {}).update(update)
+
+            existing = heliostats.in_bulk(list(changes))
+            missing = sorted(set(changes) - set(existing))
+            if missing:
+                raise ValidationError(
+                    {"update": [f"Heliostats {missing} do not exist in this project."]}
+                )
+
+            deleted = 0
+            for start in range(0, len(deletes), self.batch_size):
+                batch = deletes[start : start + self.batch_size]
+                deleted += heliostats.filter(id__in=batch).delete()[0]
+
+            fields = set()
+            for heliostat_id, attributes in changes.items():
+                for field, value in attributes.items():
+                    setattr(existing[heliostat_id], field, value)
+                fields.update(attributes)
+            if fields:
+                Heliostat.objects.bulk_update(
+                    existing.values(), sorted(fields), batch_size=self.batch_size
+                )
+
+            created = Heliostat.objects.bulk_create(
+                [Heliostat(project=project, **attributes) for attributes in creates],
+                batch_size=self.batch_size,
+            )
+            removed = set(deletes)
+            self.revise(
+                project.pk,
+                changed_heliostats=[
+                    *(
+                        heliostat
+                        for heliostat in existing.values()
+                        if heliostat.pk not in removed
+                    ),
+                    *created,
+                ],
+                removed_heliostat_ids=removed,
+            )
+            # Projects without a preview from the editor get a new plan of the field
+            transaction.on_commit(lambda: schedule_layout_preview(project.pk))
+
+        return Response(
+            {
+                "created": [heliostat.id for heliostat in created],
+                "updated": len(existing),
+                "deleted": deleted,
+            }
+        )
+
+
+class HeliostatLayout(RevisionMixin, generics.GenericAPIView):
+    """
+    Creates a view to generate a whole heliostat field around a tower with a layout pattern.
+    """
+
+    serializer_class = HeliostatLayoutSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    # Number of rows written per statement
+    batch_size = 1000
+
+    def post(self, request, project_id):
+        project = generics.get_object_or_404(
+            Project, id=project_id, owner=self.request.user
+        )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parameters = serializer.validated_data
+
+        positions = generate_layout(
+            parameters["pattern"],
+            tower=(parameters["tower_x"], parameters["tower_z"]),
+            min_radius=parameters["min_radius"],
+            max_radius=parameters["max_radius"],
+            spacing=parameters["spacing"],
+            spiral_exponent=parameters["spiral_exponent"],
+            exclusion_zones=[
+                (zone["x"], zone["z"], zone["radius"])
+                for zone in parameters["exclusion_zones"]
+            ],
+        )
+
+        # All heliostats aim at the tower unless an aimpoint is given
+        aimpoint = {
+            "aimpoint_x": parameters.get("aimpoint_x", parameters["tower_x"]),
+            "aimpoint_y": parameters["aimpoint_y"],
+            "aimpoint_z": parameters.get("aimpoint_z", parameters["tower_z"]),
+        }
+
+        with transaction.atomic():
+            removed = []
+            if parameters["replace"]:
+                removed = list(project.heliostats.values_list("id", flat=True))
+                project.heliostats.all().delete()
+            created = Heliostat.objects.bulk_create(
+                [
+                    Heliostat(
+                        project=project,
+                        position_x=x,
+                        position_y=y,
+                        position_z=z,
+                        number_of_facets=parameters["number_of_facets"],
+                        kinematic_type=parameters["kinematic_type"],
+                        **aimpoint,
+                    )
+                    for x, y, z in positions.tolist()
+                ],
+                batch_size=self.batch_size,
+            )
+            self.revise(
+                project.pk, changed_heliostats=created, removed_heliostat_ids=removed
+            )
+            # Projects without a preview from the editor get a new plan of the field
+            transaction.on_commit(lambda: schedule_layout_preview(project.pk))
+
+        return Response(
+            {"created": [heliostat.id for heliostat in created]},
+            status=201,
+        )
+
+
+class HeliostatValidation(generics.GenericAPIView):
+    """
+    Creates a view to check the whole heliostat field for overlapping mirrors, mirrors too close to a tower and heliostats outside of the terrain.
+    """
+
+    serializer_class = LayoutValidationSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, project_id):
+        project = generics.get_object_or_404(
+            Project, id=project_id, owner=self.request.user
+        )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parameters = serializer.validated_data
+
+        rows = np.array(
+            project.heliostats.values_list(
+                "id", "position_x", "position_y", "position_z", "number_of_facets"
+            ),
+            dtype=float,
+        ).reshape(-1, 5)
+        # The receivers are mounted on the towers
+        towers = project.receivers.values_list("position_x", "position_z")
+
+        violations = validate_layout(
+            rows[:, 0].astype(np.int64),
+            rows[:, 1:4],
+            rows[:, 4].astype(np.int64),
+            towers=towers,
+            tower_radius=parameters["tower_radius"],
+            margin=parameters["margin"],
+            bounds=parameters,
+        )
+        return Response(
+            {
+                "valid": not any(violations.values()),
+                **violations,
+            }
+        )
+
+
+class HeliostatSpatialQuery(generics.GenericAPIView):
+    """
+    Base view for queries answered by the spatial index of the heliostats of a project.
+    """
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, project_id):
+        project = generics.get_object_or_404(
+            Project, id=project_id, owner=self.request.user
+        )
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        grid = heliostat_indexes.get(project)
+        return Response(self.query(grid, serializer.validated_data))
+
+
+class HeliostatBox(HeliostatSpatialQuery):
+    """
+    Creates a view to get the ids of all heliostats inside an axis aligned box.
+    """
+
+    serializer_class = SpatialBoxSerializer
+
+    def query(self, grid, parameters):
+        minimum = [parameters[f"min_{axis}"] for axis in "xyz"]
+        maximum = [parameters[f"max_{axis}"] for axis in "xyz"]
+        return {"ids": grid.in_box(minimum, maximum)}
+
+
+class HeliostatNearest(HeliostatSpatialQuery):
+    """
+    Creates a view to get the k heliostats closest to a point together with their distance.
+    """
+
+    serializer_class = SpatialNearestSerializer
+
+    def query(self, grid, parameters):
+        nearest = grid.nearest(
+            parameters["x"], parameters["y"], parameters["z"], parameters["k"]
+        )
+        return [
+            {"id": heliostat_id, "distance": distance}
+            for heliostat_id, distance in nearest
+        ]
+
+
+class HeliostatPairs(HeliostatSpatialQuery):
+    """
+    Creates a view to get the pairs of heliostats closer to each other than the given distance.
+
+    At most limit pairs are returned, truncated tells if there are more.
+    """
+
+    serializer_class = SpatialPairsSerializer
+
+    def query(self, grid, parameters):
+        limit = parameters["limit"]
+        # One pair more than returned tells if there are more
+        pairs = grid.pairs_within(parameters["distance"], limit=limit + 1)
+        return {
+            "pairs": [
+                {"ids": [first, second], "distance": distance}
+                for first, second, distance in pairs[:limit]
+            ],
+            "truncated": len(pairs) > limit,
+        }
+
+
+class ReceiverList(ConditionalMixin, RevisionMixin, generics.ListCreateAPIView):
     """
     Creates a view to list all receivers or to create a new one.
     """
@@ -115,6 +574,7 @@ class ReceiverList(generics.ListCreateAPIView):
             Project, id=project_id, owner=self.request.user
         )
         serializer.save(project=project)
+        self.revise(project.pk)
 
     def get_queryset(self):
         project_id = self.kwargs["project_id"]
@@ -123,7 +583,7 @@ class ReceiverList(generics.ListCreateAPIView):
         )
 
 
-class ReceiverDetail(generics.RetrieveUpdateDestroyAPIView):
+class ReceiverDetail(RevisionMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Creates a view of a specific receiver to retrieve, edit or delete it.
     """
@@ -138,7 +598,7 @@ class ReceiverDetail(generics.RetrieveUpdateDestroyAPIView):
         return Receiver.objects.filter(project__owner=self.request.user)
 
 
-class LightsourceList(generics.ListCreateAPIView):
+class LightsourceList(ConditionalMixin, RevisionMixin, generics.ListCreateAPIView):
     """
     Creates a view to list all lightsources or to create a new one.
     """
@@ -156,6 +616,7 @@ class LightsourceList(generics.ListCreateAPIView):
             Project, id=project_id, owner=self.request.user
         )
         serializer.save(project=project)
+        self.revise(project.pk)
 
     def get_queryset(self):
         project_id = self.kwargs["project_id"]
@@ -164,7 +625,7 @@ class LightsourceList(generics.ListCreateAPIView):
         )
 
 
-class LightsourceDetail(generics.RetrieveUpdateDestroyAPIView):
+class LightsourceDetail(RevisionMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Creates a view to retrieve, update or delete a specific lightsource, defined by the given pk.
     """
@@ -179,7 +640,7 @@ class LightsourceDetail(generics.RetrieveUpdateDestroyAPIView):
         return Lightsource.objects.filter(project__owner=self.request.user)
 
 
-class SettingsDetail(generics.RetrieveUpdateAPIView):
+class SettingsDetail(RevisionMixin, generics.RetrieveUpdateAPIView):
     """
     Creates a view to list and update all settings.
     """
@@ -199,3 +660,215 @@ class SettingsDetail(generics.RetrieveUpdateAPIView):
 
     def get_queryset(self):
         return Settings.objects.filter(project__owner=self.request.user)
+
+
+class JobList(generics.ListCreateAPIView):
+    """
+    Creates a view to list the jobs of the user, optionally only those of one project, and to submit a new job.
+    """
+
+    serializer_class = JobSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Job.objects.filter(owner=self.request.user).order_by("-created")
+        project_id = self.request.query_params.get("project")
+        if project_id:
+            if not project_id.isdigit():
+                raise ValidationError({"project": ["A valid integer is required."]})
+            queryset = queryset.filter(project_id=project_id)
+        return queryset
+
+    # Overwrite the default function to create the job together with the snapshot of its project
+    def perform_create(self, serializer):
+        serializer.instance = submit_job(
+            self.request.user,
+            serializer.validated_data["project"],
+            serializer.validated_data["job_type"],
+            serializer.validated_data["parameters"],
+        )
+
+
+class JobDetail(generics.RetrieveAPIView):
+    """
+    Creates a view to retrieve the status and progress of a specific job.
+    """
+
+    serializer_class = JobSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+
+class JobCancel(generics.GenericAPIView):
+    """
+    Creates a view to cancel a queued or running job, finished jobs are left unchanged.
+    """
+
+    serializer_class = JobSerializer
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    def post(self, request, pk):
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response(
+                {"detail": f"The job is already {job.get_status_display().lower()}."},
+                status=409,
+            )
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+
+
+class JobResultView(generics.GenericAPIView):
+    """
+    Base view for reading the result file of a finished job of the user.
+    """
+
+    # Accepted authentication classes and the needed permissions to access the API
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    def get(self, request, pk, **kwargs):
+        job = self.get_object()
+        if job.status != Job.FINISHED or not job.result:
+            return Response(
+                {
+                    "detail": f"The job is {job.get_status_display().lower()} and has no result."
+                },
+                status=409,
+            )
+        path = job.path(job.result)
+        if not os.path.exists(path):
+            raise NotFound("The result of the job doesn't exist anymore.")
+        return self.read(request, job, path, **kwargs)
+
+
+class JobResultDownload(JobResultView):
+    """
+    Creates a view to download the result file of a finished job, byte ranges of it can be requested with the Range header.
+    """
+
+    def read(self, request, job, path):
+        # The result of a job never changes, the tag only has to differ between jobs
+        etag = f'"{job.input_hash or job.pk}-{job.result}"'
+        return ranged_file_response(
+            request, path, f"{job.project_name}-{job.pk}-{job.result}", etag
+        )
+
+
+class JobFluxQuery(JobResultView):
+    """
+    Base view for queries reading parts of the flux density map computed by a finished ray tracing job.
+
+    The map is memory mapped, so only the parts that are read are loaded from the disk.
+    """
+
+    def read(self, request, job, path, **kwargs):
+        if not job.result.endswith(".npy"):
+            raise NotFound("The result of the job isn't a flux density map.")
+        parameters = {}
+        if self.serializer_class is not None:
+            serializer = self.get_serializer(data=request.query_params)
+            serializer.is_valid(raise_exception=True)
+            parameters = serializer.validated_data
+        response = self.query(open_flux(path), path, parameters, **kwargs)
+        # The result of a job never changes
+        patch_cache_control(response, private=True, max_age=365 * 24 * 60 * 60)
+        return response
+
+
+class JobFlux(JobFluxQuery):
+    """
+    Creates a view to get the size, the maximum and the tile levels of the flux density map of a job.
+    """
+
+    def query(self, flux, path, parameters):
+        return Response(flux_statistics(path))
+
+
+class JobFluxWindow(JobFluxQuery):
+    """
+    Creates a view to get a window of the flux density map of a job, optionally scaled down by averaging blocks of pixels.
+    """
+
+    serializer_class = FluxWindowSerializer
+
+    # Upper bound for the number of values of a window, bigger windows have to be scaled down
+    max_values = 256 * 256
+
+    def query(self, flux, path, parameters):
+        height, width = flux.shape
+        e_min, u_min = parameters["e_min"], parameters["u_min"]
+        e_max = parameters.get("e_max", width)
+        u_max = parameters.get("u_max", height)
+        factor = parameters["factor"]
+        if not (e_min < e_max <= width and u_min < u_max <= height):
+            raise ValidationError(
+                {
+                    "detail": [
+                        f"The window has to lie inside the map of {width} x {height} pixels."
+                    ]
+                }
+            )
+        if (
+            -(-(e_max - e_min) // factor) * -(-(u_max - u_min) // factor)
+            > self.max_values
+        ):
+            raise ValidationError(
+                {
+                    "factor": [
+                        f"The window has more than {self.max_values} values, use a bigger factor."
+                    ]
+                }
+            )
+
+        window = read_window(flux, e_min, e_max, u_min, u_max, factor)
+        return Response(
+            {
+                "e_min": e_min,
+                "e_max": e_max,
+                "u_min": u_min,
+                "u_max": u_max,
+                "factor": factor,
+                "values": window.tolist(),
+            }
+        )
+
+
+class JobFluxTile(JobFluxQuery):
+    """
+    Creates a view to get a tile of the flux density map of a job as PNG image, level 0 has the full resolution.
+    """
+
+    serializer_class = FluxTileSerializer
+
+    def query(self, flux, path, parameters, level, column, row):
+        statistics = flux_statistics(path)
+        # Checked before reading, as huge levels overflow the size of the blocks
+        if level >= statistics["levels"]:
+            raise NotFound("The tile lies outside of the map.")
+        tile_size = statistics["tile_size"] * 2**level
+        if (
+            column * tile_size >= statistics["width"]
+            or row * tile_size >= statistics["height"]
+        ):
+            raise NotFound("The tile lies outside of the map.")
+        tile = read_tile(flux, level, column, row)
+        maximum = parameters.get("maximum", statistics["maximum"])
+        return HttpResponse(encode_png(tile, maximum), content_type="image/png")
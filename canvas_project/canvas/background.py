@@ -0,0 +1,73 @@
+"""
+Small tasks executed by a background thread of the web server process, off the path of the request that caused them.
+"""
+
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# All workers of the process, so their queues can be monitored
+WORKERS = []
+
+
+class BackgroundWorker:
+    """
+    Executes functions one after another in a daemon thread, the thread is started with the first scheduled function.
+
+    Every function is scheduled under a key. While a function waits to be executed, further functions with
+    the same key are ignored, so repeated requests for the same work are only executed once.
+    """
+
+    def __init__(self, name):
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the thread, shown in logs and debuggers.
+        """
+        self.name = name
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.thread = None
+        WORKERS.append(self)
+
+    def schedule(self, key, function, *args):
+        """
+        Queues the call of the function with the given arguments, unless a call with the same key is already waiting.
+        """
+        with self.lock:
+            if key in self.pending:
+                return
+            self.pending.add(key)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name=self.name, daemon=True
+                )
+                self.thread.start()
+        self.queue.put((key, function, args))
+
+    def run(self):
+        while True:
+            key, function, args = self.queue.get()
+            # Work scheduled while the function runs has to be done again
+            with self.lock:
+                self.pending.discard(key)
+            try:
+                function(*args)
+            except Exception:
+                logger.exception("%s failed for %s", self.name, key)
+            finally:
+                # The thread lives as long as the process, its database connection must not
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        """
+        Waits until all queued functions were executed.
+        """
+        self.queue.join()
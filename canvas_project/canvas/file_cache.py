@@ -0,0 +1,133 @@
+"""
+Size bounded cache of generated files on the local disk.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from .metrics import increment
+
+
+class LRUFileCache:
+    """
+    Stores files in a directory under a key and evicts the least recently used files
+    once the total size of the directory exceeds the given maximum size.
+
+    The modification time of a file is used as its last access time, so the cache
+    can be shared between processes without any additional bookkeeping.
+    """
+
+    def __init__(self, directory, max_size):
+        """
+        Parameters
+        ----------
+        directory : str or Path
+            The directory the files are stored in, it is created if it doesn't exist.
+        max_size : int
+            The maximum total size of all cached files in bytes.
+        """
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def path(self, key):
+        """
+        Returns the path the file for the given key is stored at.
+        """
+        return self.directory / key
+
+    def get(self, key):
+        """
+        Returns the path of the cached file for the given key and marks it as recently used.
+
+        Parameters
+        ----------
+        key : str
+            The key the file was stored under.
+
+        Returns
+        -------
+        Path or None
+            The path of the cached file or None if there is no file for this key.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            increment(
+                "canvas_cache_requests_total", cache=self.directory.name, result="miss"
+            )
+            return None
+        increment(
+            "canvas_cache_requests_total", cache=self.directory.name, result="hit"
+        )
+        return path
+
+    def put(self, key, write):
+        """
+        Creates the file for the given key and evicts old files if the cache grew too big.
+
+        The file is written to a temporary file first and then moved into place,
+        so concurrent readers never see a partially written file.
+
+        Parameters
+        ----------
+        key : str
+            The key the file is stored under.
+        write : callable
+            Gets called with a binary file object the content has to be written to.
+
+        Returns
+        -------
+        Path
+            The path of the cached file.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w+b") as file:
+                write(file)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        self.evict(keep=path)
+        return path
+
+    def discard(self, pattern):
+        """
+        Deletes all cached files whose key matches the given glob pattern.
+        """
+        for path in self.directory.glob(pattern):
+            path.unlink(missing_ok=True)
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used files until the cache fits into its maximum size.
+
+        Parameters
+        ----------
+        keep : Path, optional
+            A file that must not be deleted, e.g. because it was just created.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
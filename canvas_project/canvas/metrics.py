@@ -0,0 +1,443 @@
+"""
+Aggregated numbers about the requests, caches and queues of the server, exposed in the Prometheus text format.
+
+Every process counts in memory and regularly writes its numbers to a file of its own in METRICS_ROOT,
+named after its process id and start time, so a later process with a recycled id never overwrites it.
+The metrics endpoint adds up the files of all processes, so it reports the whole server no matter which
+process answers the scrape. The numbers of processes that ended are added to a file of totals, so the counters
+never decrease. The directory should be emptied when the server is deployed again.
+"""
+
+import atexit
+import contextlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks, e.g. on Windows, only a single process may scrape at a time
+    fcntl = None
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+
+from .background import WORKERS
+from .queries import count_queries
+
+# The numbers of all processes that ended
+TOTALS_NAME = "totals.json"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = tuple(4**exponent for exponent in range(4, 14))
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# The type, description and buckets of every metric
+METRICS = {
+    "canvas_request_duration_seconds": (
+        "histogram",
+        "Time until the view returned the response.",
+        LATENCY_BUCKETS,
+    ),
+    "canvas_response_size_bytes": (
+        "histogram",
+        "Size of the response body, streamed responses without known length are left out.",
+        SIZE_BUCKETS,
+    ),
+    "canvas_request_queries": (
+        "histogram",
+        "Number of database queries per request.",
+        QUERY_BUCKETS,
+    ),
+    "canvas_responses_total": ("counter", "Responses by status code.", None),
+    "canvas_cache_requests_total": (
+        "counter",
+        "Lookups in the caches by result, hit or miss.",
+        None,
+    ),
+    "canvas_background_queue_depth": (
+        "gauge",
+        "Tasks waiting for the background threads of the web server.",
+        None,
+    ),
+    "canvas_jobs": ("gauge", "Jobs waiting or running by status.", None),
+}
+
+
+class _Registry:
+    """
+    The numbers of the current process, safe to update from all threads.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # Count per bucket, the last bucket is +Inf, followed by the sum of all values
+        self.histograms = {}
+        self.flushed = time.monotonic()
+
+    def increment(self, name, labels, value):
+        with self.lock:
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        index = next(
+            (i for i, bound in enumerate(buckets) if value <= bound), len(buckets)
+        )
+        with self.lock:
+            values = self.histograms.get((name, labels))
+            if values is None:
+                values = self.histograms[name, labels] = [0] * (len(buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "started": _start_time(os.getpid()),
+                "counters": [
+                    [name, labels, value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    [name, labels, list(values)]
+                    for (name, labels), values in self.histograms.items()
+                ],
+                "gauges": [
+                    [
+                        "canvas_background_queue_depth",
+                        (("worker", worker.name),),
+                        worker.queue.qsize(),
+                    ]
+                    for worker in WORKERS
+                ],
+            }
+
+
+_registry = _Registry()
+# Processes forked from a process that already counted, e.g. by a preloading server, start from zero
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_registry.reset)
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name, value=1, **labels):
+    """
+    Adds the value to the counter with the given name and labels.
+    """
+    _registry.increment(name, _labels(labels), value)
+
+
+def observe(name, value, **labels):
+    """
+    Counts a value, e.g. a duration, in the histogram with the given name and labels.
+    """
+    _registry.observe(name, _labels(labels), value)
+
+
+def _start_time(pid):
+    """
+    Returns when the process started, which identifies it together with its id, or None if it isn't running.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            # The name of the program in parentheses may contain spaces, the start time is the 22nd field
+            return file.read().rpartition(")")[2].split()[19]
+    except FileNotFoundError:
+        if os.path.isdir("/proc"):
+            return None
+    except OSError:
+        pass
+
+    # Without /proc only the process id is known
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return ""
+
+
+def _is_running(snapshot):
+    return _start_time(snapshot["pid"]) == snapshot.get("started", "")
+
+
+def _write(path, data):
+    # Readers must never see a partially written file
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(data, file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def flush():
+    """
+    Writes the numbers of the current process to its file in METRICS_ROOT.
+    """
+    directory = Path(settings.METRICS_ROOT)
+    directory.mkdir(parents=True, exist_ok=True)
+    snapshot = _registry.snapshot()
+    _registry.flushed = time.monotonic()
+    _write(
+        directory / f"process-{snapshot['pid']}-{snapshot['started'] or 0}.json",
+        snapshot,
+    )
+
+
+@contextlib.contextmanager
+def _locked(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _add(values, snapshot, gauges):
+    """
+    Adds the numbers of a process or the totals to the values by metric and labels.
+    """
+    for name, labels, value in snapshot["counters"]:
+        labels = tuple(map(tuple, labels))
+        values[name][labels] = values[name].get(labels, 0) + value
+    for name, labels, counts in snapshot["histograms"]:
+        labels = tuple(map(tuple, labels))
+        total = values[name].setdefault(labels, [0] * len(counts))
+        for index, count in enumerate(counts):
+            total[index] += count
+    if gauges:
+        for name, labels, value in snapshot["gauges"]:
+            labels = tuple(map(tuple, labels))
+            values[name][labels] = values[name].get(labels, 0) + value
+
+
+def _fold_ended_processes(directory):
+    """
+    Adds the files of processes that ended to the totals and deletes them, must be called with the directory locked.
+    """
+    totals_path = directory / TOTALS_NAME
+    totals = _read(totals_path) or {"counters": [], "histograms": [], "folded": []}
+    # Files that were added by an interrupted fold
+    folded = set(totals["folded"])
+
+    ended = []
+    values = defaultdict(dict)
+    _add(values, totals, gauges=False)
+    for path in directory.glob("process-*.json"):
+        if path.name in folded:
+            path.unlink(missing_ok=True)
+            continue
+        snapshot = _read(path)
+        if snapshot is not None and not _is_running(snapshot):
+            _add(values, snapshot, gauges=False)
+            ended.append(path)
+    if not ended:
+        return
+
+    _write(
+        totals_path,
+        {
+            "counters": [
+                [name, labels, value]
+                for name in values
+                if METRICS[name][0] == "counter"
+                for labels, value in values[name].items()
+            ],
+            "histograms": [
+                [name, labels, counts]
+                for name in values
+                if METRICS[name][0] == "histogram"
+                for labels, counts in values[name].items()
+            ],
+            "folded": [path.name for path in ended],
+        },
+    )
+    for path in ended:
+        path.unlink(missing_ok=True)
+
+
+def collect():
+    """
+    Adds up the numbers written by all processes.
+
+    Counters and histograms of processes that ended are kept in the totals, so they never decrease,
+    gauges are only taken from running processes.
+
+    Returns
+    -------
+    dict
+        The values of every metric by its labels.
+    """
+    flush()
+    directory = Path(settings.METRICS_ROOT)
+    values = defaultdict(dict)
+    with _locked(directory):
+        _fold_ended_processes(directory)
+        totals = _read(directory / TOTALS_NAME)
+        if totals is not None:
+            _add(values, totals, gauges=False)
+        for path in directory.glob("process-*.json"):
+            snapshot = _read(path)
+            if snapshot is not None:
+                _add(values, snapshot, gauges=True)
+    return values
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _number(value):
+    # Counters grow beyond the six digits of the general format
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(values):
+    """
+    Formats the values of the metrics in the Prometheus text format.
+    """
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(values.get(name, {}).items()):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            bounds = [_number(bound) for bound in buckets] + ["+Inf"]
+            for bound, count in zip(bounds, value):
+                cumulative += count
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _authorized(request):
+    """
+    Returns if the request carries the bearer token of the METRICS_TOKEN setting.
+
+    The address of the client can't be trusted, behind a reverse proxy every request comes from the proxy.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    return (
+        bool(token)
+        and scheme.lower() == "bearer"
+        and hmac.compare_digest(credentials.strip().encode(), token.encode())
+    )
+
+
+def metrics(request):
+    """
+    Returns the metrics of all processes of the server, only to scrapers sending the METRICS_TOKEN as bearer token.
+
+    Without a configured token the endpoint doesn't exist.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request of the scraper.
+
+    Returns
+    -------
+    HttpResponse
+        The metrics in the Prometheus text format, or status 401 without the right token.
+    """
+    if not getattr(settings, "METRICS_TOKEN", None):
+        raise Http404()
+    if not _authorized(request):
+        response = HttpResponse(status=401)
+        response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+        return response
+
+    # Imported here, the job system itself uses the caches counted by this module
+    from job_interface_mockup.models import Job
+
+    values = collect()
+    values["canvas_jobs"] = {
+        (("status", row["status"]),): row["count"]
+        for row in Job.objects.filter(status__in=Job.ACTIVE)
+        .values("status")
+        .annotate(count=Count("id"))
+    }
+    return HttpResponse(
+        render(values), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class MetricsMiddleware:
+    """
+    Measures the latency, response size and number of queries of every request by the name of its view.
+
+    The URL name is used for named views, the import path of the view otherwise.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        atexit.register(flush)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with count_queries() as queries:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        observe("canvas_request_duration_seconds", duration, view=view)
+        observe("canvas_request_queries", queries.queries, view=view)
+        if response.has_header("Content-Length"):
+            observe(
+                "canvas_response_size_bytes", int(response["Content-Length"]), view=view
+            )
+        elif not response.streaming:
+            observe("canvas_response_size_bytes", len(response.content), view=view)
+        increment("canvas_responses_total", view=view, status=response.status_code)
+
+        if time.monotonic() - _registry.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            flush()
+        return response
@@ -0,0 +1,133 @@
+"""
+Profiles single requests on demand, to find out why a request is slow on the server where it happens.
+
+A request is profiled if a staff user sends the X-Profile header or the profile query parameter,
+or if it's picked at random with the probability PROFILE_SAMPLE_RATE. For every profiled request two files
+are written to PROFILE_ROOT: a cProfile dump that can be opened with pstats or snakeviz, and the stacks sampled
+while the request ran in the collapsed format, which flamegraph.pl and speedscope read.
+Only the newest PROFILE_MAX_COUNT profiles are kept.
+"""
+
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+# Seconds between two samples of the stack of the profiled request
+SAMPLE_INTERVAL = 0.001
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread from a second thread and counts how often every stack was seen.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="stack sampler", daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """
+        Returns the sampled stacks in the collapsed format, one stack with its count per line.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests picked at random or requested by staff users, see the module documentation.
+
+    Only one request is profiled at a time, requests arriving meanwhile are handled without profiling.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+
+    def should_profile(self, request):
+        if "X-Profile" in request.headers or "profile" in request.GET:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_staff:
+                return True
+        rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request) or not self.lock.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                sampler.stop()
+            name = self.save(request, profiler, sampler)
+        finally:
+            self.lock.release()
+
+        response["X-Profile"] = name
+        return response
+
+    def save(self, request, profiler, sampler):
+        """
+        Writes the profile of a request and deletes the oldest profiles beyond the maximum count.
+
+        Returns
+        -------
+        str
+            The name of the files without extension.
+        """
+
+        directory = Path(settings.PROFILE_ROOT)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{path[:80]}-{uuid.uuid4().hex[:8]}"
+
+        profiler.dump_stats(directory / f"{name}.prof")
+        (directory / f"{name}.collapsed").write_text(sampler.collapsed())
+
+        profiles = sorted(
+            directory.glob("*.prof"), key=lambda profile: profile.stat().st_mtime
+        )
+        for profile in profiles[: max(0, len(profiles) - settings.PROFILE_MAX_COUNT)]:
+            profile.unlink(missing_ok=True)
+            profile.with_suffix(".collapsed").unlink(missing_ok=True)
+        return name
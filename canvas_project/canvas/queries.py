@@ -0,0 +1,43 @@
+"""
+Counts the database queries of a block of code, used to report the queries of every request.
+"""
+
+import contextlib
+import time
+
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries and the time spent executing them.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def count_queries():
+    """
+    Counts the queries sent over all database connections of the current thread while the block runs.
+
+    Yields
+    ------
+    QueryCounter
+        The number of queries and their duration so far.
+    """
+    counter = QueryCounter()
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
@@ -48,17 +48,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the time of the other middleware is measured as well
+    "canvas.timing.ServerTimingMiddleware",
+    "canvas.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # After the authentication, as staff users can request profiles
+    "canvas.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "canvas.urls"
 
+TEST_RUNNER = "canvas.test_runner.ProjectDiscoverRunner"
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -135,6 +142,69 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Minimal number of seconds between two preview uploads of a project, enforced for all processes through the database
+PREVIEW_UPLOAD_INTERVAL = 10
+
+# Generated files that can be recreated at any time
+CACHE_ROOT = os.path.join(BASE_DIR, "cache")
+
+# Exported scenario files, keyed by project and revision
+SCENARIO_CACHE_DIR = os.path.join(CACHE_ROOT, "scenarios")
+SCENARIO_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+# Report the number of queries and the time spent in the database, serializers and views in Server-Timing headers
+REQUEST_TIMING = DEBUG
+# Seconds after which a request is logged as slow, None disables the log
+SLOW_REQUEST_THRESHOLD = 1.0
+
+# Request, cache and queue metrics of all processes, served at /metrics, see canvas.metrics
+METRICS = True
+METRICS_ROOT = os.path.join(CACHE_ROOT, "metrics")
+# Seconds between two writes of the metrics of a process
+METRICS_FLUSH_INTERVAL = 5.0
+# Bearer token the scraper has to send, the metrics aren't served without one
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Profiles of single requests, requested by staff users or picked at random, see canvas.profiling
+PROFILE_ROOT = os.path.join(BASE_DIR, "profiles")
+# Fraction of all requests that is profiled
+PROFILE_SAMPLE_RATE = 0.0
+# Number of profiles kept, older ones are deleted
+PROFILE_MAX_COUNT = 100
+
+# Rendered representations of whole projects, the file based cache is shared by all processes of the node
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "projects": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(CACHE_ROOT, "projects"),
+        "TIMEOUT": 24 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+PROJECT_CACHE = "projects"
+
+# Results of finished jobs, keyed by a hash of the job inputs
+RESULT_CACHE_DIR = os.path.join(CACHE_ROOT, "results")
+RESULT_CACHE_MAX_SIZE = 5 * 1024 * 1024 * 1024
+
+# Project snapshots and results of jobs, one directory per job
+JOB_ROOT = os.path.join(BASE_DIR, "jobs")
+# Number of worker processes executing jobs, None uses all available cores
+JOB_WORKERS = None
+# Seconds an idle worker waits before looking for new jobs again
+JOB_POLL_INTERVAL = 1.0
+# Seconds between two heartbeats of a worker running a job, the pool checks its workers as often
+JOB_HEARTBEAT_INTERVAL = 10.0
+# Seconds without heartbeat after which a running job is considered interrupted and queued again
+JOB_LEASE_TIMEOUT = 60.0
+# Seconds between two checks for changed jobs of the users with an open event stream
+JOB_EVENT_INTERVAL = 1.0
+# Seconds after which an idle event stream sends a comment, so proxies keep the connection open
+JOB_EVENT_KEEPALIVE = 15.0
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_USE_TLS = True
@@ -0,0 +1,18 @@
+"""
+Runs the tests of all apps with `python manage.py test`.
+"""
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class ProjectDiscoverRunner(DiscoverRunner):
+    """
+    Discovers the tests from the project directory, so the apps are imported under the names in INSTALLED_APPS.
+
+    The project directory is a package itself, without a top level directory unittest would import the tests
+    of an app, e.g. api, as canvas_project.api, whose models are not part of an installed app.
+    """
+
+    def __init__(self, top_level=None, **kwargs):
+        super().__init__(top_level=top_level or str(settings.BASE_DIR), **kwargs)
@@ -0,0 +1,146 @@
+"""
+Measures where the time of a request is spent and reports it in the Server-Timing header of the response.
+
+Enabled by the REQUEST_TIMING setting, requests slower than SLOW_REQUEST_THRESHOLD seconds are also logged
+as JSON, so they can be searched and aggregated.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.serializers import BaseSerializer
+
+from .queries import count_queries
+
+logger = logging.getLogger(__name__)
+
+# Durations of the parts of the current request in seconds, None outside of a measured request
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+@contextlib.contextmanager
+def measure(name):
+    """
+    Adds the time spent inside the block to the metric with the given name of the current request.
+
+    Nested blocks of the same metric are only counted once.
+    """
+    timings = _timings.get()
+    if timings is None or name in timings.running:
+        yield
+        return
+
+    timings.running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[name] += time.perf_counter() - start
+        timings.running.discard(name)
+
+
+class _Timings:
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.running = set()
+
+
+def install_serializer_timing():
+    """
+    Measures the time DRF serializers spend converting objects, wherever a view accesses their data.
+
+    Replaces the data property of all serializers of the process, so it's only called once at startup by the api app
+    when REQUEST_TIMING is enabled. Outside of a measured request the property behaves as before.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, "measured", False):
+        return
+
+    def measured_data(self):
+        with measure("serialize"):
+            return data.fget(self)
+
+    measured_data.measured = True
+    BaseSerializer.data = property(measured_data)
+
+
+class ServerTimingMiddleware:
+    """
+    Reports the number of queries, the database time, the serialization, rendering and view time of every request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_TIMING", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _Timings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        total = time.perf_counter() - start
+
+        durations = timings.durations
+        metrics = {
+            "db": queries.duration,
+            "serialize": durations["serialize"],
+            "render": durations["render"],
+            # Everything else, including the other middleware
+            "view": total - durations["render"],
+            "total": total,
+        }
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={metrics["db"] * 1000:.1f};desc="{queries.queries} queries"',
+                *(
+                    f"{name};dur={metrics[name] * 1000:.1f}"
+                    for name in ["serialize", "render", "view", "total"]
+                ),
+            ]
+        )
+
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD", None)
+        if threshold is not None and total >= threshold:
+            user = getattr(request, "user", None)
+            logger.warning(
+                "Slow request %s",
+                json.dumps(
+                    {
+                        "method": request.method,
+                        "path": request.get_full_path(),
+                        "status": response.status_code,
+                        "user": user.pk if user is not None else None,
+                        "queries": queries.queries,
+                        **{
+                            f"{name}_ms": round(metrics[name] * 1000, 1)
+                            for name in metrics
+                        },
+                    }
+                ),
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Measures the rendering of DRF responses, which happens right after this hook.
+        """
+        timings = _timings.get()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.durations["render"] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -20,11 +20,25 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from canvas import metrics
+from project_management import views as project_views
+
 urlpatterns = [
     path(r"", include("account_management.urls")),
     path(r"api/", include("api.urls")),
     path(r"jobs/", include("job_interface_mockup.urls")),
     path(r"admin/", admin.site.urls),
+    path(r"metrics", metrics.metrics),
     path(r"editor/", include("editor.urls")),
     path(r"projects/", include("project_management.urls")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.DEBUG:
+    # Previews need caching headers, so they are served before the other media files
+    urlpatterns.insert(
+        0,
+        path(
+            settings.MEDIA_URL.lstrip("/") + "project_previews/<path:path>",
+            project_views.preview,
+        ),
+    )
@@ -1,3 +1,53 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from project_management.models import Project
+
+
+class PreviewUploadTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schedule = patch("project_management.previews.schedule_thumbnails")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+
+    def upload(self, content):
+        return self.client.post(
+            "/editor/field/upload",
+            {"preview": SimpleUploadedFile("preview.png", content, "image/png")},
+        )
+
+    def test_uploads_are_throttled(self):
+        self.assertEqual(self.upload(b"first").status_code, 200)
+        response = self.upload(b"second")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+        # The interval passed, unchanged previews aren't stored again
+        Project.objects.filter(pk=self.project.pk).update(
+            preview_uploaded=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(self.upload(b"first").status_code, 204)
+
+    def test_uploads_handled_by_other_processes_count(self):
+        # Another process of the server accepted a preview a moment ago
+        Project.objects.filter(pk=self.project.pk).update(
+            preview_uploaded=timezone.now()
+        )
+        self.assertEqual(self.upload(b"first").status_code, 429)
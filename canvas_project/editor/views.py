@@ -1,11 +1,19 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
 from project_management.models import Project
+from project_management.scenario import artist_scenario, cached_scenario
+from project_management.previews import store_preview
+from job_interface_mockup.tasks import TASKS
 from django.http import FileResponse, HttpResponse, Http404
 
-import os
-from django.conf import settings
+# Seconds until the client should ask again for a scenario in the layout of ARTIST
+ARTIST_EXPORT_RETRY = 5
 
 
 @login_required
@@ -29,12 +37,16 @@ def editor(request, project_name):
     # Return 404 not found if user has no project with this id
     project = get_object_or_404(Project, name=project_name, owner=request.user)
     project.last_edited = timezone.now()
-    project.save()
+    project.save(update_fields=["last_edited"])
 
     return render(
         request,
         "editor/editor.html",
-        context={"project_id": project.pk, "project_name": project.name},
+        context={
+            "project_id": project.pk,
+            "project_name": project.name,
+            "job_types": sorted(TASKS),
+        },
     )
 
 
@@ -43,6 +55,9 @@ def download(request, project_name):
     """
     Converts the specified project into a hdf5 file and downloads it.
 
+    The heliostats are stored column wise by default. With the query parameter layout=artist every heliostat gets
+    a group like in ARTIST, that file is written in the background and the response asks to retry until it's ready.
+
     Parameters
     ----------
     request : HttpRequest
@@ -53,19 +68,33 @@ def download(request, project_name):
     Returns
     -------
     HttpResponse
-        FileResponse to download the hdf5 file.
+        FileResponse to download the hdf5 file, or 202 while the file in the layout of ARTIST is written.
     """
 
-    # Placeholder for actual download functionality added later
     project = get_object_or_404(Project, name=project_name, owner=request.user)
 
-    path = os.path.join(
-        settings.BASE_DIR, "static/artist/test_scenario_alignment_optimization.h5"
+    # The scenario is only generated again if the project changed since the last download
+    if request.GET.get("layout") == "artist":
+        path = artist_scenario(project)
+        if path is None:
+            response = HttpResponse(
+                "The scenario is being prepared, the download starts when it's ready.",
+                status=202,
+                content_type="text/plain",
+            )
+            response["Retry-After"] = ARTIST_EXPORT_RETRY
+            # Browsers reload the page until the file can be downloaded
+            response["Refresh"] = ARTIST_EXPORT_RETRY
+            return response
+    else:
+        path = cached_scenario(project)
+
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=f"{project.name}.h5",
+        content_type="application/octet-stream",
     )
-    response = FileResponse(open(path, "rb"))
-    response["Content-Type"] = "application/octet-stream"
-    response["Content-Disposition"] = f'attachment; filename="{project.name}.h5"'
-    return response
 
 
 @login_required
@@ -82,17 +111,35 @@ def uploadPreview(request, project_name):
     -------
     HttpResponse : status 200
         On successfull POST request
+    HttpResponse : status 204
+        If the preview didn't change
+    HttpResponse : status 429
+        If the last preview of the project was uploaded too recently
     HttpResponse : status 404
         on all other occasions
     """
 
     if request.method == "POST":
         project = get_object_or_404(Project, name=project_name, owner=request.user)
-        file = request.FILES["preview"]
-
-        project.preview.delete()
-        project.preview = file
-        project.save()
 
+        # Every open editor uploads previews regularly, uploads following the last one too quickly are rejected.
+        # The conditional update lets only one of concurrent uploads through, whichever process handles it.
+        interval = settings.PREVIEW_UPLOAD_INTERVAL
+        now = timezone.now()
+        accepted = (
+            Project.objects.filter(pk=project.pk)
+            .filter(
+                Q(preview_uploaded__isnull=True)
+                | Q(preview_uploaded__lte=now - timedelta(seconds=interval))
+            )
+            .update(preview_uploaded=now)
+        )
+        if not accepted:
+            response = HttpResponse(status=429)
+            response["Retry-After"] = str(math.ceil(interval))
+            return response
+
+        if not store_preview(project, request.FILES["preview"]):
+            return HttpResponse(status=204)
         return HttpResponse(status=200)
     return Http404
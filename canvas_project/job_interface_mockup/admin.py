@@ -1,3 +1,6 @@
 from django.contrib import admin
+from job_interface_mockup.models import Job
 
-# Register your models here.
+
+# Regestering all models
+admin.site.register(Job)
@@ -0,0 +1,171 @@
+"""
+Publishes changes of jobs to the event streams of their owners.
+
+A single poller per process looks for changed jobs of all users with an open stream and hands the changes to the
+queues of their streams, so an idle stream costs no database queries of its own.
+"""
+
+import asyncio
+import datetime
+import json
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+# Fields of a job sent with every state change
+STATE_FIELDS = [
+    "id",
+    "project_id",
+    "job_type",
+    "status",
+    "progress",
+    "message",
+    "result",
+]
+
+# Events queued for a stream that doesn't read them are dropped beyond this number
+MAX_QUEUED_EVENTS = 100
+
+
+def format_event(event, data):
+    """
+    Formats an event in the Server-Sent Events format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JobEventBroker:
+    """
+    Polls the jobs of all subscribed users and distributes their changes to the subscribers.
+
+    The poller runs as task of the event loop of the ASGI server while there is at least one subscriber.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = settings.JOB_EVENT_INTERVAL if interval is None else interval
+        self.subscribers = defaultdict(set)
+        # Last published state and preview of every job that is watched
+        self.states = {}
+        self.previews = {}
+        self.poller = None
+        self.last_poll = timezone.now()
+
+    def subscribe(self, owner_id):
+        """
+        Registers a new stream of the given user and returns the queue its events are put into.
+        """
+        queue = asyncio.Queue(MAX_QUEUED_EVENTS)
+        self.subscribers[owner_id].add(queue)
+        loop = asyncio.get_running_loop()
+        if self.poller is None or self.poller.done() or self.poller.get_loop() != loop:
+            self.last_poll = timezone.now()
+            self.poller = loop.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, owner_id, queue):
+        self.subscribers[owner_id].discard(queue)
+        if not self.subscribers[owner_id]:
+            del self.subscribers[owner_id]
+
+    async def run(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            for owner_id, event in await sync_to_async(self.poll)(
+                list(self.subscribers)
+            ):
+                for queue in self.subscribers.get(owner_id, ()):
+                    if not queue.full():
+                        queue.put_nowait(event)
+        self.states, self.previews = {}, {}
+
+    def poll(self, owner_ids):
+        """
+        Returns the events of all jobs of the given users that changed since the last call.
+
+        Returns
+        -------
+        list of tuple
+            Pairs of the owner id and the formatted event.
+        """
+
+        # Jobs finishing between two polls have to be included once more
+        since = self.last_poll - datetime.timedelta(seconds=self.interval)
+        self.last_poll = timezone.now()
+        jobs = Job.objects.filter(owner_id__in=owner_ids).filter(
+            Q(status__in=Job.ACTIVE) | Q(finished__gte=since)
+        )
+
+        events = []
+        states, previews = {}, {}
+        for job in jobs.values("owner_id", "preview", *STATE_FIELDS):
+            owner_id, preview = job.pop("owner_id"), job.pop("preview")
+            if self.states.get(job["id"]) != job:
+                name = "job" if job["status"] in Job.ACTIVE else "done"
+                events.append((owner_id, format_event(name, job)))
+            if preview is not None and self.previews.get(job["id"]) != preview:
+                events.append(
+                    (owner_id, format_event("preview", {"id": job["id"], **preview}))
+                )
+            states[job["id"]], previews[job["id"]] = job, preview
+
+        # Jobs that finished long enough ago are forgotten
+        self.states, self.previews = states, previews
+        return events
+
+
+broker = JobEventBroker()
+
+
+def active_job_events(owner_id, finished_since=None):
+    """
+    Returns the current state of the active jobs of the given user as events.
+
+    Parameters
+    ----------
+    owner_id : int
+        The id of the user.
+    finished_since : datetime or None
+        Jobs that ended after this time are included as done events.
+    """
+
+    jobs = Job.objects.filter(owner_id=owner_id)
+    if finished_since is None:
+        jobs = jobs.filter(status__in=Job.ACTIVE)
+    else:
+        jobs = jobs.filter(Q(status__in=Job.ACTIVE) | Q(finished__gte=finished_since))
+    return [
+        format_event("job" if job["status"] in Job.ACTIVE else "done", job)
+        for job in jobs.values(*STATE_FIELDS)
+    ]
+
+
+async def job_events(owner_id, keepalive=None):
+    """
+    Yields the events of the jobs of the given user, starting with the current state of the active jobs.
+
+    Parameters
+    ----------
+    owner_id : int
+        The id of the user the stream belongs to.
+    keepalive : float or None
+        The number of seconds after which a comment is sent if nothing happened.
+    """
+
+    keepalive = settings.JOB_EVENT_KEEPALIVE if keepalive is None else keepalive
+    queue = broker.subscribe(owner_id)
+    try:
+        for event in await sync_to_async(active_job_events)(owner_id):
+            yield event
+
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(owner_id, queue)
@@ -0,0 +1,327 @@
+"""
+Database backed job queue, jobs are submitted by the API and claimed and executed by the worker processes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from canvas.file_cache import LRUFileCache
+from project_management.scenario import cached_scenario, read_field, sort_heliostats
+from .models import Job
+from .tasks import TASKS
+
+logger = logging.getLogger(__name__)
+
+# File name of the project snapshot inside the directory of a job
+SNAPSHOT_NAME = "scenario.h5"
+
+# Minimal number of seconds between two progress updates written to the database
+REPORT_INTERVAL = 0.5
+
+result_cache = LRUFileCache(settings.RESULT_CACHE_DIR, settings.RESULT_CACHE_MAX_SIZE)
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running task when its job was cancelled or queued again after its lease expired.
+    """
+
+
+def _share_file(source, target):
+    """
+    Makes the file available under the target path, as hard link if possible.
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def input_hash(job, task):
+    """
+    Computes a hash of everything the result of the job depends on.
+
+    The heliostats are hashed in their canonical order and without their ids and names, unless the task refers to the ids,
+    so duplicated projects and projects with the same heliostats created in another order have the same hash.
+
+    Parameters
+    ----------
+    job : Job
+        A job with a snapshot.
+    task : Task
+        The task executing the job.
+
+    Returns
+    -------
+    str
+        The hash as hexadecimal string.
+    """
+
+    field = sort_heliostats(read_field(job.path(job.snapshot)))
+    columns = [
+        field["positions"],
+        field["aim_points"],
+        field["number_of_facets"][:, None],
+    ]
+    if task.uses_ids:
+        columns.insert(0, field["ids"][:, None])
+    heliostats = np.hstack(columns).astype(np.float64)
+
+    description = {
+        "job_type": job.job_type,
+        "version": task.version,
+        "parameters": job.parameters,
+        "receivers": [
+            {key: np.asarray(value).tolist() for key, value in receiver.items()}
+            for receiver in field["receivers"]
+        ],
+        "lightsources": field["lightsources"],
+        "heliostats": heliostats.shape,
+    }
+    digest = hashlib.sha256(json.dumps(description, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(heliostats).tobytes())
+    return digest.hexdigest()
+
+
+def submit_job(owner, project, job_type, parameters):
+    """
+    Queues a new job working on a snapshot of the current state of the project.
+
+    If an identical job finished before, its cached result is used and the job is finished right away.
+
+    Parameters
+    ----------
+    owner : User
+        The user submitting the job.
+    project : Project
+        The project the job works on.
+    job_type : str
+        One of the registered task names.
+    parameters : dict
+        The validated parameters of the task.
+
+    Returns
+    -------
+    Job
+        The queued or finished job.
+    """
+
+    task = TASKS[job_type]
+    with transaction.atomic():
+        # Workers can't see the job before the snapshot exists
+        job = Job.objects.create(
+            owner=owner,
+            project=project,
+            project_name=project.name,
+            project_revision=project.revision,
+            job_type=job_type,
+            parameters=parameters,
+        )
+        os.makedirs(job.directory, exist_ok=True)
+
+        # Cached scenarios are replaced but never changed, so the job can share the file
+        _share_file(cached_scenario(project, columnar=True), job.path(SNAPSHOT_NAME))
+        job.snapshot = SNAPSHOT_NAME
+        job.input_hash = input_hash(job, task)
+
+        cached = result_cache.get(f"{job.input_hash}-{task.result}")
+        if cached is not None:
+            _share_file(cached, job.path(task.result))
+            job.status = Job.FINISHED
+            job.progress = 1
+            job.result = task.result
+            job.message = "The result of an identical job was reused."
+            job.started = job.finished = timezone.now()
+        job.save()
+    return job
+
+
+def cancel_job(job):
+    """
+    Cancels the job if it didn't finish yet, a running task stops at its next progress report.
+
+    Returns
+    -------
+    bool
+        True if the job was cancelled.
+    """
+    return bool(
+        Job.objects.filter(pk=job.pk, status__in=Job.ACTIVE).update(
+            status=Job.CANCELLED, finished=timezone.now()
+        )
+    )
+
+
+def claim_job(worker):
+    """
+    Takes the oldest queued job for the given worker.
+
+    The status is changed with a conditional update, so every job is only claimed by one worker
+    even on databases without row locks.
+
+    Parameters
+    ----------
+    worker : int
+        The process id of the claiming worker.
+
+    Returns
+    -------
+    Job or None
+        The claimed job or None if the queue is empty.
+    """
+
+    while True:
+        candidates = list(
+            Job.objects.filter(status=Job.QUEUED)
+            .order_by("created", "id")
+            .values_list("id", flat=True)[:10]
+        )
+        if not candidates:
+            return None
+        for job_id in candidates:
+            now = timezone.now()
+            claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=worker, started=now, heartbeat=now
+            )
+            if claimed:
+                return Job.objects.get(pk=job_id)
+
+
+def _running(job):
+    """
+    Returns the job as query set as long as the worker that claimed it is still running it.
+    """
+    return Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker)
+
+
+def renew_lease(job):
+    """
+    Records that the worker of the job is still running it.
+
+    Returns
+    -------
+    bool
+        False if the job was cancelled or taken away from the worker in the meantime.
+    """
+    return bool(_running(job).update(heartbeat=timezone.now()))
+
+
+def requeue_interrupted_jobs(lease=None):
+    """
+    Puts running jobs whose worker didn't renew their lease in time back into the queue.
+
+    Jobs of workers in other pools, which may share the database, are left alone as long as they keep sending heartbeats.
+
+    Parameters
+    ----------
+    lease : float, optional
+        Seconds after the last heartbeat until a job is considered interrupted, defaults to JOB_LEASE_TIMEOUT.
+
+    Returns
+    -------
+    int
+        The number of requeued jobs.
+    """
+    if lease is None:
+        lease = settings.JOB_LEASE_TIMEOUT
+    expired = timezone.now() - timedelta(seconds=lease)
+    return (
+        Job.objects.filter(status=Job.RUNNING)
+        .filter(Q(heartbeat__lt=expired) | Q(heartbeat__isnull=True))
+        .update(
+            status=Job.QUEUED,
+            progress=0,
+            message="",
+            worker=None,
+            started=None,
+            heartbeat=None,
+        )
+    )
+
+
+class ProgressReporter:
+    """
+    Report function passed to the tasks, writes the progress of the job and checks if it was cancelled.
+    """
+
+    def __init__(self, job, interval=REPORT_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self.last_report = None
+
+    def __call__(self, progress, message=None, preview=None):
+        now = time.monotonic()
+        if self.last_report is not None and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+
+        changes = {"progress": max(0.0, min(1.0, progress))}
+        if message is not None:
+            changes["message"] = message
+        if preview is not None:
+            changes["preview"] = preview()
+        if not _running(self.job).update(**changes):
+            raise JobCancelled()
+
+
+def run_job(job):
+    """
+    Executes the task of a claimed job and stores its outcome.
+
+    Parameters
+    ----------
+    job : Job
+        A job claimed by the calling worker.
+    """
+
+    running = _running(job)
+    task = TASKS.get(job.job_type)
+    if task is None:
+        running.update(
+            status=Job.FAILED,
+            message=f"Unknown job type {job.job_type}",
+            finished=timezone.now(),
+        )
+        return
+
+    try:
+        task.function(job, ProgressReporter(job))
+    except JobCancelled:
+        logger.info("Job %s was cancelled or requeued", job.pk)
+        return
+    except Exception as error:
+        logger.exception("Job %s failed", job.pk)
+        running.update(status=Job.FAILED, message=str(error), finished=timezone.now())
+        return
+
+    # Identical jobs submitted later reuse the result
+    if job.input_hash:
+        try:
+            with open(job.path(task.result), "rb") as source:
+                result_cache.put(
+                    f"{job.input_hash}-{task.result}",
+                    lambda file: shutil.copyfileobj(source, file),
+                )
+        except OSError:
+            logger.exception("The result of job %s couldn't be cached", job.pk)
+
+    # A job cancelled or requeued during its last steps stays that way
+    running.update(
+        status=Job.FINISHED,
+        progress=1,
+        message="",
+        result=task.result,
+        preview=None,
+        finished=timezone.now(),
+    )
@@ -0,0 +1,36 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from job_interface_mockup.worker import WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Starts the local worker processes executing the queued jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes, defaults to the JOB_WORKERS setting or the number of cores.",
+        )
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(size=options["workers"])
+        pool.start()
+        self.stdout.write(f"Started {pool.size} workers, stop them with CTRL-C.")
+
+        # Let running jobs finish when the command is stopped
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            if not stopping:
+                stopping = True
+                self.stdout.write("Stopping the workers...")
+                pool.stop()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+        pool.join()
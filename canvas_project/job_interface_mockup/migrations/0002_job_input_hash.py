@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_interface_mockup", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="input_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
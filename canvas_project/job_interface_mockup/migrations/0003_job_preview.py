@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("job_interface_mockup", "0002_job_input_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="preview",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,82 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+from project_management.models import Project
+
+
+class Job(models.Model):
+    """
+    Represents a job in the database, a long running computation on a snapshot of a project executed by the worker pool
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (FINISHED, "Finished"),
+        (FAILED, "Failed"),
+        (CANCELLED, "Cancelled"),
+    ]
+
+    # Jobs in these states are still waiting for or using a worker
+    ACTIVE = [QUEUED, RUNNING]
+
+    owner = models.ForeignKey(User, related_name="jobs", on_delete=models.CASCADE)
+    # The snapshot keeps the job running if the project is deleted meanwhile
+    project = models.ForeignKey(
+        Project, related_name="jobs", null=True, on_delete=models.SET_NULL
+    )
+    project_name = models.CharField(max_length=100)
+    project_revision = models.PositiveBigIntegerField()
+
+    job_type = models.CharField(max_length=100)
+    parameters = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.FloatField(default=0)
+    message = models.TextField(blank=True, default="")
+    # Small intermediate result published by the running task, e.g. a scaled down flux map
+    preview = models.JSONField(null=True, blank=True)
+
+    # Paths relative to the directory of the job
+    snapshot = models.CharField(max_length=200, blank=True, default="")
+    result = models.CharField(max_length=200, blank=True, default="")
+    # Hash of the snapshot contents and parameters, equal for jobs computing the same result
+    input_hash = models.CharField(max_length=64, blank=True, default="")
+
+    # Process id of the worker executing the job
+    worker = models.IntegerField(null=True, blank=True)
+    # Renewed by the worker while the job runs, jobs whose worker stopped renewing it are queued again
+    heartbeat = models.DateTimeField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers take the oldest queued job
+            models.Index(fields=["status", "created"], name="job_queue_idx"),
+            models.Index(fields=["owner", "created"], name="job_owner_idx"),
+        ]
+
+    @property
+    def directory(self):
+        return os.path.join(settings.JOB_ROOT, str(self.pk))
+
+    def path(self, name):
+        """
+        Returns the absolute path of a file inside the directory of the job.
+        """
+        return os.path.join(self.directory, name)
+
+    def __str__(self) -> str:
+        return f"Job {self.pk} ({self.job_type}, {self.status})"
@@ -0,0 +1,121 @@
+"""
+Computations that can be executed as jobs, every task is registered under the job type it handles.
+
+A task is called with the job and a report function. It reads the project from the snapshot of the job
+and writes its result into the file of the directory of the job it was registered with.
+Calling report(progress, message, preview) regularly publishes the progress and stops the task if the job was cancelled.
+The optional preview is a function returning a small JSON serializable intermediate result, only called when it's published.
+"""
+
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from project_management.raytracing import flux_preview, sun_direction, trace_flux
+from project_management.scenario import read_field, sort_heliostats
+from project_management.validation import validate_layout
+
+TASKS = {}
+
+Task = namedtuple("Task", ["function", "result", "version", "uses_ids"])
+
+
+def task(job_type, result, version=1, uses_ids=False):
+    """
+    Registers the decorated function as task executing jobs of the given type.
+
+    Parameters
+    ----------
+    job_type : str
+        The job type handled by the task.
+    result : str
+        The name of the file the task writes its result to.
+    version : int
+        Has to be increased when the results of the task change, so cached results aren't used anymore.
+    uses_ids : bool
+        If the result refers to the heliostats by their ids, otherwise it only depends on their parameters.
+    """
+
+    def register(function):
+        TASKS[job_type] = Task(function, result, version, uses_ids)
+        return function
+
+    return register
+
+
+@task("validation", result="validation.json", uses_ids=True)
+def validation(job, report):
+    """
+    Checks the heliostat field of the snapshot for overlapping mirrors, tower clearance and terrain bounds.
+    """
+
+    report(0, "Reading the project")
+    field = read_field(job.path(job.snapshot))
+
+    report(0.5, "Checking the layout")
+    parameters = job.parameters
+    violations = validate_layout(
+        field["ids"],
+        field["positions"],
+        field["number_of_facets"],
+        # The receivers are mounted on the towers
+        towers=[
+            (receiver["position"][0], receiver["position"][2])
+            for receiver in field["receivers"]
+        ],
+        tower_radius=parameters.get("tower_radius", 10.0),
+        margin=parameters.get("margin", 0.0),
+        bounds=parameters,
+    )
+
+    with open(job.path("validation.json"), "w") as file:
+        json.dump({"valid": not any(violations.values()), **violations}, file)
+
+
+@task("raytracing", result="flux.npy")
+def raytracing(job, report):
+    """
+    Computes the flux density map of a receiver of the snapshot and stores it as flux.npy.
+    """
+
+    report(0, "Reading the project")
+    # The random rays depend on the order of the heliostats, which must not depend on their ids
+    field = sort_heliostats(read_field(job.path(job.snapshot)))
+    parameters = job.parameters
+
+    receivers = field["receivers"]
+    if parameters.get("receiver"):
+        receivers = [
+            receiver
+            for receiver in receivers
+            if receiver["name"] == parameters["receiver"]
+        ]
+    if not receivers:
+        raise ValueError("The project has no matching receiver.")
+
+    # The first light source describes the sun, without one the default sun shape is used
+    lightsource = field["lightsources"][0] if field["lightsources"] else {}
+    number_of_rays = parameters.get("number_of_rays") or lightsource.get(
+        "number_of_rays", 100
+    )
+
+    flux = trace_flux(
+        field["positions"],
+        field["aim_points"],
+        field["number_of_facets"],
+        receivers[0],
+        sun_direction(
+            parameters.get("sun_azimuth", 180.0), parameters.get("sun_elevation", 45.0)
+        ),
+        number_of_rays=number_of_rays,
+        mean=lightsource.get("mean", 0.0),
+        covariance=lightsource.get("covariance", 4.3681e-06),
+        dni=parameters.get("dni", 1000.0),
+        seed=parameters.get("seed", 0),
+        report=lambda fraction, partial: report(
+            0.05 + 0.9 * fraction, "Tracing rays", preview=lambda: flux_preview(partial)
+        ),
+    )
+
+    np.save(job.path("flux.npy"), flux)
@@ -1,3 +1,252 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from project_management.models import Heliostat, Project
+from project_management.scenario import scenario_cache
+from .events import JobEventBroker, broker, job_events
+from .jobs import (
+    JobCancelled,
+    ProgressReporter,
+    claim_job,
+    renew_lease,
+    requeue_interrupted_jobs,
+    result_cache,
+    run_job,
+    submit_job,
+)
+from .models import Job
+from .worker import WorkerPool
+
+
+class JobLeaseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+
+    def create_job(self, **fields):
+        return Job.objects.create(
+            owner=self.user,
+            project_name="field",
+            project_revision=1,
+            job_type="raytracing",
+            **fields,
+        )
+
+    def test_only_jobs_with_expired_leases_are_requeued(self):
+        now = timezone.now()
+        alive = self.create_job(status=Job.RUNNING, worker=1, heartbeat=now)
+        expired = self.create_job(
+            status=Job.RUNNING, worker=2, heartbeat=now - timedelta(minutes=5)
+        )
+        unknown = self.create_job(status=Job.RUNNING, worker=3)
+
+        self.assertEqual(requeue_interrupted_jobs(lease=60), 2)
+        alive.refresh_from_db()
+        self.assertEqual((alive.status, alive.worker), (Job.RUNNING, 1))
+        for job in (expired, unknown):
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.worker), (Job.QUEUED, None))
+
+    def test_claimed_jobs_start_with_a_heartbeat(self):
+        self.create_job()
+        job = claim_job(worker=7)
+        self.assertIsNotNone(job.heartbeat)
+        self.assertEqual(requeue_interrupted_jobs(lease=60), 0)
+
+        Job.objects.filter(pk=job.pk).update(heartbeat=timezone.now() - timedelta(1))
+        self.assertTrue(renew_lease(job))
+        self.assertEqual(requeue_interrupted_jobs(lease=60), 0)
+
+    def test_worker_loses_a_requeued_job(self):
+        self.create_job()
+        job = claim_job(worker=7)
+        Job.objects.filter(pk=job.pk).update(heartbeat=None)
+        requeue_interrupted_jobs(lease=60)
+        self.assertEqual(claim_job(worker=8).pk, job.pk)
+
+        # The first worker must neither renew the lease nor report progress of the job it lost
+        self.assertFalse(renew_lease(job))
+        with self.assertRaises(JobCancelled):
+            ProgressReporter(job)(0.5)
+        job.refresh_from_db()
+        self.assertEqual((job.worker, job.progress), (8, 0))
+
+
+class WorkerPoolTests(TestCase):
+    @patch("job_interface_mockup.worker.multiprocessing.Process")
+    def test_exited_workers_are_replaced(self, process):
+        process.side_effect = lambda **kwargs: Mock()
+        pool = WorkerPool(size=2, poll_interval=1, heartbeat_interval=1)
+        pool.start()
+        self.assertEqual(process.call_count, 2)
+        first, second = pool.processes
+
+        process.reset_mock()
+        first.is_alive.return_value = False
+        second.is_alive.return_value = True
+        with self.assertLogs("job_interface_mockup.worker", "WARNING"):
+            pool.check()
+        self.assertEqual(process.call_count, 1)
+        self.assertNotIn(first, pool.processes)
+        self.assertIs(pool.processes[1], second)
+
+        # Workers ending because the pool stops aren't replaced
+        process.reset_mock()
+        pool.stop_event.set()
+        second.is_alive.return_value = False
+        pool.check()
+        process.assert_not_called()
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        settings = override_settings(JOB_ROOT=root / "jobs")
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for cache, name in [(scenario_cache, "scenarios"), (result_cache, "results")]:
+            self.addCleanup(setattr, cache, "directory", cache.directory)
+            cache.directory = root / name
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = self.create_project("field", [(0, 0), (20, 0), (0, 20)])
+
+    def create_project(self, name, positions):
+        project = Project.objects.create(
+            name=name, description="", last_edited=timezone.now(), owner=self.user
+        )
+        Heliostat.objects.bulk_create(
+            Heliostat(
+                project=project, name=f"{name} {x} {z}", position_x=x, position_z=z
+            )
+            for x, z in positions
+        )
+        return project
+
+    def run_queued_job(self):
+        job = claim_job(worker=1)
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FINISHED)
+        return job
+
+    def test_identical_jobs_reuse_the_result(self):
+        submit_job(self.user, self.project, "validation", {"margin": 1.0})
+        first = self.run_queued_job()
+
+        second = submit_job(self.user, self.project, "validation", {"margin": 1.0})
+        self.assertEqual(second.status, Job.FINISHED)
+        self.assertEqual(second.input_hash, first.input_hash)
+        self.assertEqual(
+            Path(second.path(second.result)).read_bytes(),
+            Path(first.path(first.result)).read_bytes(),
+        )
+        self.assertIsNone(claim_job(worker=1))
+
+    def test_changed_inputs_compute_a_new_result(self):
+        submit_job(self.user, self.project, "validation", {"margin": 1.0})
+        self.run_queued_job()
+
+        other_parameters = submit_job(
+            self.user, self.project, "validation", {"margin": 2.0}
+        )
+        self.assertEqual(other_parameters.status, Job.QUEUED)
+
+        self.project.heliostats.filter(position_x=20).update(position_x=30)
+        Project.bump_revision(self.project.pk)
+        self.project.refresh_from_db()
+        moved = submit_job(self.user, self.project, "validation", {"margin": 1.0})
+        self.assertEqual(moved.status, Job.QUEUED)
+
+    def test_hash_ignores_heliostat_ids_and_order(self):
+        # The same heliostats created in another order, so their ids and names differ
+        copy = self.create_project("copy", [(0, 20), (20, 0), (0, 0)])
+        jobs = [
+            submit_job(self.user, project, job_type, {})
+            for job_type in ("raytracing", "validation")
+            for project in (self.project, copy)
+        ]
+        self.assertEqual(jobs[0].input_hash, jobs[1].input_hash)
+        # Validation results list heliostat ids, so they can't be shared
+        self.assertNotEqual(jobs[2].input_hash, jobs[3].input_hash)
+
+
+class JobEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.job = self.create_job(self.user)
+
+    def create_job(self, owner, **fields):
+        return Job.objects.create(
+            owner=owner,
+            project_name="field",
+            project_revision=1,
+            job_type="raytracing",
+            **fields,
+        )
+
+    def parse(self, event):
+        name, data = event.strip().split("\n")
+        return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+    def test_only_changes_are_published(self):
+        self.create_job(self.other)
+        events = JobEventBroker(interval=1)
+        published = events.poll([self.user.pk])
+        self.assertEqual(len(published), 1)
+        owner, event = published[0]
+        self.assertEqual(owner, self.user.pk)
+        self.assertEqual(self.parse(event)[1]["id"], self.job.pk)
+        self.assertEqual(events.poll([self.user.pk]), [])
+
+        Job.objects.filter(pk=self.job.pk).update(
+            status=Job.RUNNING, progress=0.5, preview={"flux": [[1]]}
+        )
+        names = [self.parse(event) for _, event in events.poll([self.user.pk])]
+        self.assertEqual(
+            names,
+            [
+                ("job", {**names[0][1], "status": Job.RUNNING, "progress": 0.5}),
+                ("preview", {"id": self.job.pk, "flux": [[1]]}),
+            ],
+        )
+
+        Job.objects.filter(pk=self.job.pk).update(
+            status=Job.FINISHED, finished=timezone.now()
+        )
+        ((_, event),) = events.poll([self.user.pk])
+        self.assertEqual(self.parse(event)[0], "done")
+
+    def test_wsgi_clients_reconnect(self):
+        self.assertEqual(self.client.get("/jobs/events/").status_code, 401)
+
+        self.client.force_login(self.user)
+        response = self.client.get("/jobs/events/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        retry, event = response.content.decode().split("\n\n", 1)
+        self.assertTrue(retry.startswith("retry: "))
+        name, data = self.parse(event)
+        self.assertEqual((name, data["id"]), ("job", self.job.pk))
+
+    async def test_stream_starts_with_the_active_jobs(self):
+        stream = job_events(self.user.pk, keepalive=0.01)
+        try:
+            name, data = self.parse(await anext(stream))
+            self.assertEqual((name, data["id"]), ("job", self.job.pk))
+            self.assertEqual(await anext(stream), ": keepalive\n\n")
+        finally:
+            await stream.aclose()
+            broker.poller.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await broker.poller
+        self.assertFalse(broker.subscribers)
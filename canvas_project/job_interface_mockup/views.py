@@ -1,3 +1,52 @@
-from django.shortcuts import render
+import datetime
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .events import active_job_events, job_events
+
+# Seconds until the browser reconnects if the stream can't be held open
+RECONNECT_DELAY = 5
+
+
+async def events(request):
+    """
+    Streams the changes of the jobs of the logged in user as Server-Sent Events.
+
+    Sends a job event for every change of an active job, a preview event for every new intermediate result
+    and a done event when a job finished, failed or was cancelled. Served by the ASGI application,
+    every open stream only costs an idle connection, the changes are polled once per process for all streams.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request the user send to get here.
+
+    Returns
+    -------
+    HttpResponse
+        The never ending stream of events.
+    """
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker can't hold the stream open, so the browser is told to reconnect for the next state
+        since = timezone.now() - datetime.timedelta(seconds=2 * RECONNECT_DELAY)
+        events = await sync_to_async(active_job_events)(user.pk, since)
+        return HttpResponse(
+            f"retry: {RECONNECT_DELAY * 1000}\n\n" + "".join(events),
+            content_type="text/event-stream",
+        )
+
+    response = StreamingHttpResponse(
+        job_events(user.pk), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Proxies must not buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
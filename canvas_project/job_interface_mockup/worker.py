@@ -0,0 +1,183 @@
+"""
+Local pool of worker processes executing the queued jobs, one job per process at a time.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .jobs import claim_job, renew_lease, requeue_interrupted_jobs, run_job
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores():
+    """
+    Returns the number of cores this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def heartbeat(job, interval):
+    """
+    Renews the lease of the job from a background thread while the block runs.
+
+    Parameters
+    ----------
+    job : Job
+        The job claimed by the current worker.
+    interval : float
+        The number of seconds between two heartbeats.
+    """
+
+    done = threading.Event()
+
+    def beat():
+        try:
+            while not done.wait(interval) and renew_lease(job):
+                pass
+        finally:
+            # Every thread has its own connections
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat of job {job.pk}")
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def work(stop, poll_interval, heartbeat_interval):
+    """
+    Main loop of a worker process, executes queued jobs until the stop event is set.
+
+    Parameters
+    ----------
+    stop : multiprocessing.Event
+        Set by the pool to end the worker after its current job.
+    poll_interval : float
+        The number of seconds to wait before looking for new jobs when the queue is empty.
+    heartbeat_interval : float
+        The number of seconds between two renewals of the lease of the running job.
+    """
+
+    # The pool handles interrupts and stops the workers in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Connections inherited from the parent can't be shared between processes
+    connections.close_all()
+
+    worker = os.getpid()
+    while not stop.is_set():
+        job = claim_job(worker)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        logger.info("Worker %s started job %s", worker, job.pk)
+        with heartbeat(job, heartbeat_interval):
+            run_job(job)
+
+    connections.close_all()
+
+
+class WorkerPool:
+    """
+    Starts, watches and stops the worker processes, by default one per available core so long simulations
+    use the whole machine.
+
+    Workers that exit unexpectedly are replaced, their jobs are queued again once their lease expires.
+    """
+
+    def __init__(self, size=None, poll_interval=None, heartbeat_interval=None):
+        self.size = size or settings.JOB_WORKERS or available_cores()
+        self.poll_interval = (
+            settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self.heartbeat_interval = (
+            settings.JOB_HEARTBEAT_INTERVAL
+            if heartbeat_interval is None
+            else heartbeat_interval
+        )
+        self.stop_event = multiprocessing.Event()
+        self.processes = []
+
+    def _spawn(self):
+        process = multiprocessing.Process(
+            target=work,
+            args=(self.stop_event, self.poll_interval, self.heartbeat_interval),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _requeue(self):
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            logger.info("Requeued %s interrupted jobs", requeued)
+
+    def start(self):
+        self._requeue()
+        connections.close_all()
+        for _ in range(self.size):
+            self.processes.append(self._spawn())
+
+    def check(self):
+        """
+        Replaces the workers that exited and requeues the jobs of workers that stopped sending heartbeats.
+        """
+
+        self._requeue()
+        # Connections of the parent can't be shared with the new workers
+        connections.close_all()
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or self.stop_event.is_set():
+                continue
+            logger.warning(
+                "Worker %s exited with code %s, starting a new one",
+                process.pid,
+                process.exitcode,
+            )
+            process.join()
+            self.processes[index] = self._spawn()
+
+    def join(self):
+        """
+        Watches the workers until the pool is stopped.
+        """
+
+        while not self.stop_event.wait(self.heartbeat_interval):
+            self.check()
+        for process in list(self.processes):
+            process.join()
+
+    def stop(self, timeout=10.0):
+        """
+        Stops the workers after their current jobs, jobs still running after the timeout are failed.
+        """
+
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+                Job.objects.filter(status=Job.RUNNING, worker=process.pid).update(
+                    status=Job.FAILED,
+                    message="The worker was stopped",
+                    finished=timezone.now(),
+                )
+        self.processes = []
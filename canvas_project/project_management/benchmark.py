@@ -0,0 +1,278 @@
+"""
+Measures how long the slow paths of CANVAS take on generated fields of different sizes.
+
+Every scenario sends real requests through the whole middleware stack with the test client and records
+the time and the number of database queries. The results can be stored as JSON report and compared
+against the report of an earlier run, see the benchmark management command.
+"""
+
+import platform
+import sqlite3
+import statistics
+import time
+
+import django
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.payloads import invalidate_payloads
+from canvas.background import WORKERS
+from .layout import CORNFIELD, generate_layout
+from .models import Heliostat, Lightsource, Project, Receiver
+from .raster import encode_png
+
+# Distance between the generated heliostats in meters
+SPACING = 10.0
+
+# Number of heliostats created with one query
+BATCH_SIZE = 5000
+
+
+def create_field(owner, name, number_of_heliostats):
+    """
+    Creates a project with a square field of heliostats around a receiver and a light source.
+
+    Parameters
+    ----------
+    owner : User
+        The owner of the project.
+    name : str
+        The name of the project.
+    number_of_heliostats : int
+        The number of heliostats of the field.
+
+    Returns
+    -------
+    Project
+        The created project.
+    """
+
+    project = Project.objects.create(
+        name=name, description="", last_edited=timezone.now(), owner=owner
+    )
+    Receiver.objects.create(project=project)
+    Lightsource.objects.create(project=project)
+
+    # The corners of the square are cut off, so a slightly bigger field is generated
+    max_radius = SPACING * (np.sqrt(number_of_heliostats / np.pi) + 2)
+    positions = generate_layout(
+        CORNFIELD, min_radius=2 * SPACING, max_radius=max_radius, spacing=SPACING
+    )
+    positions = positions[np.argsort(np.hypot(positions[:, 0], positions[:, 2]))]
+    Heliostat.objects.bulk_create(
+        (
+            Heliostat(
+                project=project,
+                name=f"Heliostat {index}",
+                position_x=x,
+                position_y=y,
+                position_z=z,
+            )
+            for index, (x, y, z) in enumerate(positions[:number_of_heliostats])
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    return project
+
+
+def _wait_for_background_work():
+    # Thumbnails and layout previews must not slow down the next measurement
+    for worker in WORKERS:
+        worker.join()
+
+
+def _noise_png(seed):
+    image = np.random.default_rng(seed).integers(0, 256, (180, 320, 3), np.uint8)
+    return encode_png(image)
+
+
+def _scenarios(client, project):
+    """
+    Returns the name of every scenario with a function preparing a request and one sending it.
+
+    The preparation isn't measured, it returns the arguments of the request function.
+    """
+    name = project.name
+    api = f"/api/projects/{project.pk}"
+    heliostat_id = project.heliostats.values_list("pk", flat=True).first()
+
+    def nothing():
+        return ()
+
+    def clear_payloads():
+        invalidate_payloads(project.pk)
+        return ()
+
+    def change_project():
+        Project.bump_revision(project.pk)
+        return ()
+
+    def duplicate_project():
+        copy = project.duplicate(Project.free_name(project.owner, name + "copy"))
+        return (copy.name,)
+
+    def new_preview():
+        # Unchanged previews aren't stored again
+        preview = _noise_png(time.time_ns())
+        return (SimpleUploadedFile("preview.png", preview, content_type="image/png"),)
+
+    def move_heliostat():
+        return ({"position_y": float(np.random.default_rng().uniform(0, 1))},)
+
+    return [
+        ("project_detail", clear_payloads, lambda: client.get(f"{api}/")),
+        ("project_detail_cached", nothing, lambda: client.get(f"{api}/")),
+        ("heliostat_list", nothing, lambda: client.get(f"{api}/heliostats/")),
+        (
+            "heliostat_update",
+            move_heliostat,
+            lambda data: client.patch(
+                f"{api}/heliostats/{heliostat_id}/",
+                data,
+                content_type="application/json",
+            ),
+        ),
+        (
+            "duplication",
+            nothing,
+            lambda: client.get(f"/projects/duplicateProject/{name}"),
+        ),
+        (
+            "deletion",
+            duplicate_project,
+            lambda copy: client.get(f"/projects/deleteProject/{copy}"),
+        ),
+        (
+            "preview_upload",
+            new_preview,
+            lambda file: client.post(f"/editor/{name}/upload", {"preview": file}),
+        ),
+        ("hdf5_download", change_project, lambda: client.get(f"/editor/{name}/hdf5")),
+        ("hdf5_download_cached", nothing, lambda: client.get(f"/editor/{name}/hdf5")),
+    ]
+
+
+def run_scenarios(client, project, repeat, scenarios=None):
+    """
+    Measures every scenario on the given project.
+
+    Parameters
+    ----------
+    client : Client
+        A test client logged in as the owner of the project.
+    project : Project
+        The project the requests are sent for.
+    repeat : int
+        The number of measurements of every scenario.
+    scenarios : list of str, optional
+        The names of the scenarios to measure, all by default.
+
+    Returns
+    -------
+    list of dict
+        The median, minimal and maximal time in milliseconds, the number of queries and the size of the response
+        of every scenario.
+    """
+
+    heliostats = project.heliostats.count()
+    results = []
+    for scenario, prepare, send in _scenarios(client, project):
+        if scenarios is not None and scenario not in scenarios:
+            continue
+
+        durations = []
+        for _ in range(repeat):
+            arguments = prepare()
+            _wait_for_background_work()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = send(*arguments)
+                if response.streaming:
+                    size = sum(map(len, response.streaming_content))
+                else:
+                    size = len(response.content)
+                durations.append(time.perf_counter() - start)
+            response.close()
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f"{scenario} failed with status {response.status_code}"
+                )
+
+        # Duplicates made by the scenarios must not slow down the following ones
+        Project.objects.filter(
+            owner=project.owner, name__startswith=project.name + "copy"
+        ).delete()
+        _wait_for_background_work()
+
+        results.append(
+            {
+                "scenario": scenario,
+                "heliostats": heliostats,
+                "repeat": repeat,
+                "median_ms": round(statistics.median(durations) * 1000, 2),
+                "min_ms": round(min(durations) * 1000, 2),
+                "max_ms": round(max(durations) * 1000, 2),
+                "queries": len(queries),
+                "bytes": size,
+            }
+        )
+    return results
+
+
+def environment():
+    """
+    Returns the versions the benchmark ran with, timings are only comparable on the same machine and versions.
+    """
+    return {
+        "created": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with the results of an earlier run.
+
+    Parameters
+    ----------
+    results : list of dict
+        The results of this run, as returned by run_scenarios.
+    baseline : list of dict
+        The results of the earlier run.
+    tolerance : float
+        The fraction the median time may grow before a scenario counts as slower.
+
+    Returns
+    -------
+    list of dict
+        Every result found in the baseline with the baseline values, the change of the median time
+        and if the scenario regressed, either by taking longer or by sending more queries.
+    """
+
+    earlier = {
+        (result["scenario"], result["heliostats"]): result for result in baseline
+    }
+    comparison = []
+    for result in results:
+        reference = earlier.get((result["scenario"], result["heliostats"]))
+        if reference is None:
+            continue
+        change = result["median_ms"] / max(reference["median_ms"], 0.01) - 1
+        comparison.append(
+            {
+                **result,
+                "baseline_median_ms": reference["median_ms"],
+                "baseline_queries": reference["queries"],
+                "change": round(change, 3),
+                "regressed": change > tolerance
+                or result["queries"] > reference["queries"],
+            }
+        )
+    return comparison
@@ -0,0 +1,191 @@
+"""
+Reads stored flux density maps in parts, without loading the whole map into memory.
+
+The maps are stored as .npy files and opened as memory mapped arrays, so reading a window only touches
+the pages of the file the window covers. The first row of a map is the lower edge of the receiver,
+rows go along the u axis of the receiver plane and columns along its e axis.
+"""
+
+import functools
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Width and height of an image tile in pixels
+TILE_SIZE = 256
+
+# Upper bound for the number of values read from the file at once
+READ_SIZE = 2**22
+
+# Colors of the values from 0 to 255, from black to yellow like the previews of running jobs
+PALETTE = np.stack(
+    [np.arange(256), np.arange(256) * 0.8, np.zeros(256)], axis=1
+).astype(np.uint8)
+
+
+def open_flux(path):
+    """
+    Opens a flux density map as read only memory mapped array.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+@functools.lru_cache(maxsize=256)
+def _statistics(path, modified):
+    flux = open_flux(path)
+    height, width = flux.shape
+    maximum, total = 0.0, 0.0
+    rows = max(1, READ_SIZE // max(1, width))
+    for start in range(0, height, rows):
+        stripe = flux[start : start + rows]
+        maximum = max(maximum, float(stripe.max(initial=0)))
+        total += float(stripe.sum(dtype=np.float64))
+    return {
+        "width": width,
+        "height": height,
+        "dtype": flux.dtype.str,
+        "maximum": maximum,
+        "mean": total / flux.size if flux.size else 0.0,
+        "tile_size": TILE_SIZE,
+        "levels": tile_levels(width, height),
+    }
+
+
+def flux_statistics(path):
+    """
+    Returns the size, the maximum and the mean of a flux density map.
+
+    The map is scanned in stripes, the statistics are kept in memory until the file changes.
+
+    Parameters
+    ----------
+    path : str
+        The path of the .npy file.
+
+    Returns
+    -------
+    dict
+        The width, height, dtype, maximum, mean, tile_size and the number of tile levels of the map.
+    """
+    return dict(_statistics(str(path), os.stat(path).st_mtime_ns))
+
+
+def tile_levels(width, height):
+    """
+    Returns the number of tile levels, the last level shows the whole map in a single tile.
+    """
+    levels = 1
+    while max(width, height) > TILE_SIZE * 2 ** (levels - 1):
+        levels += 1
+    return levels
+
+
+def read_window(flux, e_min, e_max, u_min, u_max, factor=1):
+    """
+    Reads a rectangular window of a flux density map and scales it down by averaging blocks of pixels.
+
+    Parameters
+    ----------
+    flux : np.ndarray
+        The flux density map, usually memory mapped.
+    e_min, e_max : int
+        The first column of the window and the column after its last one.
+    u_min, u_max : int
+        The first row of the window and the row after its last one.
+    factor : int
+        Every block of factor x factor pixels becomes a single value. Blocks at the edges of the window
+        that are cut off are averaged over the pixels inside the window.
+
+    Returns
+    -------
+    np.ndarray
+        The window as array of shape (ceil((u_max - u_min) / factor), ceil((e_max - e_min) / factor)).
+    """
+
+    columns = np.arange(0, e_max - e_min, factor)
+    column_counts = np.diff(np.append(columns, e_max - e_min))
+    window = np.empty((-(-(u_max - u_min) // factor), len(columns)))
+
+    # Whole blocks of rows are read at once, as many as fit into the read size
+    step = factor * max(1, READ_SIZE // (factor * max(1, e_max - e_min)))
+    for start in range(u_min, u_max, step):
+        stripe = np.asarray(
+            flux[start : min(start + step, u_max), e_min:e_max], dtype=np.float64
+        )
+        rows = np.arange(0, len(stripe), factor)
+        sums = np.add.reduceat(np.add.reduceat(stripe, columns, axis=1), rows, axis=0)
+        counts = np.outer(np.diff(np.append(rows, len(stripe))), column_counts)
+        first = (start - u_min) // factor
+        window[first : first + len(rows)] = sums / counts
+    return window
+
+
+def read_tile(flux, level, column, row):
+    """
+    Reads a tile of a flux density map.
+
+    On level 0 a tile covers TILE_SIZE x TILE_SIZE pixels of the map, every further level halves the resolution.
+    Columns are counted along e and rows along u, starting at the lower left corner of the map.
+
+    Returns
+    -------
+    np.ndarray or None
+        The tile, smaller than TILE_SIZE at the upper and right edge of the map, or None if it's outside of the map.
+    """
+
+    factor = 2**level
+    height, width = flux.shape
+    e_min, u_min = column * TILE_SIZE * factor, row * TILE_SIZE * factor
+    if e_min >= width or u_min >= height:
+        return None
+    return read_window(
+        flux,
+        e_min,
+        min(e_min + TILE_SIZE * factor, width),
+        u_min,
+        min(u_min + TILE_SIZE * factor, height),
+        factor,
+    )
+
+
+def _png_chunk(kind, data):
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def encode_png(values, maximum):
+    """
+    Encodes a part of a flux density map as PNG image with the colors of the palette.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The flux densities, the first row is the lower edge and becomes the last row of the image.
+    maximum : float
+        The flux density shown with the brightest color, higher values are clipped.
+
+    Returns
+    -------
+    bytes
+        The PNG file.
+    """
+
+    scaled = values / maximum * 255 if maximum > 0 else np.zeros_like(values)
+    pixels = np.round(np.clip(scaled, 0, 255)).astype(np.uint8)[::-1]
+    height, width = pixels.shape
+
+    # Every row of the image starts with the type of its filter, 0 leaves the row unchanged
+    rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels])
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+        + _png_chunk(b"PLTE", PALETTE.tobytes())
+        + _png_chunk(b"IDAT", zlib.compress(rows.tobytes()))
+        + _png_chunk(b"IEND", b"")
+    )
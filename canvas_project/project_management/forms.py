@@ -1,4 +1,4 @@
-from django.forms import ModelForm
+from django.forms import FileField, ModelForm
 from .models import Project
 
 
@@ -22,3 +22,19 @@ class UpdateProjectForm(ModelForm):
         super().__init__(*args, **kwargs)
         self.fields["name"].widget.attrs.update({"class": "form-control"})
         self.fields["description"].widget.attrs.update({"class": "form-control"})
+
+
+class ImportProjectForm(ModelForm):
+    scenario = FileField()
+
+    class Meta:
+        model = Project
+        fields = ["name", "description"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["name"].widget.attrs.update({"class": "form-control"})
+        self.fields["description"].widget.attrs.update({"class": "form-control"})
+        self.fields["scenario"].widget.attrs.update(
+            {"class": "form-control", "accept": ".h5,.hdf5"}
+        )
@@ -0,0 +1,104 @@
+"""
+Generators for heliostat field layouts.
+
+All positions are computed in the ground plane of the editor, where x points north, z points east and y points up.
+"""
+
+import numpy as np
+
+RADIAL_STAGGERED = "radial_staggered"
+CORNFIELD = "cornfield"
+FERMAT_SPIRAL = "fermat_spiral"
+
+PATTERNS = [RADIAL_STAGGERED, CORNFIELD, FERMAT_SPIRAL]
+
+# Divergence angle of the sunflower pattern the biomimetic layout is based on
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+
+def generate_layout(
+    pattern,
+    tower=(0.0, 0.0),
+    min_radius=50.0,
+    max_radius=300.0,
+    spacing=10.0,
+    spiral_exponent=0.65,
+    exclusion_zones=(),
+):
+    """
+    Computes the heliostat positions of a field layout around a tower.
+
+    Parameters
+    ----------
+    pattern : str
+        One of PATTERNS, the layout pattern to use.
+    tower : tuple of float
+        The x and z coordinates of the tower the field is centered on.
+    min_radius : float
+        The minimal distance of a heliostat to the tower.
+    max_radius : float
+        The maximal distance of a heliostat to the tower.
+    spacing : float
+        The distance between neighbouring heliostats, for the radial staggered layout also the distance between the rings.
+        For the Fermat spiral this is the distance at the inner edge of the field, it grows to the outside.
+    spiral_exponent : float
+        The exponent of the radius of the Fermat spiral, 0.5 gives a uniform density, bigger values spread the outer heliostats.
+    exclusion_zones : iterable of tuple of float
+        Circles given as (x, z, radius) where no heliostat may be placed.
+
+    Returns
+    -------
+    np.ndarray
+        The positions as array of shape (n, 3) with the x, y and z coordinates.
+    """
+
+    if pattern == RADIAL_STAGGERED:
+        radius, angle = _radial_staggered(min_radius, max_radius, spacing)
+    elif pattern == CORNFIELD:
+        radius, angle = _cornfield(max_radius, spacing)
+    elif pattern == FERMAT_SPIRAL:
+        radius, angle = _fermat_spiral(min_radius, max_radius, spacing, spiral_exponent)
+    else:
+        raise ValueError(f"Unknown layout pattern {pattern}")
+
+    x = tower[0] + radius * np.cos(angle)
+    z = tower[1] + radius * np.sin(angle)
+
+    keep = (radius >= min_radius) & (radius <= max_radius)
+    for zone_x, zone_z, zone_radius in exclusion_zones:
+        keep &= (x - zone_x) ** 2 + (z - zone_z) ** 2 > zone_radius**2
+
+    return np.column_stack([x[keep], np.zeros(np.count_nonzero(keep)), z[keep]])
+
+
+def _radial_staggered(min_radius, max_radius, spacing):
+    ring_radii = np.arange(min_radius, max_radius + spacing / 2, spacing)
+    ring_sizes = np.floor(2 * np.pi * ring_radii / spacing).astype(int)
+
+    # Index of every heliostat inside its ring
+    ring = np.repeat(np.arange(len(ring_radii)), ring_sizes)
+    ring_start = np.repeat(np.cumsum(ring_sizes) - ring_sizes, ring_sizes)
+    index = np.arange(ring_sizes.sum()) - ring_start
+
+    # Every second ring is rotated by half a step, so the heliostats don't block each other
+    step = 2 * np.pi / ring_sizes[ring]
+    angle = (index + 0.5 * (ring % 2)) * step
+    return ring_radii[ring], angle
+
+
+def _cornfield(max_radius, spacing):
+    coordinates = np.arange(-max_radius, max_radius + spacing / 2, spacing)
+    x, z = np.meshgrid(coordinates, coordinates)
+    x, z = x.ravel(), z.ravel()
+    return np.hypot(x, z), np.arctan2(z, x)
+
+
+def _fermat_spiral(min_radius, max_radius, spacing, exponent):
+    # radius(n) = a * n ** exponent, a is chosen to get the requested spacing at the inner edge of the field
+    reference = max(min_radius, spacing)
+    a = reference / (2 * np.pi * exponent * reference**2 / spacing**2) ** exponent
+
+    first = int(np.ceil((min_radius / a) ** (1 / exponent)))
+    last = int(np.floor((max_radius / a) ** (1 / exponent)))
+    n = np.arange(max(first, 1), last + 1)
+    return a * n**exponent, n * GOLDEN_ANGLE
@@ -0,0 +1,139 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from project_management.benchmark import (
+    compare,
+    create_field,
+    environment,
+    run_scenarios,
+)
+from project_management.scenario import scenario_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the time and queries of the slow requests on generated fields in a separate SQLite database. "
+        "Store a report with --output and pass it as --baseline to later runs on the same machine to find regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[100, 10000, 100000],
+            help="Numbers of heliostats of the generated fields.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Measurements of every scenario, the median is reported.",
+        )
+        parser.add_argument(
+            "--scenarios", nargs="+", help="Only measures the given scenarios."
+        )
+        parser.add_argument("--output", help="Writes the report as JSON to this file.")
+        parser.add_argument(
+            "--baseline", help="Compares the results with the report in this file."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Fraction the median time may grow compared to the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text())["results"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.run(Path(directory), options)
+
+        report = {"environment": environment(), "results": results}
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2))
+
+        self.stdout.write(
+            f"{'scenario':<24}{'heliostats':>12}{'median ms':>12}{'queries':>9}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<24}{result['heliostats']:>12}{result['median_ms']:>12.1f}{result['queries']:>9}"
+            )
+
+        if baseline is not None:
+            self.report_comparison(compare(results, baseline, options["tolerance"]))
+
+    def run(self, directory, options):
+        """
+        Measures all sizes with a database and media files in the given directory, the real data is never touched.
+        """
+        connection.settings_dict["TEST"]["NAME"] = str(directory / "benchmark.sqlite3")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        old_scenario_directory = scenario_cache.directory
+        scenario_cache.directory = directory / "scenarios"
+        caches = {
+            **settings.CACHES,
+            settings.PROJECT_CACHE: {
+                **settings.CACHES[settings.PROJECT_CACHE],
+                "LOCATION": str(directory / "projects"),
+            },
+        }
+        try:
+            with override_settings(
+                MEDIA_ROOT=str(directory / "media"),
+                CACHES=caches,
+                METRICS_ROOT=str(directory / "metrics"),
+                PREVIEW_UPLOAD_INTERVAL=0,
+            ):
+                user = User.objects.create_user("benchmark", password="benchmark")
+                client = Client()
+                client.force_login(user)
+
+                results = []
+                for size in options["sizes"]:
+                    self.stderr.write(f"Generating a field with {size} heliostats")
+                    project = create_field(user, f"benchmark {size} heliostats", size)
+                    try:
+                        results += run_scenarios(
+                            client, project, options["repeat"], options["scenarios"]
+                        )
+                    except RuntimeError as error:
+                        raise CommandError(str(error)) from error
+                return results
+        finally:
+            scenario_cache.directory = old_scenario_directory
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report_comparison(self, comparison):
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'scenario':<24}{'heliostats':>12}{'baseline ms':>13}{'change':>9}{'queries':>12}"
+        )
+        for result in comparison:
+            line = (
+                f"{result['scenario']:<24}{result['heliostats']:>12}{result['baseline_median_ms']:>13.1f}"
+                f"{result['change']:>+9.0%}{result['baseline_queries']:>6} -> {result['queries']:<4}"
+            )
+            self.stdout.write(self.style.ERROR(line) if result["regressed"] else line)
+
+        regressions = sum(result["regressed"] for result in comparison)
+        if regressions:
+            raise CommandError(
+                f"{regressions} scenarios got slower or need more queries than in the baseline."
+            )
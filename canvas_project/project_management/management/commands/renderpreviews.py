@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from project_management.models import Project
+from project_management.previews import LAYOUT_SUFFIX, render_layout_preview
+
+
+class Command(BaseCommand):
+    help = "Draws the plan of the field as preview of every project without a preview from the editor."
+
+    def handle(self, *args, **options):
+        projects = Project.objects.filter(
+            Q(preview="") | Q(preview__endswith=LAYOUT_SUFFIX + ".png")
+        ).values_list("pk", flat=True)
+        count = 0
+        for project_id in projects.iterator():
+            render_layout_preview(project_id)
+            count += 1
+        self.stdout.write(f"Drew the previews of {count} projects.")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_management', '0014_alter_heliostat_name_alter_lightsource_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='preview',
+            field=models.ImageField(upload_to='project_previews/'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project_management', '0015_project_revision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='heliostat',
+            index=models.Index(fields=['project', 'id'], name='heliostat_project_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='heliostat',
+            index=models.Index(fields=['project', 'name'], name='heliostat_project_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='heliostat',
+            index=models.Index(fields=['project', 'position_x'], name='heliostat_project_x_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='heliostat',
+            index=models.Index(fields=['project', 'kinematic_type', 'id'], name='heliostat_kinematic_idx'),
+        ),
+    ]
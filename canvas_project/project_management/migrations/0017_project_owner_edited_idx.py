@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project_management", "0016_heliostat_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["owner", "-last_edited", "-id"], name="project_owner_edited_idx"
+            ),
+        ),
+    ]
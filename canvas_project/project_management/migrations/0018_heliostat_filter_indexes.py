@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:53
+
+from django.db import migrations, models
+
+
+def analyze_heliostats(apps, schema_editor):
+    # Without statistics SQLite prefers the id index and filters row by row while paging
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("ANALYZE project_management_heliostat")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project_management", "0017_project_owner_edited_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="heliostat",
+            name="heliostat_project_name_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="heliostat",
+            name="heliostat_project_x_idx",
+        ),
+        migrations.AddIndex(
+            model_name="heliostat",
+            index=models.Index(
+                fields=["project", "name", "id"], name="heliostat_name_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="heliostat",
+            index=models.Index(
+                fields=["project", "position_x", "id"], name="heliostat_x_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="heliostat",
+            index=models.Index(
+                fields=["project", "position_z", "id"], name="heliostat_z_id_idx"
+            ),
+        ),
+        migrations.RunPython(analyze_heliostats, migrations.RunPython.noop),
+    ]
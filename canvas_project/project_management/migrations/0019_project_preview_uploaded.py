@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("project_management", "0018_heliostat_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="preview_uploaded",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import posixpath
+
+from django.db import connection, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 
@@ -15,10 +18,21 @@ class Project(models.Model):
         upload_to="project_previews/",
     )
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Increased on every change of the project's content
+    revision = models.PositiveBigIntegerField(default=0)
+    # Time of the last accepted preview upload, shared by all server processes to throttle the uploads
+    preview_uploaded = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         # Make each combination of owner and project name unique
         unique_together = [["name", "owner"]]
+        indexes = [
+            # The overview lists the projects of a user, the last edited first
+            models.Index(
+                fields=["owner", "-last_edited", "-id"],
+                name="project_owner_edited_idx",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -28,6 +42,111 @@ class Project(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    @staticmethod
+    def bump_revision(project_id):
+        """
+        Increases the revision of the project with the given id, directly in the database to not lose concurrent updates.
+
+        Returns
+        -------
+        int or None
+            The new revision, or None if the project doesn't exist.
+        """
+        # The updated row stays locked until the transaction ends, so the revision read is the one written
+        with transaction.atomic():
+            Project.objects.filter(pk=project_id).update(revision=F("revision") + 1)
+            return (
+                Project.objects.filter(pk=project_id)
+                .values_list("revision", flat=True)
+                .first()
+            )
+
+    @staticmethod
+    def free_name(owner, name, suffix="copy"):
+        """
+        Appends the suffix to the name as often as needed until no project of the owner has this name.
+
+        All names that could be taken are fetched with a single query.
+
+        Parameters
+        ----------
+        owner : User
+            The user the name has to be unique for.
+        name : str
+            The name that is preferred.
+        suffix : str
+            The suffix appended to taken names.
+
+        Returns
+        -------
+        str
+            The first free name.
+        """
+        taken = set(
+            Project.objects.filter(owner=owner, name__startswith=name).values_list(
+                "name", flat=True
+            )
+        )
+        while name in taken:
+            name += suffix
+        return name
+
+    def duplicate(self, name):
+        """
+        Copies the project with its heliostats, receivers, light sources, settings and preview in a single transaction.
+
+        The objects are copied inside the database with one INSERT ... SELECT per table, so the number of
+        queries doesn't depend on the size of the project and no objects are loaded into Python.
+        The copy gets its own preview file, as the file of a project is deleted together with it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the copy, it has to be unused by the projects of the owner.
+
+        Returns
+        -------
+        Project
+            The copy of the project.
+        """
+
+        with transaction.atomic():
+            copy = Project.objects.create(
+                name=name,
+                description=self.description,
+                last_edited=self.last_edited,
+                favorite=self.favorite,
+                owner=self.owner,
+            )
+            if self.preview:
+                copy.preview.name = self._copy_preview(copy)
+                Project.objects.filter(pk=copy.pk).update(preview=copy.preview.name)
+            # The settings of the copy were created together with it
+            settings = Settings.objects.filter(project=self).values().first()
+            if settings is not None:
+                Settings.objects.filter(project=copy).update(
+                    **{column: settings[column] for column in _copied_columns(Settings)}
+                )
+            for model in (Heliostat, Receiver, Lightsource):
+                _copy_rows(model, self.pk, copy.pk)
+        return copy
+
+    def _copy_preview(self, copy):
+        """
+        Copies the preview file for the given copy of the project, returns the name of the new file or "" if it's missing.
+        """
+        storage = self.preview.storage
+        # Previews are named after the project and the hash of their contents, the hash stays the same
+        filename = posixpath.basename(self.preview.name)
+        prefix = f"{self.pk}-"
+        rest = filename[len(prefix) :] if filename.startswith(prefix) else filename
+        name = self.preview.field.generate_filename(copy, f"{copy.pk}-{rest}")
+        try:
+            with storage.open(self.preview.name, "rb") as source:
+                return storage.save(name, source)
+        except FileNotFoundError:
+            return ""
+
 
 class Heliostat(models.Model):
     """
@@ -57,6 +176,27 @@ class Heliostat(models.Model):
     kinematic_type = models.CharField(max_length=300, default="ideal")
 
     # actuator config -> anhand von kinematic type einfach festgelegt?
+
+    class Meta:
+        # Support paging and filtering the heliostats of a project, pages are ordered by id, so every filter
+        # is followed by the id to find the next page in the index. The height is not indexed, it hardly varies in a field.
+        indexes = [
+            models.Index(fields=["project", "id"], name="heliostat_project_id_idx"),
+            models.Index(
+                fields=["project", "name", "id"], name="heliostat_name_id_idx"
+            ),
+            models.Index(
+                fields=["project", "position_x", "id"], name="heliostat_x_id_idx"
+            ),
+            models.Index(
+                fields=["project", "position_z", "id"], name="heliostat_z_id_idx"
+            ),
+            models.Index(
+                fields=["project", "kinematic_type", "id"],
+                name="heliostat_kinematic_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return str(self.project) + " Heliostat " + str(self.pk)
 
@@ -129,3 +269,32 @@ class Settings(models.Model):
 
     def __str__(self) -> str:
         return str(self.project) + " Settings"
+
+
+def _copied_columns(model):
+    """
+    Returns the columns of a model that are copied with a project, the primary key and the project are left out.
+    """
+    return [
+        field.column
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != "project"
+    ]
+
+
+def _copy_rows(model, source_id, target_id):
+    """
+    Copies all rows of a model belonging to the source project to the target project with a single query.
+    """
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in _copied_columns(model))
+    table = quote(model._meta.db_table)
+    project = quote(model._meta.get_field("project").column)
+    with connection.cursor() as cursor:
+        # Ordered by the primary key, so the copies keep the order of the originals
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}, {project}) "
+            f"SELECT {columns}, %s FROM {table} WHERE {project} = %s "
+            f"ORDER BY {quote(model._meta.pk.column)}",
+            [target_id, source_id],
+        )
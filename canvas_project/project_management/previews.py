@@ -0,0 +1,134 @@
+"""
+Stores the preview images of projects.
+
+Previews are either rendered by the editor in the browser or drawn on the server as top-down plan of the field.
+Both are named after the hash of their contents, so browsers can cache them forever.
+"""
+
+import hashlib
+
+import numpy as np
+from django.core.files.base import ContentFile
+
+from canvas.background import BackgroundWorker
+from .models import Project
+from .raster import encode_png, render_layout
+from .thumbnails import delete_thumbnails, schedule_thumbnails
+
+# Appended to the names of the previews drawn on the server
+LAYOUT_SUFFIX = "-layout"
+
+
+def store_preview(project, file, suffix="", if_unchanged=False):
+    """
+    Replaces the preview of a project, unless the new preview has the same contents.
+
+    Parameters
+    ----------
+    project : Project
+        The project, its preview is the one that is replaced.
+    file : File
+        The new preview as PNG file.
+    suffix : str
+        Appended to the name of the preview, tells where it comes from.
+    if_unchanged : bool
+        Only replaces the preview if it wasn't replaced by someone else since the project was loaded.
+
+    Returns
+    -------
+    bool
+        If the preview changed.
+    """
+
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+
+    # The name is derived from the contents, so browsers can keep the file forever
+    name = project.preview.field.generate_filename(
+        project, f"{project.pk}-{digest.hexdigest()[:32]}{suffix}.png"
+    )
+    if project.preview.name == name:
+        return False
+
+    storage = project.preview.storage
+    if not storage.exists(name):
+        name = storage.save(name, file)
+    projects = Project.objects.filter(pk=project.pk)
+    if if_unchanged:
+        projects = projects.filter(preview=project.preview.name)
+    if not projects.update(preview=name):
+        # The newer preview is kept
+        if not Project.objects.filter(preview=name).exists():
+            storage.delete(name)
+        return False
+    schedule_thumbnails(storage, name)
+
+    # Copies made before duplicates got their own preview files may still show the old preview
+    old = project.preview.name
+    if old and not Project.objects.filter(preview=old).exists():
+        storage.delete(old)
+        delete_thumbnails(storage, old)
+
+    project.preview.name = name
+    return True
+
+
+def has_layout_preview(project):
+    """
+    Returns if the project has no preview or one drawn on the server, which can be replaced by a new plan.
+    """
+    return not project.preview or project.preview.name.endswith(LAYOUT_SUFFIX + ".png")
+
+
+def render_layout_preview(project_id):
+    """
+    Draws the plan of the field of a project and stores it as preview.
+
+    Previews rendered by the editor show more details, so they are kept and only replaced by the editor.
+
+    Parameters
+    ----------
+    project_id : int
+        The id of the project.
+    """
+
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None or not has_layout_preview(project):
+        return
+
+    heliostats = np.array(
+        project.heliostats.values_list(
+            "position_x", "position_y", "position_z", "number_of_facets"
+        ),
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    receivers = np.array(
+        project.receivers.values_list("position_x", "position_y", "position_z"),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+
+    # Empty projects keep the placeholder of the overview
+    if len(heliostats) == 0 and len(receivers) == 0:
+        return
+
+    image = render_layout(heliostats[:, :3], heliostats[:, 3], receivers)
+    # The editor may have uploaded a preview while the plan was drawn
+    store_preview(
+        project,
+        ContentFile(encode_png(image), name="preview.png"),
+        LAYOUT_SUFFIX,
+        if_unchanged=True,
+    )
+
+
+def schedule_layout_preview(project_id):
+    """
+    Draws the plan of a project in the background, if the project has no preview rendered by the editor.
+
+    Projects changed several times before the plan is drawn are only drawn once.
+    """
+    layout_worker.schedule(project_id, render_layout_preview, project_id)
+
+
+layout_worker = BackgroundWorker("layout previews")
@@ -0,0 +1,124 @@
+"""
+Draws a top-down plan of a heliostat field without a browser, used as preview of projects nobody opened in the editor yet.
+
+The plan shows north at the top and east on the right, positions are given in the coordinates of the editor,
+where x points north and z points east. Everything is drawn with array operations over all heliostats at once.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+from .validation import mirror_half_extents
+
+BACKGROUND_COLOR = (233, 236, 239)
+HELIOSTAT_COLOR = (13, 110, 253)
+RECEIVER_COLOR = (220, 53, 69)
+
+# Radius of the receiver markers in pixels
+RECEIVER_RADIUS = 6
+
+# Upper bound for the half size of a heliostat in pixels, limits the work for fields with very few heliostats
+MAX_HELIOSTAT_RADIUS = 8
+
+
+def _stamp(image, rows, columns, radii, color, round_shape=False):
+    """
+    Fills a square or disk with the given radius in pixels around every center.
+    """
+    reach = int(np.ceil(radii.max(initial=0)))
+    height, width = image.shape[:2]
+    for row_offset in range(-reach, reach + 1):
+        for column_offset in range(-reach, reach + 1):
+            if round_shape:
+                inside = np.hypot(row_offset, column_offset) <= radii
+            else:
+                inside = max(abs(row_offset), abs(column_offset)) <= radii
+            target_rows = rows[inside] + row_offset
+            target_columns = columns[inside] + column_offset
+            visible = (
+                (target_rows >= 0)
+                & (target_rows < height)
+                & (target_columns >= 0)
+                & (target_columns < width)
+            )
+            image[target_rows[visible], target_columns[visible]] = color
+
+
+def render_layout(
+    heliostats, number_of_facets, receivers, width=640, height=360, margin=0.05
+):
+    """
+    Draws the heliostats and receivers seen from above, scaled so the whole field fits into the image.
+
+    Parameters
+    ----------
+    heliostats : np.ndarray
+        The positions of the heliostats as array of shape (n, 3) in the coordinates of the editor.
+    number_of_facets : np.ndarray
+        The number of facets of every heliostat, determines the size of its mirror.
+    receivers : np.ndarray
+        The positions of the receivers as array of shape (m, 3).
+    width, height : int
+        The size of the image in pixels.
+    margin : float
+        The part of the image left empty at every border.
+
+    Returns
+    -------
+    np.ndarray
+        The image as array of shape (height, width, 3) with values from 0 to 255.
+    """
+
+    heliostats = np.asarray(heliostats, dtype=np.float64).reshape(-1, 3)
+    receivers = np.asarray(receivers, dtype=np.float64).reshape(-1, 3)
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND_COLOR
+
+    points = np.vstack([heliostats, receivers])
+    if len(points) == 0:
+        return image
+
+    # East is drawn to the right and north to the top
+    east, north = points[:, 2], points[:, 0]
+    center_east = (east.min() + east.max()) / 2
+    center_north = (north.min() + north.max()) / 2
+    # Single objects or rows of them still get a sensible scale
+    span_east = max(east.max() - east.min(), 1.0)
+    span_north = max(north.max() - north.min(), 1.0)
+    scale = min(
+        width * (1 - 2 * margin) / span_east, height * (1 - 2 * margin) / span_north
+    )
+
+    def to_pixels(positions):
+        columns = np.round((positions[:, 2] - center_east) * scale + width / 2)
+        rows = np.round(height / 2 - (positions[:, 0] - center_north) * scale)
+        return rows.astype(np.int64), columns.astype(np.int64)
+
+    half_width = np.broadcast_to(
+        mirror_half_extents(number_of_facets)[0], len(heliostats)
+    )
+    _stamp(
+        image,
+        *to_pixels(heliostats),
+        np.clip(half_width * scale, 0, MAX_HELIOSTAT_RADIUS),
+        HELIOSTAT_COLOR,
+    )
+    _stamp(
+        image,
+        *to_pixels(receivers),
+        np.full(len(receivers), RECEIVER_RADIUS),
+        RECEIVER_COLOR,
+        round_shape=True,
+    )
+    return image
+
+
+def encode_png(image):
+    """
+    Encodes an image array as PNG file.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,240 @@
+"""
+Ray tracer computing the flux density on a receiver, created by all heliostats of a field reflecting the sun.
+
+All vectors are given in the coordinate system of the editor, where x points north, y points up and z points east.
+The heliostats are processed in chunks, all rays of a chunk are traced at once without any Python loop over them.
+"""
+
+import numpy as np
+
+from .validation import mirror_half_extents
+
+UP = np.array([0.0, 1.0, 0.0])
+
+# Upper bound for the number of rays traced at once, limits the memory used to a few hundred megabytes
+DEFAULT_CHUNK_SIZE = 2**19
+# Upper bound for the number of rays per heliostat, more rays are clamped so every heliostat fits into a chunk
+MAX_NUMBER_OF_RAYS = 100000
+
+
+def sun_direction(azimuth, elevation):
+    """
+    Computes the unit vector pointing from the field towards the sun.
+
+    Parameters
+    ----------
+    azimuth : float
+        The angle of the sun in degrees, measured clockwise from north, 90 degrees is east.
+    elevation : float
+        The angle of the sun above the horizon in degrees.
+
+    Returns
+    -------
+    np.ndarray
+        The direction as vector of length 1.
+    """
+
+    azimuth, elevation = np.radians(azimuth), np.radians(elevation)
+    return np.array(
+        [
+            np.cos(elevation) * np.cos(azimuth),
+            np.sin(elevation),
+            np.cos(elevation) * np.sin(azimuth),
+        ]
+    )
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _plane_axes(normals):
+    """
+    Returns two unit vectors spanning the planes with the given normals, the first one is horizontal.
+    """
+
+    first = np.cross(normals, UP)
+    # Planes facing straight up or down have no horizontal direction of their own
+    flat = np.linalg.norm(first, axis=-1) < 1e-9
+    first[flat] = [0.0, 0.0, 1.0]
+    first = _normalize(first)
+    return first, np.cross(first, normals)
+
+
+def trace_flux(
+    positions,
+    aim_points,
+    number_of_facets,
+    receiver,
+    sun,
+    number_of_rays=100,
+    mean=0.0,
+    covariance=4.3681e-06,
+    dni=1000.0,
+    seed=0,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    report=None,
+):
+    """
+    Traces rays from the sun over all heliostats onto a planar receiver and bins them into a flux density map.
+
+    Every heliostat is aligned with ideal kinematics, so its mirror normal halves the angle between the sun and its aim point.
+    The rays start at uniformly sampled points of the mirror and come from directions around the sun, deviating by
+    normally distributed angles. Shading and blocking between the heliostats are not considered.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        The centers of the heliostat mirrors as array of shape (n, 3).
+    aim_points : np.ndarray
+        The aim points of the heliostats as array of shape (n, 3).
+    number_of_facets : np.ndarray
+        The number of facets of every heliostat, determines the size of its mirror.
+    receiver : dict
+        The receiver with the keys position, normal, plane_e, plane_u, resolution_e and resolution_u.
+    sun : np.ndarray
+        The unit vector pointing towards the sun.
+    number_of_rays : int
+        The number of rays traced per heliostat, clamped to the range from 1 to MAX_NUMBER_OF_RAYS.
+    mean : float
+        The mean of the angular deviation of the sun rays in radians.
+    covariance : float
+        The variance of the angular deviation of the sun rays in square radians.
+    dni : float
+        The direct normal irradiance of the sun in W/m².
+    seed : int
+        The seed of the random numbers, the same inputs and seed always give the same flux map.
+    chunk_size : int
+        The maximal number of rays traced at once.
+    report : callable or None
+        Called after every chunk with the fraction of traced heliostats and the flux density map traced so far.
+
+    Returns
+    -------
+    np.ndarray
+        The flux density in W/m² as array of shape (resolution_u, resolution_e), the first row is the lower edge.
+    """
+
+    # The light source of a project may ask for any number of rays, not only the validated job parameters
+    number_of_rays = min(max(int(number_of_rays), 1), MAX_NUMBER_OF_RAYS)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    aim_points = np.asarray(aim_points, dtype=np.float64).reshape(-1, 3)
+    sun = _normalize(np.asarray(sun, dtype=np.float64))
+    rng = np.random.default_rng(seed)
+
+    center = np.asarray(receiver["position"], dtype=np.float64)
+    receiver_normal = _normalize(np.asarray(receiver["normal"], dtype=np.float64))
+    receiver_e, receiver_u = _plane_axes(receiver_normal[None])
+    receiver_e, receiver_u = receiver_e[0], receiver_u[0]
+    plane_e, plane_u = receiver["plane_e"], receiver["plane_u"]
+    resolution_e, resolution_u = receiver["resolution_e"], receiver["resolution_u"]
+
+    # Ideal kinematics: the mirror normal is the bisector of the directions to the sun and to the aim point
+    normals = _normalize(sun + _normalize(aim_points - positions))
+    mirror_e, mirror_u = _plane_axes(normals)
+    half_width, half_height = mirror_half_extents(number_of_facets)
+    half_width = np.broadcast_to(half_width, len(positions))
+    half_height = np.broadcast_to(half_height, len(positions))
+
+    # Every ray carries an equal part of the power reflected by its heliostat
+    cosine = np.clip(normals @ sun, 0.0, None)
+    ray_power = dni * 4 * half_width * half_height * cosine / number_of_rays
+
+    # Axes orthogonal to the sun direction along which the sun rays deviate
+    sun_e, sun_u = _plane_axes(sun[None])
+    sigma = np.sqrt(covariance)
+
+    pixel_area = (plane_e / resolution_e) * (plane_u / resolution_u)
+    flux = np.zeros(resolution_e * resolution_u)
+    heliostats_per_chunk = max(1, chunk_size // number_of_rays)
+    for start in range(0, len(positions), heliostats_per_chunk):
+        chunk = slice(start, start + heliostats_per_chunk)
+        count = len(positions[chunk])
+
+        # Origins on the mirror surfaces, shape (heliostats, rays, 3)
+        offset_e = rng.uniform(-1, 1, (count, number_of_rays)) * half_width[chunk, None]
+        offset_u = (
+            rng.uniform(-1, 1, (count, number_of_rays)) * half_height[chunk, None]
+        )
+        origins = (
+            positions[chunk, None]
+            + offset_e[..., None] * mirror_e[chunk, None]
+            + offset_u[..., None] * mirror_u[chunk, None]
+        )
+
+        # Directions of the incoming sun rays
+        deviation_e = rng.normal(mean, sigma, (count, number_of_rays, 1))
+        deviation_u = rng.normal(mean, sigma, (count, number_of_rays, 1))
+        incoming = -_normalize(sun + deviation_e * sun_e + deviation_u * sun_u)
+
+        # Reflection at the mirror
+        chunk_normals = normals[chunk, None]
+        reflected = (
+            incoming
+            - 2
+            * np.sum(incoming * chunk_normals, axis=-1, keepdims=True)
+            * chunk_normals
+        )
+
+        # Intersection with the front side of the receiver plane
+        facing = reflected @ receiver_normal
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distance = ((center - origins) @ receiver_normal) / facing
+        valid = (facing < 0) & (distance > 0)
+        hits = origins + distance[..., None] * reflected - center
+
+        # Binning into the pixels of the receiver
+        column = np.floor((hits @ receiver_e / plane_e + 0.5) * resolution_e)
+        row = np.floor((hits @ receiver_u / plane_u + 0.5) * resolution_u)
+        valid &= (column >= 0) & (column < resolution_e)
+        valid &= (row >= 0) & (row < resolution_u)
+
+        pixels = row[valid].astype(np.int64) * resolution_e + column[valid].astype(
+            np.int64
+        )
+        power = np.broadcast_to(ray_power[chunk, None], valid.shape)[valid]
+        flux += np.bincount(pixels, weights=power, minlength=flux.size)
+
+        if report is not None:
+            report(
+                min(start + count, len(positions)) / len(positions),
+                (flux / pixel_area).reshape(resolution_u, resolution_e),
+            )
+
+    return (flux / pixel_area).reshape(resolution_u, resolution_e)
+
+
+def flux_preview(flux, size=32):
+    """
+    Scales a flux density map down to at most size x size pixels, used to show the progress of a simulation.
+
+    Parameters
+    ----------
+    flux : np.ndarray
+        The flux density map.
+    size : int
+        The maximal width and height of the preview.
+
+    Returns
+    -------
+    dict
+        The width, the height, the maximal flux density and the pixels as row major list of values from 0 to 255.
+    """
+
+    rows, columns = flux.shape
+    factor_u, factor_e = -(-rows // size), -(-columns // size)
+    height, width = -(-rows // factor_u), -(-columns // factor_e)
+
+    # Every preview pixel is the mean of a block of pixels, the last blocks are filled up with zeros
+    padded = np.zeros((height * factor_u, width * factor_e))
+    padded[:rows, :columns] = flux
+    blocks = padded.reshape(height, factor_u, width, factor_e).mean(axis=(1, 3))
+
+    maximum = float(blocks.max(initial=0))
+    scaled = blocks / maximum * 255 if maximum > 0 else blocks
+    return {
+        "width": width,
+        "height": height,
+        "maximum": maximum,
+        "values": np.round(scaled).astype(np.uint8).ravel().tolist(),
+    }
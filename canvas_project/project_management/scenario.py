@@ -0,0 +1,654 @@
+"""
+Conversion between CANVAS projects and ARTIST scenario files (HDF5).
+"""
+
+import itertools
+import os
+
+import h5py
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from canvas.background import BackgroundWorker
+from canvas.file_cache import LRUFileCache
+from .models import Heliostat, Project, Receiver, Lightsource
+
+# Keys of the ARTIST scenario file format
+VERSION = "version"
+POWER_PLANT_KEY = "power_plant"
+POWER_PLANT_POSITION = "position"
+PROTOTYPE_KEY = "prototypes"
+RECEIVER_KEY = "receivers"
+RECEIVER_TYPE = "type"
+RECEIVER_POSITION_CENTER = "position_center"
+RECEIVER_NORMAL_VECTOR = "normal_vector"
+RECEIVER_PLANE_E = "plane_e"
+RECEIVER_PLANE_U = "plane_u"
+RECEIVER_RESOLUTION_E = "resolution_e"
+RECEIVER_RESOLUTION_U = "resolution_u"
+RECEIVER_CURVATURE_E = "curvature_e"
+RECEIVER_CURVATURE_U = "curvature_u"
+LIGHTSOURCE_KEY = "lightsources"
+LIGHTSOURCE_TYPE = "type"
+LIGHTSOURCE_NUMBER_OF_RAYS = "number_of_rays"
+LIGHTSOURCE_DISTRIBUTION_PARAMETERS = "distribution_parameters"
+LIGHTSOURCE_DISTRIBUTION_TYPE = "distribution_type"
+LIGHTSOURCE_MEAN = "mean"
+LIGHTSOURCE_COVARIANCE = "covariance"
+HELIOSTAT_KEY = "heliostats"
+HELIOSTAT_ID = "id"
+HELIOSTAT_NAME = "name"
+HELIOSTAT_POSITION = "position"
+HELIOSTAT_AIM_POINT = "aim_point"
+HELIOSTAT_NUMBER_OF_FACETS = "number_of_facets"
+HELIOSTAT_KINEMATIC_TYPE = "kinematic_type"
+SURFACE_KEY = "surface"
+FACETS_KEY = "facets"
+
+SCENARIO_VERSION = 1.0
+
+# CANVAS has no plant location yet, so the location of the Juelich solar tower is used like in the ARTIST examples
+DEFAULT_POWER_PLANT_POSITION = [50.91342112, 6.38782476, 87.0]
+
+# Reference scenario containing the surface, kinematic and actuator prototypes shared by all heliostats
+PROTOTYPE_SOURCE = os.path.join(
+    settings.BASE_DIR, "static/artist/test_scenario_alignment_optimization.h5"
+)
+
+# Number of heliostats read from the database and written to the file at once
+BATCH_SIZE = 4096
+
+scenario_cache = LRUFileCache(
+    settings.SCENARIO_CACHE_DIR, settings.SCENARIO_CACHE_MAX_SIZE
+)
+
+# Writes the scenarios in the layout of ARTIST, which is too slow for big fields to do in a request
+scenario_worker = BackgroundWorker("scenario exports")
+
+
+def to_enu(x, y, z):
+    """
+    Converts coordinates of the editor (x north, y up, z east) into east, north, up coordinates used by ARTIST.
+
+    Parameters
+    ----------
+    x, y, z : float or np.ndarray
+        The coordinates in the editor coordinate system.
+
+    Returns
+    -------
+    tuple
+        The east, north and up coordinates.
+    """
+    return z, x, y
+
+
+def from_enu(e, n, u):
+    """
+    Converts east, north, up coordinates used by ARTIST into coordinates of the editor (x north, y up, z east).
+
+    Parameters
+    ----------
+    e, n, u : float or np.ndarray
+        The east, north and up coordinates.
+
+    Returns
+    -------
+    tuple
+        The coordinates in the editor coordinate system.
+    """
+    return n, u, e
+
+
+class InvalidScenarioError(Exception):
+    """
+    Raised if a file can't be read as an ARTIST scenario.
+    """
+
+
+def write_scenario(project, file, batch_size=BATCH_SIZE, columnar=True):
+    """
+    Writes the given project as an ARTIST scenario into the given file.
+
+    By default the heliostats are stored column wise in chunked and compressed datasets, a layout specific to CANVAS
+    that is fast to write and read for big fields. The layout of ARTIST gives every heliostat a group with its id,
+    position and aim point, the number of facets and the kinematic type are kept as attributes of the group. Creating
+    a group takes about a millisecond, so big fields take minutes in this layout. In both layouts the heliostats are
+    read from the database batch by batch, so the memory usage does not depend on the size of the field.
+
+    Parameters
+    ----------
+    project : Project
+        The project that gets exported.
+    file : str or file-like object
+        The path or the binary file object the scenario is written to.
+    batch_size : int
+        The number of heliostats read from the database and written to the file at once.
+    columnar : bool
+        Writes the heliostats in the column wise layout of CANVAS, otherwise with one group per heliostat like ARTIST.
+    """
+
+    with h5py.File(file, "w") as scenario:
+        scenario.attrs[VERSION] = SCENARIO_VERSION
+
+        scenario.create_dataset(
+            f"{POWER_PLANT_KEY}/{POWER_PLANT_POSITION}",
+            data=np.array(DEFAULT_POWER_PLANT_POSITION, dtype=np.float64),
+        )
+
+        with h5py.File(PROTOTYPE_SOURCE, "r") as prototypes:
+            prototypes.copy(PROTOTYPE_KEY, scenario)
+
+        _write_receivers(scenario.create_group(RECEIVER_KEY), project)
+        _write_lightsources(scenario.create_group(LIGHTSOURCE_KEY), project)
+        if columnar:
+            _write_heliostat_columns(
+                scenario.create_group(HELIOSTAT_KEY), project, batch_size
+            )
+        else:
+            # The groups are kept in the order of the ids instead of sorted by name
+            _write_heliostat_groups(
+                scenario.create_group(HELIOSTAT_KEY, track_order=True),
+                project,
+                batch_size,
+            )
+
+
+def read_scenario(file, project, batch_size=BATCH_SIZE):
+    """
+    Adds all heliostats, receivers and light sources of the given ARTIST scenario to the project.
+
+    Heliostats are read in chunks and inserted batch by batch, so the memory usage does not depend on the size of the field.
+    Both the column wise heliostat layout written by CANVAS and the layout with one group per heliostat used by ARTIST are supported.
+    Should be called inside a transaction, so a broken file doesn't leave a partially imported project behind.
+
+    Parameters
+    ----------
+    file : str or file-like object
+        The path or the binary file object the scenario is read from.
+    project : Project
+        The project the objects are added to.
+    batch_size : int
+        The number of heliostats read from the file and inserted into the database at once.
+
+    Raises
+    ------
+    InvalidScenarioError
+        If the file is no HDF5 file or is missing required datasets.
+    """
+
+    try:
+        with h5py.File(file, "r") as scenario:
+            _read_receivers(scenario.get(RECEIVER_KEY, {}), project)
+            _read_lightsources(scenario.get(LIGHTSOURCE_KEY, {}), project)
+
+            heliostats = scenario.get(HELIOSTAT_KEY, {})
+            if HELIOSTAT_POSITION in heliostats:
+                _read_heliostat_columns(heliostats, project, batch_size)
+            else:
+                _read_heliostat_groups(scenario, heliostats, project, batch_size)
+    # Datasets where groups are expected fail with AttributeError, groups where datasets are expected with TypeError
+    except (OSError, KeyError, TypeError, ValueError, AttributeError) as error:
+        raise InvalidScenarioError(str(error)) from error
+
+
+def cached_scenario(project, columnar=True):
+    """
+    Returns the path of the scenario file of the project, it is only generated if the project changed since the last export.
+
+    Parameters
+    ----------
+    project : Project
+        The project that gets exported.
+    columnar : bool
+        Returns the scenario with the column wise heliostat layout of CANVAS, otherwise with the layout of ARTIST,
+        see write_scenario.
+
+    Returns
+    -------
+    Path
+        The path of the cached scenario file.
+    """
+    layout = _layout(columnar)
+    key = _cache_key(project, columnar)
+    path = scenario_cache.get(key)
+    if path is not None:
+        return path
+
+    # Scenarios of older revisions are never requested again
+    scenario_cache.discard(f"{project.pk}-*.{layout}.h5")
+
+    # Read all heliostats from the same snapshot of the database
+    with transaction.atomic():
+        return scenario_cache.put(
+            key, lambda file: write_scenario(project, file, columnar=columnar)
+        )
+
+
+def artist_scenario(project):
+    """
+    Returns the path of the scenario file of the project with the heliostat layout of ARTIST, if it was already written.
+
+    Otherwise the file is written by a background thread, as it takes minutes for big fields, and None is returned.
+
+    Parameters
+    ----------
+    project : Project
+        The project that gets exported.
+
+    Returns
+    -------
+    Path or None
+        The path of the cached scenario file, or None if it is still being written.
+    """
+    path = scenario_cache.get(_cache_key(project, columnar=False))
+    if path is None:
+        scenario_worker.schedule(project.pk, _write_artist_scenario, project.pk)
+    return path
+
+
+def _write_artist_scenario(project_id):
+    # The project may have changed while the export was waiting
+    project = Project.objects.filter(pk=project_id).first()
+    if project is not None:
+        cached_scenario(project, columnar=False)
+
+
+def _layout(columnar):
+    return "columns" if columnar else "groups"
+
+
+def _cache_key(project, columnar):
+    return f"{project.pk}-{project.revision}.{_layout(columnar)}.h5"
+
+
+def read_field(file):
+    """
+    Reads the objects of a scenario written by CANVAS in the columnar layout as arrays in the coordinate system of the editor,
+    used by jobs.
+
+    Parameters
+    ----------
+    file : str or file-like object
+        The path or the binary file object of the scenario.
+
+    Returns
+    -------
+    dict
+        The heliostat ids, positions, aim points and numbers of facets as arrays under the keys
+        ids, positions, aim_points and number_of_facets, and the receivers and light sources as lists of dicts.
+    """
+
+    with h5py.File(file, "r") as scenario:
+        heliostats = scenario[HELIOSTAT_KEY]
+        positions = heliostats[HELIOSTAT_POSITION][:, :3].astype(np.float64)
+        aim_points = heliostats[HELIOSTAT_AIM_POINT][:, :3].astype(np.float64)
+
+        receivers = []
+        for name, group in scenario.get(RECEIVER_KEY, {}).items():
+            receivers.append(
+                {
+                    "name": name,
+                    "position": np.array(
+                        from_enu(*group[RECEIVER_POSITION_CENTER][:3]),
+                        dtype=np.float64,
+                    ),
+                    # Normals are entered as east, north, up vectors like in ARTIST
+                    "normal": np.array(
+                        from_enu(*group[RECEIVER_NORMAL_VECTOR][:3]),
+                        dtype=np.float64,
+                    ),
+                    "plane_e": float(group[RECEIVER_PLANE_E][()]),
+                    "plane_u": float(group[RECEIVER_PLANE_U][()]),
+                    "resolution_e": int(group[RECEIVER_RESOLUTION_E][()]),
+                    "resolution_u": int(group[RECEIVER_RESOLUTION_U][()]),
+                }
+            )
+
+        lightsources = []
+        for name, group in scenario.get(LIGHTSOURCE_KEY, {}).items():
+            distribution = group[LIGHTSOURCE_DISTRIBUTION_PARAMETERS]
+            lightsources.append(
+                {
+                    "name": name,
+                    "number_of_rays": int(group[LIGHTSOURCE_NUMBER_OF_RAYS][()]),
+                    "mean": float(distribution[LIGHTSOURCE_MEAN][()]),
+                    "covariance": float(distribution[LIGHTSOURCE_COVARIANCE][()]),
+                }
+            )
+
+        return {
+            "ids": heliostats[HELIOSTAT_ID][()],
+            "positions": np.column_stack(from_enu(*positions.T)),
+            "aim_points": np.column_stack(from_enu(*aim_points.T)),
+            "number_of_facets": heliostats[HELIOSTAT_NUMBER_OF_FACETS][()],
+            "receivers": receivers,
+            "lightsources": lightsources,
+        }
+
+
+def sort_heliostats(field):
+    """
+    Orders the heliostats of a field read by read_field by their position, aim point and number of facets.
+
+    Fields with the same heliostats then have identical arrays, regardless of the ids and the order of creation.
+
+    Parameters
+    ----------
+    field : dict
+        The field as returned by read_field.
+
+    Returns
+    -------
+    dict
+        A copy of the field with the heliostat arrays in the canonical order.
+    """
+
+    keys = [
+        field["ids"],
+        field["number_of_facets"],
+        *field["aim_points"].T[::-1],
+        *field["positions"].T[::-1],
+    ]
+    # lexsort uses the last key as primary key, the ids only decide between identical heliostats
+    order = np.lexsort(keys)
+    return {
+        **field,
+        **{
+            key: field[key][order]
+            for key in ("ids", "positions", "aim_points", "number_of_facets")
+        },
+    }
+
+
+def _unique_key(group, name, pk):
+    """
+    Returns the name as key for a subgroup, or appends the pk if the name is empty or already taken.
+    """
+    if name and name not in group:
+        return name
+    return f"{name}_{pk}"
+
+
+def _write_receivers(group, project):
+    for receiver in project.receivers.order_by("id"):
+        receiver_group = group.create_group(
+            _unique_key(group, receiver.name, receiver.pk)
+        )
+        receiver_group[RECEIVER_TYPE] = "planar"
+        receiver_group[RECEIVER_POSITION_CENTER] = np.array(
+            [
+                *to_enu(receiver.position_x, receiver.position_y, receiver.position_z),
+                1.0,
+            ],
+            dtype=np.float32,
+        )
+        receiver_group[RECEIVER_NORMAL_VECTOR] = np.array(
+            [receiver.normal_x, receiver.normal_y, receiver.normal_z, 0.0],
+            dtype=np.float32,
+        )
+        receiver_group[RECEIVER_PLANE_E] = np.float32(receiver.plane_e)
+        receiver_group[RECEIVER_PLANE_U] = np.float32(receiver.plane_u)
+        receiver_group[RECEIVER_RESOLUTION_E] = np.int64(receiver.resolution_e)
+        receiver_group[RECEIVER_RESOLUTION_U] = np.int64(receiver.resolution_u)
+        receiver_group[RECEIVER_CURVATURE_E] = np.float32(receiver.curvature_e)
+        receiver_group[RECEIVER_CURVATURE_U] = np.float32(receiver.curvature_u)
+
+
+def _write_lightsources(group, project):
+    for lightsource in project.lightsources.order_by("id"):
+        lightsource_group = group.create_group(
+            _unique_key(group, lightsource.name, lightsource.pk)
+        )
+        lightsource_group[LIGHTSOURCE_TYPE] = lightsource.lightsource_type
+        lightsource_group[LIGHTSOURCE_NUMBER_OF_RAYS] = np.int64(
+            lightsource.number_of_rays
+        )
+        distribution = lightsource_group.create_group(
+            LIGHTSOURCE_DISTRIBUTION_PARAMETERS
+        )
+        distribution[LIGHTSOURCE_DISTRIBUTION_TYPE] = lightsource.distribution_type
+        distribution[LIGHTSOURCE_MEAN] = np.float64(lightsource.mean)
+        distribution[LIGHTSOURCE_COVARIANCE] = np.float64(lightsource.covariance)
+
+
+def _heliostat_rows(project, batch_size):
+    return (
+        project.heliostats.order_by("id")
+        .values_list(
+            "id",
+            "name",
+            "position_x",
+            "position_y",
+            "position_z",
+            "aimpoint_x",
+            "aimpoint_y",
+            "aimpoint_z",
+            "number_of_facets",
+            "kinematic_type",
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+
+def _write_heliostat_groups(group, project, batch_size):
+    rows = _heliostat_rows(project, batch_size)
+    while batch := list(itertools.islice(rows, batch_size)):
+        columns = list(zip(*batch))
+        coordinates = np.array(columns[2:8], dtype=np.float32)
+        homogeneous = np.ones(len(batch), dtype=np.float32)
+        positions = np.column_stack([*to_enu(*coordinates[0:3]), homogeneous])
+        aim_points = np.column_stack([*to_enu(*coordinates[3:6]), homogeneous])
+
+        for index, (pk, name, *_, facets, kinematic_type) in enumerate(batch):
+            heliostat_group = group.create_group(_unique_key(group, name, pk))
+            heliostat_group[HELIOSTAT_ID] = np.int64(pk)
+            heliostat_group[HELIOSTAT_POSITION] = positions[index]
+            heliostat_group[HELIOSTAT_AIM_POINT] = aim_points[index]
+            # Attributes aren't read by ARTIST, the prototypes define the surface and kinematic there
+            heliostat_group.attrs[HELIOSTAT_NUMBER_OF_FACETS] = np.int64(facets)
+            heliostat_group.attrs[HELIOSTAT_KINEMATIC_TYPE] = kinematic_type
+
+
+def _write_heliostat_columns(group, project, batch_size):
+    heliostats = project.heliostats.order_by("id")
+    count = heliostats.count()
+    chunk = max(1, min(count, batch_size))
+
+    def create(name, dtype, columns=None):
+        shape = (count,) if columns is None else (count, columns)
+        chunks = (chunk,) if columns is None else (chunk, columns)
+        maxshape = (None,) + shape[1:]
+        return group.create_dataset(
+            name,
+            shape=shape,
+            maxshape=maxshape,
+            dtype=dtype,
+            chunks=chunks,
+            compression="gzip",
+        )
+
+    datasets = ids, names, positions, aim_points, facets, kinematics = (
+        create(HELIOSTAT_ID, np.int64),
+        create(HELIOSTAT_NAME, h5py.string_dtype()),
+        create(HELIOSTAT_POSITION, np.float32, 4),
+        create(HELIOSTAT_AIM_POINT, np.float32, 4),
+        create(HELIOSTAT_NUMBER_OF_FACETS, np.int64),
+        create(HELIOSTAT_KINEMATIC_TYPE, h5py.string_dtype()),
+    )
+
+    rows = _heliostat_rows(project, batch_size)
+
+    start = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        end = start + len(batch)
+        # Heliostats might have been added since counting them
+        if end > count:
+            count = end
+            for dataset in datasets:
+                dataset.resize(count, axis=0)
+
+        columns = list(zip(*batch))
+        coordinates = np.array(columns[2:8], dtype=np.float32)
+        homogeneous = np.ones(len(batch), dtype=np.float32)
+
+        ids[start:end] = columns[0]
+        names[start:end] = columns[1]
+        positions[start:end] = np.column_stack(
+            [*to_enu(*coordinates[0:3]), homogeneous]
+        )
+        aim_points[start:end] = np.column_stack(
+            [*to_enu(*coordinates[3:6]), homogeneous]
+        )
+        facets[start:end] = columns[8]
+        kinematics[start:end] = columns[9]
+        start = end
+
+    # Heliostats might have been deleted since counting them
+    for dataset in datasets:
+        dataset.resize(start, axis=0)
+
+
+def _read_string(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _read_optional(group, key, default):
+    return float(group[key][()]) if key in group else default
+
+
+def _read_receivers(group, project):
+    receivers = []
+    for name, receiver_group in group.items():
+        x, y, z = from_enu(*receiver_group[RECEIVER_POSITION_CENTER][:3])
+        normal = receiver_group[RECEIVER_NORMAL_VECTOR][:3]
+        receivers.append(
+            Receiver(
+                project=project,
+                name=name,
+                position_x=float(x),
+                position_y=float(y),
+                position_z=float(z),
+                normal_x=float(normal[0]),
+                normal_y=float(normal[1]),
+                normal_z=float(normal[2]),
+                plane_e=float(receiver_group[RECEIVER_PLANE_E][()]),
+                plane_u=float(receiver_group[RECEIVER_PLANE_U][()]),
+                resolution_e=int(receiver_group[RECEIVER_RESOLUTION_E][()]),
+                resolution_u=int(receiver_group[RECEIVER_RESOLUTION_U][()]),
+                # Curvatures are optional in ARTIST scenarios
+                curvature_e=_read_optional(receiver_group, RECEIVER_CURVATURE_E, 0.0),
+                curvature_u=_read_optional(receiver_group, RECEIVER_CURVATURE_U, 0.0),
+            )
+        )
+    Receiver.objects.bulk_create(receivers)
+
+
+def _read_lightsources(group, project):
+    lightsources = []
+    for name, lightsource_group in group.items():
+        distribution = lightsource_group[LIGHTSOURCE_DISTRIBUTION_PARAMETERS]
+        lightsources.append(
+            Lightsource(
+                project=project,
+                name=name,
+                lightsource_type=_read_string(lightsource_group[LIGHTSOURCE_TYPE][()]),
+                number_of_rays=int(lightsource_group[LIGHTSOURCE_NUMBER_OF_RAYS][()]),
+                distribution_type=_read_string(
+                    distribution[LIGHTSOURCE_DISTRIBUTION_TYPE][()]
+                ),
+                mean=float(distribution[LIGHTSOURCE_MEAN][()]),
+                covariance=float(distribution[LIGHTSOURCE_COVARIANCE][()]),
+            )
+        )
+    Lightsource.objects.bulk_create(lightsources)
+
+
+def _read_heliostat_columns(group, project, batch_size):
+    positions = group[HELIOSTAT_POSITION]
+    aim_points = group[HELIOSTAT_AIM_POINT]
+    names = group.get(HELIOSTAT_NAME)
+    facets = group.get(HELIOSTAT_NUMBER_OF_FACETS)
+    kinematics = group.get(HELIOSTAT_KINEMATIC_TYPE)
+
+    for start in range(0, len(positions), batch_size):
+        end = start + batch_size
+        x, y, z = from_enu(*positions[start:end, :3].T)
+        aim_x, aim_y, aim_z = from_enu(*aim_points[start:end, :3].T)
+        count = len(x)
+        batch_names = names[start:end] if names is not None else [None] * count
+        batch_facets = facets[start:end] if facets is not None else [None] * count
+        batch_kinematics = (
+            kinematics[start:end] if kinematics is not None else [None] * count
+        )
+
+        heliostats = []
+        for i in range(count):
+            attributes = {}
+            if batch_names[i] is not None:
+                attributes["name"] = _read_string(batch_names[i])
+            if batch_facets[i] is not None:
+                attributes["number_of_facets"] = int(batch_facets[i])
+            if batch_kinematics[i] is not None:
+                attributes["kinematic_type"] = _read_string(batch_kinematics[i])
+            heliostats.append(
+                Heliostat(
+                    project=project,
+                    position_x=float(x[i]),
+                    position_y=float(y[i]),
+                    position_z=float(z[i]),
+                    aimpoint_x=float(aim_x[i]),
+                    aimpoint_y=float(aim_y[i]),
+                    aimpoint_z=float(aim_z[i]),
+                    **attributes,
+                )
+            )
+        Heliostat.objects.bulk_create(heliostats)
+
+
+def _read_heliostat_groups(scenario, group, project, batch_size):
+    # Heliostats without an own surface use the facets of the surface prototype
+    prototype_facets = scenario.get(f"{PROTOTYPE_KEY}/{SURFACE_KEY}/{FACETS_KEY}")
+    default_facets = (
+        len(prototype_facets)
+        if prototype_facets is not None
+        else Heliostat._meta.get_field("number_of_facets").default
+    )
+
+    names = iter(group.keys())
+    while batch := list(itertools.islice(names, batch_size)):
+        heliostats = []
+        for name in batch:
+            heliostat_group = group[name]
+            x, y, z = from_enu(*heliostat_group[HELIOSTAT_POSITION][:3])
+            aim_x, aim_y, aim_z = from_enu(*heliostat_group[HELIOSTAT_AIM_POINT][:3])
+            own_facets = heliostat_group.get(f"{SURFACE_KEY}/{FACETS_KEY}")
+            attributes = heliostat_group.attrs
+            if HELIOSTAT_NUMBER_OF_FACETS in attributes:
+                # Written by CANVAS
+                number_of_facets = int(attributes[HELIOSTAT_NUMBER_OF_FACETS])
+            elif own_facets is not None:
+                number_of_facets = len(own_facets)
+            else:
+                number_of_facets = default_facets
+            optional = {}
+            if HELIOSTAT_KINEMATIC_TYPE in attributes:
+                optional["kinematic_type"] = _read_string(
+                    attributes[HELIOSTAT_KINEMATIC_TYPE]
+                )
+            heliostats.append(
+                Heliostat(
+                    project=project,
+                    name=name,
+                    position_x=float(x),
+                    position_y=float(y),
+                    position_z=float(z),
+                    aimpoint_x=float(aim_x),
+                    aimpoint_y=float(aim_y),
+                    aimpoint_z=float(aim_z),
+                    number_of_facets=number_of_facets,
+                    **optional,
+                )
+            )
+        Heliostat.objects.bulk_create(heliostats)
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Project
+from .thumbnails import delete_thumbnails
+
+
+@receiver(post_delete, sender=Project)
+def delete_preview_thumbnails(sender, instance, **kwargs):
+    """
+    Deletes the thumbnails of the preview of a deleted project, the preview itself is deleted by django_cleanup.
+    """
+    # Copies made before duplicates got their own preview files may still show the preview
+    name = instance.preview.name
+    if name and not Project.objects.filter(preview=name).exists():
+        delete_thumbnails(instance.preview.storage, instance.preview.name)
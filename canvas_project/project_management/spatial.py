@@ -0,0 +1,406 @@
+"""
+Spatial index of the heliostats of a project, answering range, nearest neighbour and proximity queries.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from .models import Heliostat
+
+# Edge length of a grid cell in meters, about the size of a heliostat and its surrounding space
+DEFAULT_CELL_SIZE = 10.0
+
+# Number of heliostat pairs compared at once by the proximity query
+PAIR_BLOCK_SIZE = 2**18
+
+# Number of project indexes kept per process
+MAX_CACHED_INDEXES = 32
+
+
+class HeliostatGrid:
+    """
+    Uniform grid over the ground plane (x and z), every cell holds the ids of the heliostats inside it.
+
+    Queries only visit the cells overlapping the queried region, so their cost depends on the size of the region
+    and the number of results but not on the size of the field. Distances are measured in all three dimensions.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.positions = {}
+        # Range of occupied cells, only grows so it stays valid when heliostats are removed
+        self.bounds = None
+        # Queries and updates may come from different request threads
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell(self, x, z):
+        return math.floor(x / self.cell_size), math.floor(z / self.cell_size)
+
+    def insert(self, heliostat_id, x, y, z):
+        """
+        Adds the heliostat to the grid or moves it to the given position if it is already part of it.
+        """
+        with self.lock:
+            self.remove(heliostat_id)
+            self.positions[heliostat_id] = (x, y, z)
+            i, k = self._cell(x, z)
+            self.cells[(i, k)].add(heliostat_id)
+            if self.bounds is None:
+                self.bounds = (i, i, k, k)
+            else:
+                min_i, max_i, min_k, max_k = self.bounds
+                self.bounds = (
+                    min(min_i, i),
+                    max(max_i, i),
+                    min(min_k, k),
+                    max(max_k, k),
+                )
+
+    def remove(self, heliostat_id):
+        """
+        Removes the heliostat from the grid, unknown ids are ignored.
+        """
+        with self.lock:
+            position = self.positions.pop(heliostat_id, None)
+            if position is None:
+                return
+            cell = self._cell(position[0], position[2])
+            self.cells[cell].discard(heliostat_id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def _clamped_cell(self, x, z):
+        """
+        Returns the cell of a point, moved into the range of occupied cells, the point may be infinitely far away.
+        """
+        min_i, max_i, min_k, max_k = self.bounds
+        indexes = []
+        for value, lowest, highest in [(x, min_i, max_i), (z, min_k, max_k)]:
+            if math.isinf(value):
+                indexes.append(lowest if value < 0 else highest)
+            else:
+                index = math.floor(value / self.cell_size)
+                indexes.append(min(max(index, lowest), highest))
+        return tuple(indexes)
+
+    def _distance(self, heliostat_id, x, y, z):
+        px, py, pz = self.positions[heliostat_id]
+        return math.sqrt((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2)
+
+    def in_box(self, minimum, maximum):
+        """
+        Returns the ids of all heliostats inside the axis aligned box.
+
+        Parameters
+        ----------
+        minimum : tuple of float
+            The minimal x, y and z coordinates of the box.
+        maximum : tuple of float
+            The maximal x, y and z coordinates of the box.
+
+        Returns
+        -------
+        list of int
+            The ids of the heliostats inside the box, sorted ascending.
+        """
+        with self.lock:
+            if not self.positions:
+                return []
+            # Cells outside of the field are empty, so unbounded boxes only visit the field
+            min_i, min_k = self._clamped_cell(minimum[0], minimum[2])
+            max_i, max_k = self._clamped_cell(maximum[0], maximum[2])
+
+            # Big boxes are cheaper to answer by visiting the occupied cells only
+            if (max_i - min_i + 1) * (max_k - min_k + 1) > len(self.cells):
+                cells = [
+                    ids
+                    for (i, k), ids in self.cells.items()
+                    if min_i <= i <= max_i and min_k <= k <= max_k
+                ]
+            else:
+                cells = [
+                    self.cells[(i, k)]
+                    for i in range(min_i, max_i + 1)
+                    for k in range(min_k, max_k + 1)
+                    if (i, k) in self.cells
+                ]
+
+            result = []
+            for ids in cells:
+                for heliostat_id in ids:
+                    position = self.positions[heliostat_id]
+                    if all(
+                        minimum[axis] <= position[axis] <= maximum[axis]
+                        for axis in range(3)
+                    ):
+                        result.append(heliostat_id)
+            return sorted(result)
+
+    def nearest(self, x, y, z, k):
+        """
+        Returns the k heliostats closest to the given point.
+
+        The cells of the field are searched in growing rings around the point, starting with the first ring
+        that reaches the field, until no unvisited cell can contain a closer heliostat. Once the rings visited
+        more cells than are occupied, e.g. in very sparse fields, all heliostats are compared instead.
+
+        Returns
+        -------
+        list of tuple
+            Pairs of heliostat id and distance, sorted by the distance.
+        """
+        with self.lock:
+            if k <= 0 or not self.positions:
+                return []
+
+            center_i, center_k = self._cell(x, z)
+            min_i, max_i, min_k, max_k = self.bounds
+            # Rings closer to the point than the field are empty
+            first_ring = max(
+                min_i - center_i,
+                center_i - max_i,
+                min_k - center_k,
+                center_k - max_k,
+                0,
+            )
+            # Beyond this ring there are no occupied cells anymore
+            last_ring = max(
+                abs(center_i - min_i),
+                abs(center_i - max_i),
+                abs(center_k - min_k),
+                abs(center_k - max_k),
+            )
+
+            candidates = []
+            visited = 0
+            for ring in range(first_ring, last_ring + 1):
+                for cell in self._ring_cells(center_i, center_k, ring):
+                    visited += 1
+                    for heliostat_id in self.cells.get(cell, ()):
+                        candidates.append(
+                            (self._distance(heliostat_id, x, y, z), heliostat_id)
+                        )
+
+                # Every heliostat in the next ring is at least this far away
+                if len(candidates) >= k:
+                    best = heapq.nsmallest(k, candidates)
+                    if best[-1][0] <= ring * self.cell_size:
+                        break
+
+                if visited > len(self.cells):
+                    candidates = [
+                        (self._distance(heliostat_id, x, y, z), heliostat_id)
+                        for heliostat_id in self.positions
+                    ]
+                    break
+
+            return [
+                (heliostat_id, distance)
+                for distance, heliostat_id in heapq.nsmallest(k, candidates)
+            ]
+
+    def _ring_cells(self, center_i, center_k, ring):
+        """
+        Yields the cells on the border of the square ring around the center cell that lie within the bounds of the field.
+        """
+        min_i, max_i, min_k, max_k = self.bounds
+        first_k = max(center_k - ring, min_k)
+        last_k = min(center_k + ring, max_k)
+        for i in range(max(center_i - ring, min_i), min(center_i + ring, max_i) + 1):
+            if abs(i - center_i) == ring:
+                for k in range(first_k, last_k + 1):
+                    yield i, k
+            else:
+                # Only the two ends of the row, the inside was visited before
+                for k in {center_k - ring, center_k + ring}:
+                    if min_k <= k <= max_k:
+                        yield i, k
+
+    def iter_pairs_within(self, distance):
+        """
+        Yields all pairs of heliostats closer to each other than the given distance, in no particular order.
+
+        The heliostats of two cells are compared in blocks of at most PAIR_BLOCK_SIZE pairs, so even cells
+        holding thousands of stacked heliostats only need a bounded amount of memory at once.
+
+        Yields
+        ------
+        tuple
+            The two heliostat ids, the smaller one first, and their distance.
+        """
+        with self.lock:
+            # The queries may take a while, the grid can be changed meanwhile
+            cells = {}
+            for cell, ids in self.cells.items():
+                ids = np.array(sorted(ids), dtype=np.int64)
+                positions = np.array(
+                    [self.positions[heliostat_id] for heliostat_id in ids.tolist()],
+                    dtype=np.float64,
+                ).reshape(-1, 3)
+                cells[cell] = (ids, positions)
+
+        reach = math.ceil(distance / self.cell_size)
+        # Every pair of cells is only compared once
+        offsets = [
+            (di, dk)
+            for di in range(0, reach + 1)
+            for dk in range(-reach, reach + 1)
+            if di > 0 or dk > 0
+        ]
+
+        for (i, k), cell in cells.items():
+            yield from _close_pairs(cell, cell, distance, same=True)
+            for di, dk in offsets:
+                neighbours = cells.get((i + di, k + dk))
+                if neighbours is not None:
+                    yield from _close_pairs(cell, neighbours, distance)
+
+    def pairs_within(self, distance, limit=None):
+        """
+        Returns the pairs of heliostats closer to each other than the given distance.
+
+        Parameters
+        ----------
+        distance : float
+            The distance the heliostats of a pair are closer than.
+        limit : int, optional
+            The maximal number of pairs, the search stops once it found this many. Fields with more pairs
+            return an arbitrary selection of them.
+
+        Returns
+        -------
+        list of tuple
+            Triples of the two heliostat ids, the smaller one first, and their distance, sorted by the ids.
+        """
+        return sorted(itertools.islice(self.iter_pairs_within(distance), limit))
+
+
+def _close_pairs(first, second, distance, same=False):
+    """
+    Yields the pairs of heliostats of two cells closer than the distance, cells are tuples of the ids and positions.
+
+    If both cells are the same, every pair is only yielded once.
+    """
+    first_ids, first_positions = first
+    second_ids, second_positions = second
+    rows = max(1, PAIR_BLOCK_SIZE // len(second_ids))
+    for start in range(0, len(first_ids), rows):
+        block = first_positions[start : start + rows]
+        # Within a cell the heliostats before the block were already paired with it
+        offset = start + 1 if same else 0
+        squared = sum(
+            (block[:, None, axis] - second_positions[None, offset:, axis]) ** 2
+            for axis in range(3)
+        )
+        close = squared < distance**2
+        if same:
+            close &= np.arange(len(block))[:, None] < np.arange(
+                1, len(second_ids) - start
+            )
+        rows_found, columns_found = np.nonzero(close)
+        firsts = first_ids[start + rows_found]
+        seconds = second_ids[offset + columns_found]
+        yield from zip(
+            np.minimum(firsts, seconds).tolist(),
+            np.maximum(firsts, seconds).tolist(),
+            np.sqrt(squared[rows_found, columns_found]).tolist(),
+        )
+
+
+class HeliostatIndexRegistry:
+    """
+    Keeps the spatial indexes of recently used projects in memory, each one tagged with the revision it represents.
+
+    Writes through the API apply their changes to an existing index if it represents the previous revision.
+    Any other revision, e.g. because another process changed the project, causes the index to be rebuilt on the next query.
+    """
+
+    def __init__(self, max_size=MAX_CACHED_INDEXES):
+        self.max_size = max_size
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, project):
+        """
+        Returns the spatial index of the given project, it is built from the database if there is no up to date one.
+
+        Parameters
+        ----------
+        project : Project
+            The project the index is needed for, its revision decides if a cached index is up to date.
+
+        Returns
+        -------
+        HeliostatGrid
+            The index of the project, it must not be modified.
+        """
+        with self.lock:
+            cached = self.indexes.get(project.pk)
+            if cached is not None and cached[0] == project.revision:
+                self.indexes.move_to_end(project.pk)
+                return cached[1]
+
+        grid = HeliostatGrid()
+        for heliostat_id, x, y, z in Heliostat.objects.filter(
+            project_id=project.pk
+        ).values_list("id", "position_x", "position_y", "position_z"):
+            grid.insert(heliostat_id, x, y, z)
+
+        with self.lock:
+            self.indexes[project.pk] = (project.revision, grid)
+            self.indexes.move_to_end(project.pk)
+            while len(self.indexes) > self.max_size:
+                self.indexes.popitem(last=False)
+        return grid
+
+    def update(self, project_id, revision, changed=(), removed=()):
+        """
+        Applies the changes that lead to the given revision to the cached index of the project.
+
+        Parameters
+        ----------
+        project_id : int
+            The id of the changed project.
+        revision : int or None
+            The revision of the project after the changes, None if the project doesn't exist anymore.
+        changed : iterable of Heliostat
+            Heliostats that were created or moved.
+        removed : iterable of int
+            Ids of deleted heliostats.
+        """
+        with self.lock:
+            cached = self.indexes.get(project_id)
+            if cached is None:
+                return
+            if revision is None or cached[0] != revision - 1:
+                # Changes from elsewhere are missing, so the index can't be updated
+                del self.indexes[project_id]
+                return
+
+            grid = cached[1]
+            for heliostat_id in removed:
+                grid.remove(heliostat_id)
+            for heliostat in changed:
+                grid.insert(
+                    heliostat.pk,
+                    heliostat.position_x,
+                    heliostat.position_y,
+                    heliostat.position_z,
+                )
+            self.indexes[project_id] = (revision, grid)
+
+    def discard(self, project_id):
+        with self.lock:
+            self.indexes.pop(project_id, None)
+
+
+heliostat_indexes = HeliostatIndexRegistry()
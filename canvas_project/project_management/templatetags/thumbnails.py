@@ -0,0 +1,32 @@
+from django import template
+
+from project_management.thumbnails import schedule_thumbnails, thumbnail_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail(preview, size):
+    """
+    Returns the URL of the thumbnail of a preview with the given size.
+
+    While the thumbnail doesn't exist yet, its creation is queued and the URL of the preview itself is returned.
+
+    Parameters
+    ----------
+    preview : FieldFile
+        The preview of a project.
+    size : str
+        The name of one of the thumbnail sizes.
+
+    Returns
+    -------
+    str
+        The URL of the image.
+    """
+
+    name = thumbnail_name(preview.name, size)
+    if preview.storage.exists(name):
+        return preview.storage.url(name)
+    schedule_thumbnails(preview.storage, preview.name)
+    return preview.url
@@ -1,3 +1,794 @@
-from django.test import TestCase
+import io
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from PIL import Image
+
+import h5py
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from canvas.background import BackgroundWorker
+from . import raytracing
+from .benchmark import compare, create_field, run_scenarios
+from .forms import UpdateProjectForm
+from .layout import CORNFIELD, PATTERNS, generate_layout
+from .models import Heliostat, Project, Receiver
+from .previews import LAYOUT_SUFFIX, render_layout_preview, store_preview
+from .raster import BACKGROUND_COLOR, HELIOSTAT_COLOR, RECEIVER_COLOR, render_layout
+from .scenario import (
+    PROTOTYPE_SOURCE,
+    InvalidScenarioError,
+    cached_scenario,
+    read_field,
+    read_scenario,
+    scenario_cache,
+    scenario_worker,
+    write_scenario,
+)
+from .spatial import HeliostatGrid
+from .templatetags.thumbnails import thumbnail
+from .thumbnails import THUMBNAIL_SIZES, create_thumbnails, thumbnail_name
+from .validation import mirror_radius, validate_layout
+
+
+class LayoutTests(SimpleTestCase):
+    def distances(self, positions):
+        distances = np.linalg.norm(
+            positions[:, None, [0, 2]] - positions[None, :, [0, 2]], axis=-1
+        )
+        np.fill_diagonal(distances, np.inf)
+        return distances
+
+    def test_patterns_keep_the_radii_and_spacing(self):
+        for pattern in PATTERNS:
+            with self.subTest(pattern=pattern):
+                positions = generate_layout(
+                    pattern, tower=(5, -5), min_radius=20, max_radius=100, spacing=8
+                )
+                self.assertGreater(len(positions), 100)
+                radii = np.hypot(positions[:, 0] - 5, positions[:, 2] + 5)
+                self.assertGreaterEqual(radii.min(), 20 - 1e-9)
+                self.assertLessEqual(radii.max(), 100 + 1e-9)
+                # The spiral only keeps the spacing at its inner edge approximately
+                self.assertGreater(self.distances(positions).min(), 0.95 * 8)
+                self.assertTrue(np.all(positions[:, 1] == 0))
+
+    def test_exclusion_zones(self):
+        positions = generate_layout(
+            CORNFIELD, max_radius=100, spacing=5, exclusion_zones=[(50, 0, 20)]
+        )
+        self.assertTrue(np.all(np.hypot(positions[:, 0] - 50, positions[:, 2]) > 20))
+
+    def test_unknown_pattern(self):
+        with self.assertRaises(ValueError):
+            generate_layout("spiral galaxy")
+
+
+class ValidationTests(SimpleTestCase):
+    def brute_force_spacing(self, ids, positions, number_of_facets):
+        reach = mirror_radius(number_of_facets)
+        colliding = set()
+        for first in range(len(ids)):
+            for second in range(first + 1, len(ids)):
+                distance = math.dist(
+                    positions[first, [0, 2]], positions[second, [0, 2]]
+                )
+                if distance < reach[first] + reach[second]:
+                    colliding.update([ids[first], ids[second]])
+        return sorted(colliding)
+
+    def test_spacing(self):
+        generator = np.random.default_rng(3)
+        positions = generator.uniform(-40, 40, (300, 3))
+        number_of_facets = generator.integers(1, 10, 300)
+        ids = np.arange(1000, 1300)
+        expected = self.brute_force_spacing(ids, positions, number_of_facets)
+        for chunk_size in [7, 2**20]:
+            with patch("project_management.validation.PAIR_CHUNK_SIZE", chunk_size):
+                self.assertEqual(
+                    validate_layout(ids, positions, number_of_facets)["spacing"],
+                    expected,
+                )
+
+    def test_dense_cluster(self):
+        stacked = np.tile([[100.0, 0, 100.0]], (8000, 1))
+        neighbour = [[102.5, 0, 100.0]]
+        far = [[200.0, 0, 200.0]]
+        positions = np.vstack([stacked, neighbour, far])
+        ids = np.arange(len(positions))
+        start = time.perf_counter()
+        spacing = validate_layout(ids, positions, np.full(len(ids), 4))["spacing"]
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(spacing, list(range(8001)))
+
+    def test_towers_and_bounds(self):
+        positions = np.array([[0, 0, 12], [0, 0, 40], [0, -1, 60], [90, 0, 0]])
+        violations = validate_layout(
+            [1, 2, 3, 4],
+            positions,
+            [4] * 4,
+            towers=[(0, 0)],
+            tower_radius=10,
+            bounds={"min_y": 0, "max_x": 50},
+        )
+        self.assertEqual(violations, {"spacing": [], "tower": [1], "bounds": [3, 4]})
+
+
+class RaytracingTests(SimpleTestCase):
+    RECEIVER = {
+        "position": [0, 50, 0],
+        "normal": [-1, 0, 0],
+        "plane_e": 10,
+        "plane_u": 10,
+        "resolution_e": 16,
+        "resolution_u": 16,
+    }
+
+    def trace(self, number_of_rays):
+        return raytracing.trace_flux(
+            [[-100, 0, 0], [-120, 0, 10]],
+            [[0, 50, 0]] * 2,
+            [4, 4],
+            self.RECEIVER,
+            raytracing.sun_direction(180, 45),
+            number_of_rays=number_of_rays,
+        )
+
+    def test_flux_reaches_the_receiver(self):
+        flux = self.trace(1000)
+        self.assertEqual(flux.shape, (16, 16))
+        self.assertGreater(flux.sum(), 0)
+
+    def test_number_of_rays_is_clamped(self):
+        with patch.object(raytracing, "MAX_NUMBER_OF_RAYS", 50):
+            np.testing.assert_array_equal(self.trace(10**12), self.trace(50))
+        np.testing.assert_array_equal(self.trace(0), self.trace(1))
+
+
+class HeliostatGridTests(SimpleTestCase):
+    """
+    Compares the answers of the spatial index with comparing every heliostat.
+    """
+
+    def setUp(self):
+        generator = random.Random(42)
+        self.positions = {
+            heliostat_id: (
+                generator.uniform(-300, 300),
+                generator.uniform(0, 5),
+                generator.uniform(-300, 300),
+            )
+            for heliostat_id in range(1, 501)
+        }
+        self.grid = HeliostatGrid()
+        for heliostat_id, position in self.positions.items():
+            self.grid.insert(heliostat_id, *position)
+
+    def brute_force_box(self, minimum, maximum):
+        return sorted(
+            heliostat_id
+            for heliostat_id, position in self.positions.items()
+            if all(
+                minimum[axis] <= position[axis] <= maximum[axis] for axis in range(3)
+            )
+        )
+
+    def brute_force_nearest(self, point, k):
+        return sorted(
+            (math.dist(position, point), heliostat_id)
+            for heliostat_id, position in self.positions.items()
+        )[:k]
+
+    def test_box(self):
+        boxes = [
+            ((-50, 0, -50), (50, 5, 50)),
+            ((-1000, -1000, -1000), (1000, 1000, 1000)),
+            ((250, 0, 250), (400, 5, 400)),
+            ((1000, 0, 1000), (2000, 5, 2000)),
+        ]
+        for minimum, maximum in boxes:
+            self.assertEqual(
+                self.grid.in_box(minimum, maximum),
+                self.brute_force_box(minimum, maximum),
+            )
+
+    def test_box_with_unbounded_sides(self):
+        boxes = [
+            ((-math.inf, -math.inf, -math.inf), (math.inf, math.inf, math.inf)),
+            ((0, -math.inf, -math.inf), (math.inf, math.inf, 100)),
+            ((-math.inf, 2, 50), (-100, math.inf, math.inf)),
+            ((math.inf, -math.inf, -math.inf), (math.inf, math.inf, math.inf)),
+        ]
+        for minimum, maximum in boxes:
+            self.assertEqual(
+                self.grid.in_box(minimum, maximum),
+                self.brute_force_box(minimum, maximum),
+            )
+
+    def test_nearest(self):
+        points = [(0, 0, 0), (123.4, 1, -87.6), (299, 0, 299), (-5000, 0, 7000)]
+        for point in points:
+            for k in [1, 5, 50]:
+                expected = self.brute_force_nearest(point, k)
+                result = self.grid.nearest(*point, k)
+                self.assertEqual(
+                    [heliostat_id for heliostat_id, _ in result],
+                    [heliostat_id for _, heliostat_id in expected],
+                )
+                for (_, distance), (expected_distance, _) in zip(result, expected):
+                    self.assertAlmostEqual(distance, expected_distance)
+
+    def test_nearest_far_away_is_fast(self):
+        start = time.perf_counter()
+        result = self.grid.nearest(1e6, 0, 1e6, 1)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(result[0][0], self.brute_force_nearest((1e6, 0, 1e6), 1)[0][1])
+
+    def test_nearest_in_sparse_field(self):
+        grid = HeliostatGrid()
+        grid.insert(1, 0, 0, 0)
+        grid.insert(2, 50000, 0, 50000)
+        start = time.perf_counter()
+        self.assertEqual(grid.nearest(25000, 0, 24000, 1)[0][0], 1)
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_pairs_within(self):
+        for distance in [5, 12.5, 30]:
+            expected = sorted(
+                (
+                    first,
+                    second,
+                    math.dist(self.positions[first], self.positions[second]),
+                )
+                for first in self.positions
+                for second in self.positions
+                if first < second
+                and math.dist(self.positions[first], self.positions[second]) < distance
+            )
+            result = self.grid.pairs_within(distance)
+            self.assertEqual(
+                [pair[:2] for pair in result], [pair[:2] for pair in expected]
+            )
+            for (*_, between), (*_, expected_between) in zip(result, expected):
+                self.assertAlmostEqual(between, expected_between)
+
+    def test_pairs_of_stacked_heliostats(self):
+        grid = HeliostatGrid()
+        for heliostat_id in range(3000):
+            grid.insert(heliostat_id, 1, 0, 1)
+        start = time.perf_counter()
+        pairs = grid.pairs_within(1, limit=100)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(len(pairs), 100)
+        self.assertTrue(all(first < second for first, second, _ in pairs))
+
+        stack = HeliostatGrid()
+        for heliostat_id in range(300):
+            stack.insert(heliostat_id, 1, 0, 1)
+        self.assertEqual(len(stack.pairs_within(1)), 300 * 299 // 2)
+
+    def test_removed_heliostats_are_not_found(self):
+        self.grid.remove(1)
+        del self.positions[1]
+        point = (0, 0, 0)
+        self.assertEqual(
+            [heliostat_id for heliostat_id, _ in self.grid.nearest(*point, 10)],
+            [heliostat_id for _, heliostat_id in self.brute_force_nearest(point, 10)],
+        )
+
+    def test_empty_grid(self):
+        grid = HeliostatGrid()
+        self.assertEqual(grid.in_box((-math.inf,) * 3, (math.inf,) * 3), [])
+        self.assertEqual(grid.nearest(0, 0, 0, 3), [])
+
+
+class ScenarioTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = self.create_project("field")
+        Heliostat.objects.bulk_create(
+            Heliostat(
+                project=self.project,
+                name=f"Heliostat {index}",
+                position_x=index * 10.0,
+                position_z=-index * 5.0,
+                number_of_facets=2 + index % 3,
+                kinematic_type="ideal",
+            )
+            for index in range(7)
+        )
+
+    def create_project(self, name):
+        return Project.objects.create(
+            name=name, description="", last_edited=timezone.now(), owner=self.user
+        )
+
+    def heliostats(self, project):
+        return list(
+            project.heliostats.order_by("id").values_list(
+                "name",
+                "position_x",
+                "position_y",
+                "position_z",
+                "aimpoint_x",
+                "aimpoint_y",
+                "aimpoint_z",
+                "number_of_facets",
+                "kinematic_type",
+            )
+        )
+
+    def export(self, **options):
+        file = io.BytesIO()
+        write_scenario(self.project, file, batch_size=3, **options)
+        file.seek(0)
+        return file
+
+    def test_heliostats_have_the_layout_of_artist(self):
+        with h5py.File(PROTOTYPE_SOURCE, "r") as reference:
+            expected = {
+                name: set(group.keys())
+                for name, group in reference["heliostats"].items()
+            }
+        with h5py.File(self.export(columnar=False), "r") as scenario:
+            heliostats = scenario["heliostats"]
+            self.assertEqual(list(heliostats), [f"Heliostat {i}" for i in range(7)])
+            for group in heliostats.values():
+                self.assertEqual(set(group.keys()), next(iter(expected.values())))
+
+    def test_round_trip(self):
+        for columnar in [False, True]:
+            copy = self.create_project(f"copy {columnar}")
+            read_scenario(self.export(columnar=columnar), copy, batch_size=3)
+            self.assertEqual(self.heliostats(copy), self.heliostats(self.project))
+
+    def test_jobs_read_the_columnar_layout(self):
+        field = read_field(self.export())
+        self.assertEqual(len(field["ids"]), 7)
+        self.assertEqual(list(field["number_of_facets"]), [2, 3, 4, 2, 3, 4, 2])
+
+    def test_datasets_in_place_of_groups_are_invalid(self):
+        for path in [
+            "heliostats",
+            "heliostats/Heliostat 0",
+            "receivers",
+            "receivers/receiver",
+            "lightsources",
+        ]:
+            file = io.BytesIO()
+            with h5py.File(file, "w") as scenario:
+                scenario[path] = 1.0
+            file.seek(0)
+            with self.assertRaises(InvalidScenarioError):
+                read_scenario(file, self.create_project(path))
+
+
+class ScenarioImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        source = Project.objects.create(
+            name="source", description="", last_edited=timezone.now(), owner=self.user
+        )
+        Heliostat.objects.bulk_create(
+            Heliostat(project=source, name=f"Heliostat {index}") for index in range(4)
+        )
+        self.scenario = io.BytesIO()
+        write_scenario(source, self.scenario, columnar=False)
+
+    def upload(self, content):
+        with patch("project_management.views.schedule_layout_preview"):
+            return self.client.post(
+                "/projects/importProject",
+                {
+                    "name": "imported",
+                    "description": "Imported field",
+                    "scenario": SimpleUploadedFile("field.h5", content),
+                },
+            )
+
+    def test_import(self):
+        response = self.upload(self.scenario.getvalue())
+        self.assertEqual(response.status_code, 302)
+        project = Project.objects.get(owner=self.user, name="imported")
+        self.assertEqual(project.heliostats.count(), 4)
+
+    def test_invalid_files_create_no_project(self):
+        response = self.upload(self.scenario.getvalue()[:1000])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("scenario", response.context["import_form"].errors)
+        self.assertFalse(Project.objects.filter(name="imported").exists())
+
+
+class ScenarioDownloadTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        old_directory = scenario_cache.directory
+        scenario_cache.directory = Path(directory.name)
+        self.addCleanup(setattr, scenario_cache, "directory", old_directory)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        Heliostat.objects.bulk_create(
+            Heliostat(project=self.project, name=f"Heliostat {index}")
+            for index in range(3)
+        )
+
+    def download(self, **parameters):
+        response = self.client.get(f"/editor/{self.project.name}/hdf5", parameters)
+        content = b"".join(response.streaming_content) if response.streaming else b""
+        return response, io.BytesIO(content)
+
+    def test_columnar_by_default(self):
+        response, file = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(read_field(file)["ids"]), 3)
+
+    def test_artist_layout_is_written_in_the_background(self):
+        with patch.object(scenario_worker, "schedule") as schedule:
+            response, _ = self.download(layout="artist")
+        self.assertEqual(response.status_code, 202)
+        self.assertIn("Retry-After", response)
+        schedule.assert_called_once()
+
+        _, function, *arguments = schedule.call_args.args
+        function(*arguments)
+        response, file = self.download(layout="artist")
+        self.assertEqual(response.status_code, 200)
+        with h5py.File(file, "r") as scenario:
+            self.assertEqual(len(scenario["heliostats"]), 3)
+            self.assertIn("position", scenario["heliostats/Heliostat 0"])
+
+
+class ScenarioCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        old_directory = scenario_cache.directory
+        scenario_cache.directory = Path(directory.name)
+        self.addCleanup(setattr, scenario_cache, "directory", old_directory)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+
+    def test_scenarios_are_reused_until_the_project_changes(self):
+        path = cached_scenario(self.project)
+        with patch("project_management.scenario.write_scenario") as write:
+            self.assertEqual(cached_scenario(self.project), path)
+        write.assert_not_called()
+
+        Project.bump_revision(self.project.pk)
+        self.project.refresh_from_db()
+        new_path = cached_scenario(self.project)
+        self.assertNotEqual(new_path, path)
+        self.assertFalse(path.exists())
+
+
+class ProjectOverviewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.other = User.objects.create_user("other", password="password")
+        self.client.force_login(self.user)
+        now = timezone.now()
+        for index in range(25):
+            project = Project.objects.create(
+                name=f"field {index}",
+                description="",
+                last_edited=now - timedelta(hours=index),
+                owner=self.user,
+            )
+        Heliostat.objects.bulk_create(Heliostat(project=project) for _ in range(3))
+        Receiver.objects.create(project=project)
+        Project.objects.create(
+            name="foreign", description="", last_edited=now, owner=self.other
+        )
+
+    def names(self, response):
+        return [project.name for project in response.context["projects"]]
+
+    def test_pages_of_own_projects(self):
+        first = self.client.get("/projects/")
+        self.assertEqual(self.names(first), [f"field {index}" for index in range(20)])
+        self.assertTrue(first.context["projects"].has_next())
+
+        last = self.client.get("/projects/", {"page": 2})
+        self.assertEqual(
+            self.names(last), [f"field {index}" for index in range(20, 25)]
+        )
+        project = last.context["projects"][-1]
+        self.assertEqual((project.heliostat_count, project.receiver_count), (3, 1))
+
+    def test_queries_dont_grow_with_the_projects(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get("/projects/", {"page": 2})
+        with CaptureQueriesContext(connection) as many:
+            self.client.get("/projects/")
+        self.assertEqual(len(few), len(many))
+
+    def test_names_are_unique_per_user(self):
+        response = self.client.post(
+            "/projects/", {"name": "field 3", "description": "Copy"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("name", response.context["form"].errors)
+
+        response = self.client.post(
+            "/projects/", {"name": "foreign", "description": "Mine"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Project.objects.filter(owner=self.user, name="foreign").exists()
+        )
+
+
+class ProjectUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+
+    def test_concurrent_revisions_are_kept(self):
+        clean = UpdateProjectForm.clean
+
+        def clean_after_api_write(form):
+            # An API request changes the project after the form loaded it
+            Project.bump_revision(self.project.pk)
+            return clean(form)
+
+        with patch.object(UpdateProjectForm, "clean", clean_after_api_write):
+            response = self.client.post(
+                "/projects/updateProject/field",
+                {"name": "renamed", "description": "new"},
+            )
+        self.assertEqual(response.status_code, 302)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.revision, 2)
+        self.assertEqual(
+            (self.project.name, self.project.description), ("renamed", "new")
+        )
+
+
+class DuplicationTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        name = f"{self.project.pk}-{'0' * 32}.png"
+        self.project.preview.save(name, ContentFile(b"preview"))
+
+    def test_copy_has_its_own_preview(self):
+        copy = self.project.duplicate("copy")
+        copy.refresh_from_db()
+        self.assertNotEqual(copy.preview.name, self.project.preview.name)
+        self.assertTrue(copy.preview.name.endswith(f"{copy.pk}-{'0' * 32}.png"))
+        self.assertEqual(copy.preview.read(), b"preview")
+
+    def test_deleting_the_copy_keeps_the_preview(self):
+        copy = self.project.duplicate("copy")
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.get(pk=copy.pk).delete()
+        self.assertTrue(os.path.exists(self.project.preview.path))
+
+    def test_missing_preview_file(self):
+        os.remove(self.project.preview.path)
+        copy = self.project.duplicate("copy")
+        copy.refresh_from_db()
+        self.assertFalse(copy.preview)
+
+
+def png(width=800, height=600, color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schedule = patch("project_management.previews.schedule_thumbnails")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+        store_preview(self.project, ContentFile(png(), name="preview.png"))
+        self.name = self.project.preview.name
+
+    def test_thumbnails_are_cropped_webp_images(self):
+        create_thumbnails(default_storage, self.name)
+        for size, dimensions in THUMBNAIL_SIZES.items():
+            with default_storage.open(thumbnail_name(self.name, size)) as file:
+                with Image.open(file) as image:
+                    self.assertEqual((image.format, image.size), ("WEBP", dimensions))
+
+        # Existing thumbnails aren't encoded again
+        with patch("project_management.thumbnails.Image.open") as open_image:
+            create_thumbnails(default_storage, self.name)
+        open_image.assert_not_called()
+
+    def test_preview_is_shown_until_the_thumbnail_exists(self):
+        with patch(
+            "project_management.templatetags.thumbnails.schedule_thumbnails"
+        ) as schedule:
+            self.assertEqual(
+                thumbnail(self.project.preview, "medium"), self.project.preview.url
+            )
+        schedule.assert_called_once_with(default_storage, self.name)
+
+        create_thumbnails(default_storage, self.name)
+        self.assertTrue(
+            thumbnail(self.project.preview, "medium").endswith("-medium.webp")
+        )
+
+    def test_thumbnails_are_deleted_with_the_last_project_showing_them(self):
+        create_thumbnails(default_storage, self.name)
+        copy = Project.objects.create(
+            name="copy", description="", last_edited=timezone.now(), owner=self.user
+        )
+        Project.objects.filter(pk=copy.pk).update(preview=self.name)
+        medium = thumbnail_name(self.name, "medium")
+
+        Project.objects.get(pk=copy.pk).delete()
+        self.assertTrue(default_storage.exists(medium))
+        Project.objects.get(pk=self.project.pk).delete()
+        self.assertFalse(default_storage.exists(medium))
+
+    def test_replaced_previews_lose_their_thumbnails(self):
+        create_thumbnails(default_storage, self.name)
+        store_preview(self.project, ContentFile(png(color="blue"), name="preview.png"))
+        self.assertFalse(default_storage.exists(self.name))
+        self.assertFalse(default_storage.exists(thumbnail_name(self.name, "large")))
+
+
+class LayoutPreviewTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schedule = patch("project_management.previews.schedule_thumbnails")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.project = Project.objects.create(
+            name="field", description="", last_edited=timezone.now(), owner=self.user
+        )
+
+    def preview(self):
+        self.project.refresh_from_db()
+        return self.project.preview.name
+
+    def test_plan_shows_heliostats_and_receivers(self):
+        image = render_layout([[0, 0, -50], [0, 0, 50]], [4, 4], [[20, 0, 0]])
+        self.assertEqual(image.shape, (360, 640, 3))
+        colors = {tuple(color) for color in image.reshape(-1, 3)}
+        self.assertEqual(colors, {BACKGROUND_COLOR, HELIOSTAT_COLOR, RECEIVER_COLOR})
+
+    def test_empty_projects_keep_the_placeholder(self):
+        render_layout_preview(self.project.pk)
+        self.assertEqual(self.preview(), "")
+
+    def test_plan_follows_the_field(self):
+        Heliostat.objects.create(project=self.project, position_x=10)
+        render_layout_preview(self.project.pk)
+        first = self.preview()
+        self.assertTrue(first.endswith(f"{LAYOUT_SUFFIX}.png"))
+
+        Heliostat.objects.create(project=self.project, position_z=30)
+        render_layout_preview(self.project.pk)
+        self.assertNotIn(self.preview(), ["", first])
+        self.assertFalse(default_storage.exists(first))
+
+    def test_previews_of_the_editor_are_kept(self):
+        Heliostat.objects.create(project=self.project)
+        store_preview(self.project, ContentFile(png(), name="preview.png"))
+        uploaded = self.preview()
+        render_layout_preview(self.project.pk)
+        self.assertEqual(self.preview(), uploaded)
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        settings = override_settings(
+            MEDIA_ROOT=str(root / "media"),
+            METRICS_ROOT=str(root / "metrics"),
+            PREVIEW_UPLOAD_INTERVAL=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(setattr, scenario_cache, "directory", scenario_cache.directory)
+        scenario_cache.directory = root / "scenarios"
+        # Previews and thumbnails aren't part of the measured requests
+        schedule = patch.object(BackgroundWorker, "schedule")
+        schedule.start()
+        self.addCleanup(schedule.stop)
+
+        self.user = User.objects.create_user("owner", password="password")
+        self.client.force_login(self.user)
+
+    def test_field_has_the_requested_size(self):
+        project = create_field(self.user, "benchmark", 50)
+        self.assertEqual(project.heliostats.count(), 50)
+        self.assertEqual(project.receivers.count(), 1)
+        positions = np.array(project.heliostats.values_list("position_x", "position_z"))
+        self.assertEqual(len(np.unique(positions, axis=0)), 50)
+
+    def test_all_scenarios_run(self):
+        project = create_field(self.user, "benchmark", 20)
+        results = run_scenarios(self.client, project, repeat=2)
+        self.assertIn(
+            "hdf5_download_cached", [result["scenario"] for result in results]
+        )
+        for result in results:
+            self.assertEqual((result["heliostats"], result["repeat"]), (20, 2))
+            self.assertLessEqual(result["min_ms"], result["median_ms"])
+            self.assertLessEqual(result["median_ms"], result["max_ms"])
+        # The copies made by the scenarios are deleted again
+        self.assertEqual(Project.objects.filter(owner=self.user).count(), 1)
+
+    def test_compare(self):
+        def result(scenario, median_ms, queries):
+            return {
+                "scenario": scenario,
+                "heliostats": 100,
+                "median_ms": median_ms,
+                "queries": queries,
+            }
+
+        baseline = [
+            result("same", 10, 3),
+            result("slower", 10, 3),
+            result("queries", 10, 3),
+        ]
+        results = [
+            result("same", 12, 3),
+            result("slower", 14, 3),
+            result("queries", 5, 4),
+            result("new", 10, 3),
+        ]
+        comparison = compare(results, baseline, tolerance=0.25)
+        self.assertEqual(
+            [(entry["scenario"], entry["regressed"]) for entry in comparison],
+            [("same", False), ("slower", True), ("queries", True)],
+        )
+        self.assertEqual(comparison[1]["change"], 0.4)
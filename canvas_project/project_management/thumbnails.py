@@ -0,0 +1,81 @@
+"""
+Scaled down versions of the project previews, used where the full 640 x 360 preview isn't needed.
+
+The thumbnails are encoded as WebP by a background thread after a preview was uploaded, so the upload doesn't wait for them.
+Their names are derived from the name of the preview, which already identifies its contents.
+"""
+
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from canvas.background import BackgroundWorker
+
+# Width and height of the thumbnails in pixels, the previews are cropped to this aspect ratio
+THUMBNAIL_SIZES = {
+    "medium": (320, 180),
+    # For screens with a high pixel density
+    "large": (640, 360),
+}
+
+THUMBNAIL_QUALITY = 80
+
+
+def thumbnail_name(preview_name, size):
+    """
+    Returns the name of the thumbnail of the given size inside the storage of the previews.
+    """
+    directory, filename = posixpath.split(preview_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "thumbnails", f"{stem}-{size}.webp")
+
+
+def create_thumbnails(storage, preview_name):
+    """
+    Creates the missing thumbnails of a preview.
+
+    Parameters
+    ----------
+    storage : Storage
+        The storage the preview and its thumbnails are stored in.
+    preview_name : str
+        The name of the preview inside the storage.
+    """
+
+    missing = {
+        size: thumbnail_name(preview_name, size)
+        for size in THUMBNAIL_SIZES
+        if not storage.exists(thumbnail_name(preview_name, size))
+    }
+    if not missing:
+        return
+
+    with storage.open(preview_name) as file, Image.open(file) as image:
+        image = image.convert("RGB")
+        for size, name in missing.items():
+            thumbnail = ImageOps.fit(
+                image, THUMBNAIL_SIZES[size], Image.Resampling.LANCZOS
+            )
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, "WEBP", quality=THUMBNAIL_QUALITY)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_thumbnails(storage, preview_name):
+    """
+    Deletes all thumbnails of a preview.
+    """
+    for size in THUMBNAIL_SIZES:
+        storage.delete(thumbnail_name(preview_name, size))
+
+
+def schedule_thumbnails(storage, preview_name):
+    """
+    Creates the missing thumbnails of a preview in the background.
+    """
+    thumbnail_worker.schedule(preview_name, create_thumbnails, storage, preview_name)
+
+
+thumbnail_worker = BackgroundWorker("thumbnails")
@@ -4,6 +4,7 @@ from . import views
 
 urlpatterns = [
     path("", views.projects, name="projects"),
+    path("importProject", views.importProject, name="importProject"),
     path("updateProject/<str:project_name>", views.updateProject, name="updateProject"),
     path("deleteProject/<str:project_name>", views.deleteProject, name="deleteProject"),
     path("favorProject/<str:project_name>", views.favorProject, name="favorProject"),
@@ -0,0 +1,209 @@
+"""
+Validation of whole heliostat fields, finds heliostats colliding with each other, with a tower or leaving the terrain.
+
+Like the layouts, all checks work in the ground plane of the editor, where x points north and z points east.
+"""
+
+import numpy as np
+
+# Half extents of a single facet in meters, taken from the canting vectors of the surface prototype
+FACET_HALF_WIDTH = 0.8025
+FACET_HALF_HEIGHT = 0.6375
+
+# Neighbouring cells that have to be compared with a cell, every pair of cells is visited once
+NEIGHBOUR_OFFSETS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+# Number of pairs of points compared at once
+PAIR_CHUNK_SIZE = 2**20
+
+
+def mirror_half_extents(number_of_facets):
+    """
+    Computes half the width and height of the mirrors of heliostats.
+
+    The facets are assumed to be arranged in a grid that is as square as possible, like the 2x2 facets of the prototype.
+
+    Parameters
+    ----------
+    number_of_facets : np.ndarray
+        The number of facets of every heliostat.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Half the width and half the height in meters for every heliostat.
+    """
+
+    number_of_facets = np.maximum(np.asarray(number_of_facets), 1)
+    columns = np.ceil(np.sqrt(number_of_facets))
+    rows = np.ceil(number_of_facets / columns)
+    return columns * FACET_HALF_WIDTH, rows * FACET_HALF_HEIGHT
+
+
+def mirror_radius(number_of_facets):
+    """
+    Computes the radius of the circle a heliostat mirror sweeps while it rotates.
+
+    Parameters
+    ----------
+    number_of_facets : np.ndarray
+        The number of facets of every heliostat.
+
+    Returns
+    -------
+    np.ndarray
+        The radius in meters for every heliostat.
+    """
+    return np.hypot(*mirror_half_extents(number_of_facets))
+
+
+def colliding_points(x, z, reach, cell_size):
+    """
+    Finds all points that are closer to another point than their combined reach, using a uniform neighbour grid.
+
+    The points are sorted by their cell, so the points of every neighbouring cell are a contiguous range that is found
+    with a binary search. The pairs of a cell and its neighbour are then expanded without any Python loop over the points,
+    in chunks of about PAIR_CHUNK_SIZE pairs, so the memory usage is bounded.
+
+    A cell holding more points than fit into it without a collision, e.g. heliostats stacked on the same spot, has all
+    of its points reported as colliding without comparing them, as that would take quadratic time.
+
+    Parameters
+    ----------
+    x, z : np.ndarray
+        The coordinates of the points.
+    reach : np.ndarray
+        The distance around every point that must be free of other points' reach.
+    cell_size : float
+        The edge length of the grid cells, has to be at least twice the biggest reach.
+
+    Returns
+    -------
+    np.ndarray
+        For every point if it collides with another one.
+    """
+
+    colliding = np.zeros(len(x), dtype=bool)
+    if len(x) == 0:
+        return colliding
+
+    cell_x = np.floor(x / cell_size).astype(np.int64)
+    cell_z = np.floor(z / cell_size).astype(np.int64)
+    # Cell indices as single sortable key, the offset keeps neighbours of negative cells in order
+    shift = cell_z.min(initial=0) - 1
+    width = cell_z.max(initial=0) - shift + 2
+    keys = (cell_x - cell_x.min(initial=0) + 1) * width + (cell_z - shift)
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    indices = np.arange(len(sorted_keys))
+
+    # Points closer than twice the smallest reach collide, so a cell split into squares with that diagonal
+    # holds at most one point per square without a collision
+    square = 2 * reach.min() / np.sqrt(2)
+    capacity = np.ceil(cell_size / square) ** 2 if square > 0 else np.inf
+    _, population = np.unique(sorted_keys, return_counts=True)
+    crowded = np.repeat(population > capacity, population)
+    colliding[order[crowded]] = True
+
+    for offset_x, offset_z in NEIGHBOUR_OFFSETS:
+        neighbour_keys = sorted_keys + offset_x * width + offset_z
+        start = np.searchsorted(sorted_keys, neighbour_keys, side="left")
+        end = np.searchsorted(sorted_keys, neighbour_keys, side="right")
+        if offset_x == 0 and offset_z == 0:
+            # Inside the own cell only the points sorted after the point itself
+            start = indices + 1
+        counts = np.maximum(end - start, 0)
+        # Points of two crowded cells are already reported
+        neighbour_crowded = crowded[np.minimum(start, len(crowded) - 1)]
+        counts[crowded & neighbour_crowded] = 0
+
+        # Points are processed in chunks whose pairs add up to about PAIR_CHUNK_SIZE
+        ends = np.cumsum(counts)
+        boundaries = np.searchsorted(
+            ends, np.arange(PAIR_CHUNK_SIZE, ends[-1], PAIR_CHUNK_SIZE), side="right"
+        )
+        for chunk in np.split(indices, boundaries):
+            chunk_counts = counts[chunk]
+            total = chunk_counts.sum()
+            if total == 0:
+                continue
+            sorted_first = np.repeat(chunk, chunk_counts)
+            # Position of every pair inside the range of its first point
+            local = np.arange(total) - np.repeat(
+                np.cumsum(chunk_counts) - chunk_counts, chunk_counts
+            )
+            first = order[sorted_first]
+            second = order[start[sorted_first] + local]
+            distance = np.hypot(x[first] - x[second], z[first] - z[second])
+            close = distance < reach[first] + reach[second]
+            colliding[first[close]] = True
+            colliding[second[close]] = True
+
+    return colliding
+
+
+def validate_layout(
+    ids,
+    positions,
+    number_of_facets,
+    towers=(),
+    tower_radius=10.0,
+    margin=0.0,
+    bounds=None,
+):
+    """
+    Checks a whole heliostat field at once.
+
+    Parameters
+    ----------
+    ids : np.ndarray
+        The ids of the heliostats.
+    positions : np.ndarray
+        The positions of the heliostats as array of shape (n, 3).
+    number_of_facets : np.ndarray
+        The number of facets of every heliostat, determines the size of its mirror.
+    towers : iterable of tuple of float
+        The x and z coordinates of the towers.
+    tower_radius : float
+        The radius around every tower that must stay free of mirrors.
+    margin : float
+        Additional free space required around every mirror.
+    bounds : dict or None
+        Optional limits of the terrain with the keys min_x, max_x, min_y, max_y, min_z and max_z, all of them optional.
+
+    Returns
+    -------
+    dict
+        The sorted ids of the heliostats violating each check, under the keys spacing, tower and bounds.
+    """
+
+    ids = np.asarray(ids)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    x, z = positions[:, 0], positions[:, 2]
+    reach = mirror_radius(number_of_facets) + margin / 2
+
+    # Mirrors must not overlap the circle swept by any neighbouring mirror
+    cell_size = max(2 * reach.max(initial=0), 1.0)
+    spacing = np.sort(ids[colliding_points(x, z, reach, cell_size)])
+
+    # Mirrors must stay outside of the free area around the towers
+    near_tower = np.zeros(len(ids), dtype=bool)
+    for tower_x, tower_z in towers:
+        near_tower |= np.hypot(x - tower_x, z - tower_z) < tower_radius + reach
+
+    # Heliostats have to stand on the terrain
+    outside = np.zeros(len(ids), dtype=bool)
+    for axis, name in enumerate("xyz"):
+        minimum = (bounds or {}).get(f"min_{name}")
+        maximum = (bounds or {}).get(f"max_{name}")
+        if minimum is not None:
+            outside |= positions[:, axis] < minimum
+        if maximum is not None:
+            outside |= positions[:, axis] > maximum
+
+    return {
+        "spacing": spacing.tolist(),
+        "tower": np.sort(ids[near_tower]).tolist(),
+        "bounds": np.sort(ids[outside]).tolist(),
+    }
@@ -1,36 +1,129 @@
+import re
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.shortcuts import redirect, render
-from .models import Project
-from .forms import ProjectForm, UpdateProjectForm
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Project, Heliostat, Receiver
+from .forms import ProjectForm, UpdateProjectForm, ImportProjectForm
+from .previews import schedule_layout_preview
+from .scenario import read_scenario, InvalidScenarioError
 from datetime import datetime
 from django.contrib.auth.decorators import login_required
 
+# Number of projects shown at once on the overview, the next ones are loaded while scrolling
+PROJECTS_PER_PAGE = 20
+
+# Previews named after the hash of their contents and their thumbnails, see previews.store_preview
+HASHED_PREVIEW = re.compile(
+    r"^(thumbnails/)?\d+-[0-9a-f]{32}(-layout)?(\.png|-\w+\.webp)$"
+)
+
+
+def _count(model):
+    """
+    Returns an expression counting the objects of the model belonging to a project, evaluated in the query of the projects.
+    """
+    counts = (
+        model.objects.filter(project=OuterRef("pk"))
+        .order_by()
+        .values("project")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def _render_overview(request, form, import_form):
+    """
+    Renders the overview with one page of the projects of the user, the last edited ones first.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request the user send to get here, the page is selected by the page parameter.
+    form : ProjectForm
+        The form to create a new project.
+    import_form : ImportProjectForm
+        The form to import a project from a scenario file.
+
+    Returns
+    -------
+    HttpResponse
+        The rendered overview.
+    """
+
+    projects = (
+        Project.objects.filter(owner=request.user)
+        .annotate(heliostat_count=_count(Heliostat), receiver_count=_count(Receiver))
+        .order_by("-last_edited", "-id")
+    )
+    page = Paginator(projects, PROJECTS_PER_PAGE).get_page(request.GET.get("page"))
+    context = {
+        "projects": page,
+        "form": form,
+        "import_form": import_form,
+    }
+    return render(request, "project_management/projects.html", context)
+
 
 # General project handling
 @login_required
 def projects(request):
     form = ProjectForm()
-    if request.method == "GET":
-        allProjects = Project.objects.order_by("-last_edited")
-        context = {"projects": allProjects, "form": form}
-        return render(request, "project_management/projects.html", context)
-    elif request.method == "POST":
+    if request.method == "POST":
         form = ProjectForm(request.POST)
-        allProjects = Project.objects.all()
         if form.is_valid():
-            nameUnique = True
-            for existingProject in allProjects:
-                if form["name"].value() == existingProject.name:
-                    nameUnique = False
-            if nameUnique:
-                form = form.save(commit=False)
-                form.owner = request.user
-                form.last_edited = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                form.save()
+            if Project.objects.filter(
+                owner=request.user, name=form.cleaned_data["name"]
+            ).exists():
+                form.add_error("name", "You already have a project with this name.")
+            else:
+                project = form.save(commit=False)
+                project.owner = request.user
+                project.last_edited = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                project.save()
                 return HttpResponseRedirect(reverse("projects"))
-        context = {"projects": allProjects, "form": form}
-        return render(request, "project_management/projects.html", context)
+    return _render_overview(request, form, ImportProjectForm())
+
+
+# Creating a project from an ARTIST scenario file
+@login_required
+def importProject(request):
+    form = ImportProjectForm()
+    if request.method == "POST":
+        form = ImportProjectForm(request.POST, request.FILES)
+        if form.is_valid():
+            if Project.objects.filter(
+                owner=request.user, name=form.cleaned_data["name"]
+            ).exists():
+                form.add_error("name", "You already have a project with this name.")
+            else:
+                try:
+                    # Either the whole scenario is imported or nothing at all
+                    with transaction.atomic():
+                        project = form.save(commit=False)
+                        project.owner = request.user
+                        project.last_edited = timezone.now()
+                        project.save()
+                        read_scenario(form.cleaned_data["scenario"], project)
+                        # Imported projects have no preview until they are opened in the editor
+                        transaction.on_commit(
+                            lambda: schedule_layout_preview(project.pk)
+                        )
+                    return HttpResponseRedirect(reverse("projects"))
+                except InvalidScenarioError:
+                    form.add_error(
+                        "scenario", "The file is not a valid ARTIST scenario."
+                    )
+    return _render_overview(request, ProjectForm(), form)
 
 
 @login_required
@@ -40,17 +133,17 @@ def updateProject(request, project_name):
         if project.owner == request.user:
             form = UpdateProjectForm(request.POST, instance=project)
             if form.is_valid:
-                allProjects = Project.objects.all()
-                nameUnique = True
-                nameNotChanged = False
-                if project_name == form["name"].value():
-                    nameNotChanged = True
-                for existingProject in allProjects:
-                    if form["name"].value() == existingProject.name:
-                        nameUnique = False
+                nameNotChanged = project_name == form["name"].value()
+                nameUnique = not Project.objects.filter(
+                    owner=request.user, name=form["name"].value()
+                ).exists()
                 if nameUnique or nameNotChanged:
+                    project = form.save(commit=False)
                     project.last_edited = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    form.save()
+                    # The revision loaded with the project may be outdated, only the edited fields are written
+                    project.save(update_fields=[*form.Meta.fields, "last_edited"])
+                    # The name is part of the project's content
+                    Project.bump_revision(project.pk)
                     return HttpResponseRedirect(reverse("projects"))
                 return redirect("projects")
     return render(
@@ -94,34 +187,31 @@ def defavorProject(request, project_name):
 def duplicateProject(request, project_name):
     project = Project.objects.get(owner=request.user, name=project_name)
     if project.owner == request.user:
-        fks_to_copy = (
-            list(project.heliostats.all())
-            + list(project.receivers.all())
-            + list(project.lightsources.all())
-        )
-        settings = project.settings
-        project.pk = None
-
-        # Finding a new project name unique to user
-        newNameFound = False
-        while not newNameFound:
-            try:
-                Project.objects.get(name=project_name)
-                project_name = project_name + "copy"
-            except Project.DoesNotExist:
-                project.name = project_name
-                project.save()
-                newNameFound = True
-
-        # Copy all objects associated to the project via foreign keys
-        for assoc_object in fks_to_copy:
-            assoc_object.pk = None
-            assoc_object.project = project
-            assoc_object.save()
+        copy = project.duplicate(Project.free_name(request.user, project_name + "copy"))
+        if not copy.preview:
+            schedule_layout_preview(copy.pk)
+        return redirect("projects")
 
-        # Copy settings
-        settings.pk = None
-        settings.project = project
-        settings.save()
 
-        return redirect("projects")
+# Serving project previews during development
+def preview(request, path):
+    """
+    Serves a preview image from the media directory, previews named after their contents are cached forever.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The request the user send to get here.
+    path : str
+        The path of the preview inside the preview directory.
+
+    Returns
+    -------
+    HttpResponse
+        The image.
+    """
+
+    response = serve(request, "project_previews/" + path, settings.MEDIA_ROOT)
+    if HASHED_PREVIEW.match(path):
+        patch_cache_control(response, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
@@ -12,7 +12,7 @@ import { OverviewHandler } from "overview";
 import { Picker } from "picker";
 import { ProjectSettingsManager } from "projectSettingsManager";
 //import { QuickSelector } from "quickSelector";
-//import { JobInterface } from "jobInterface";
+import { JobInterface } from "jobInterface";
 import { Inspector } from "inspectorClass";
 
 import { Heliostat, Receiver, LightSource, Terrain } from "objects";
@@ -76,7 +76,7 @@ export class Editor {
         this.#overview = new OverviewHandler(this.#picker);
         this.#projectSettingManager = new ProjectSettingsManager();
         //this.#quickSelector = new QuickSelector();
-        //this.#jobInterface = new JobInterface();
+        this.#jobInterface = new JobInterface(this.#projectId);
         this.#inspector = new Inspector(this.#picker);
         this.#previewHandler = new PreviewHandler(this.#scene);
 
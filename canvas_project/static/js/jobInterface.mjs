@@ -0,0 +1,188 @@
+import { SaveAndLoadHandler } from "saveAndLoadHandler";
+
+/**
+ * Shows the jobs of the project in the job interface modal and lets the user start and cancel them
+ */
+export class JobInterface {
+    #saveAndLoadHandler;
+    #modal;
+    #jobList;
+    #jobType;
+    #projectId;
+    #jobs = [];
+    #previews = new Map();
+    #events;
+
+    /**
+     * Creates the job interface for the modal with the id jobInterface
+     * @param {Number} projectId the id of the project whose jobs are shown
+     */
+    constructor(projectId) {
+        this.#saveAndLoadHandler = new SaveAndLoadHandler();
+        this.#projectId = Number(projectId);
+        this.#modal = document.getElementById("jobInterface");
+        this.#jobList = document.getElementById("jobList");
+        this.#jobType = document.getElementById("jobType");
+
+        this.#modal.addEventListener("shown.bs.modal", () => this.#refresh());
+        document
+            .getElementById("startJob")
+            .addEventListener("click", () => this.#startJob());
+
+        // the server pushes every change of the jobs, so nothing has to be polled
+        this.#events = new EventSource(
+            window.location.origin + "/jobs/events/"
+        );
+        this.#events.addEventListener("job", (event) => this.#update(event));
+        this.#events.addEventListener("done", (event) => this.#update(event));
+        this.#events.addEventListener("preview", (event) => {
+            const preview = JSON.parse(event.data);
+            this.#previews.set(preview.id, preview);
+            this.#render();
+        });
+    }
+
+    /**
+     * Submits a job of the selected type and shows it in the list
+     */
+    async #startJob() {
+        await this.#saveAndLoadHandler.submitJob(this.#jobType.value);
+        this.#refresh();
+    }
+
+    /**
+     * Loads the jobs of the project and renders them
+     */
+    async #refresh() {
+        const jobs = await this.#saveAndLoadHandler.getJobs();
+        if (!jobs) {
+            return;
+        }
+        this.#jobs = jobs;
+        this.#render();
+    }
+
+    /**
+     * Applies a pushed change of a job to the list
+     * @param {MessageEvent} event the job or done event sent by the server
+     */
+    #update(event) {
+        const change = JSON.parse(event.data);
+        if (change.project_id !== this.#projectId) {
+            return;
+        }
+        const job = this.#jobs.find((job) => job.id === change.id);
+        if (!job) {
+            // jobs started in another tab are loaded with all their fields
+            this.#refresh();
+            return;
+        }
+        Object.assign(job, change);
+        if (event.type === "done") {
+            this.#previews.delete(job.id);
+        }
+        this.#render();
+    }
+
+    /**
+     * Renders the jobs as a table
+     */
+    #render() {
+        const jobs = this.#jobs;
+        this.#jobList.innerHTML = "";
+        if (jobs.length === 0) {
+            this.#jobList.textContent = "You havn't startet any jobs.";
+            return;
+        }
+
+        const table = document.createElement("table");
+        table.classList.add("table", "align-middle", "mb-0");
+        const header = table.createTHead().insertRow();
+        ["Type", "Status", "Progress", "Preview", "Started", ""].forEach(
+            (title) => {
+                const cell = document.createElement("th");
+                cell.textContent = title;
+                header.appendChild(cell);
+            }
+        );
+
+        const body = table.createTBody();
+        jobs.forEach((job) => {
+            const row = body.insertRow();
+            row.insertCell().textContent = job.job_type;
+
+            const status = row.insertCell();
+            status.textContent = job.status;
+            if (job.message) {
+                status.title = job.message;
+            }
+
+            const progress = document.createElement("div");
+            progress.classList.add("progress");
+            const bar = document.createElement("div");
+            bar.classList.add("progress-bar");
+            bar.style.width = Math.round(job.progress * 100) + "%";
+            progress.appendChild(bar);
+            row.insertCell().appendChild(progress);
+
+            const preview = row.insertCell();
+            if (this.#previews.has(job.id)) {
+                preview.appendChild(
+                    this.#drawPreview(this.#previews.get(job.id))
+                );
+            }
+
+            row.insertCell().textContent = job.started
+                ? new Date(job.started).toLocaleString()
+                : "-";
+
+            const actions = row.insertCell();
+            if (["queued", "running"].includes(job.status)) {
+                const cancel = document.createElement("button");
+                cancel.classList.add("btn", "btn-sm", "btn-outline-danger");
+                cancel.textContent = "Cancel";
+                cancel.addEventListener("click", () =>
+                    this.#saveAndLoadHandler.cancelJob(job.id)
+                );
+                actions.appendChild(cancel);
+            } else if (job.status === "finished" && job.result) {
+                const download = document.createElement("a");
+                download.classList.add("btn", "btn-sm", "btn-outline-primary");
+                download.textContent = "Download";
+                download.href =
+                    window.location.origin + `/api/jobs/${job.id}/result/`;
+                actions.appendChild(download);
+            }
+        });
+
+        this.#jobList.appendChild(table);
+    }
+
+    /**
+     * Draws an intermediate result of a job, values from 0 to 255 are shown from black to yellow
+     * @param {JSON} preview the preview sent by the server
+     * @returns {HTMLCanvasElement} the canvas showing the preview
+     */
+    #drawPreview(preview) {
+        const canvas = document.createElement("canvas");
+        canvas.width = preview.width;
+        canvas.height = preview.height;
+        canvas.style.width = "64px";
+        canvas.style.imageRendering = "pixelated";
+
+        const context = canvas.getContext("2d");
+        const image = context.createImageData(preview.width, preview.height);
+        // the first row of the preview is the lower edge of the receiver
+        preview.values.forEach((value, index) => {
+            const row = preview.height - 1 - Math.floor(index / preview.width);
+            const pixel = (row * preview.width + (index % preview.width)) * 4;
+            image.data[pixel] = value;
+            image.data[pixel + 1] = value * 0.8;
+            image.data[pixel + 2] = 0;
+            image.data[pixel + 3] = 255;
+        });
+        context.putImageData(image, 0, 0);
+        canvas.title = `Maximum: ${Math.round(preview.maximum)} W/m²`;
+        return canvas;
+    }
+}
@@ -6,6 +6,7 @@ import * as THREE from "three";
 export class PreviewHandler {
     #renderer;
     #camera;
+    #lastHash = null;
     /**
      * @type {THREE.Scene}
      */
@@ -56,6 +57,12 @@ export class PreviewHandler {
             });
         });
 
+        // the server ignores unchanged previews as well, but they don't have to be sent at all
+        const hash = await this.#hash(preview);
+        if (hash !== null && hash === this.#lastHash) {
+            return;
+        }
+
         const formData = new FormData();
         formData.append("preview", preview, "preview.png");
 
@@ -65,9 +72,34 @@ export class PreviewHandler {
             headers: {
                 "X-CSRFToken": this.#getCookie("csrftoken"),
             },
-        }).catch((error) => {
-            console.error("Error uploading file:", error);
-        });
+        })
+            .then((response) => {
+                // previews rejected because of too frequent uploads are sent again next time
+                if (response.ok) {
+                    this.#lastHash = hash;
+                }
+            })
+            .catch((error) => {
+                console.error("Error uploading file:", error);
+            });
+    }
+
+    /**
+     * Computes the SHA-256 hash of the preview
+     * @param {Blob} preview the rendered preview
+     * @returns {Promise<String|null>} the hash as hex string, null if the browser can't compute it outside of secure contexts
+     */
+    async #hash(preview) {
+        if (!window.crypto?.subtle) {
+            return null;
+        }
+        const digest = await window.crypto.subtle.digest(
+            "SHA-256",
+            await preview.arrayBuffer()
+        );
+        return Array.from(new Uint8Array(digest), (byte) =>
+            byte.toString(16).padStart(2, "0")
+        ).join("");
     }
 
     /**
@@ -1,13 +1,12 @@
 export class ProjectOverviewManager {
+    #favoriteSwitch;
+
     constructor() {
         // handle all favorite buttons
-        document.querySelectorAll(".favoriteButton").forEach((button) => {
-            button.addEventListener("click", () => {
-                this.#toggleFavorite(button);
-            });
-        });
+        this.#handleFavoriteButtons(document);
 
         this.#handleFavoriteFilter();
+        this.#handleNextPage();
         // handle duplication
 
         // handle deletion
@@ -15,6 +14,72 @@ export class ProjectOverviewManager {
         // handle editing
     }
 
+    /**
+     * Adds the click handlers to the favorite buttons of the given projects
+     * @param {ParentNode} parent the element or document containing the projects
+     */
+    #handleFavoriteButtons(parent) {
+        parent.querySelectorAll(".favoriteButton").forEach((button) => {
+            button.addEventListener("click", () => {
+                this.#toggleFavorite(button);
+            });
+        });
+    }
+
+    /**
+     * Loads the next page of projects as soon as the link to it becomes visible
+     */
+    #handleNextPage() {
+        const observer = new IntersectionObserver(async (entries) => {
+            if (!entries.some((entry) => entry.isIntersecting)) {
+                return;
+            }
+            const link = entries[0].target;
+            observer.unobserve(link);
+
+            const response = await fetch(link.href);
+            const page = new DOMParser().parseFromString(
+                await response.text(),
+                "text/html"
+            );
+            const projects = page.querySelectorAll("#projectList .project");
+            const nextLink = page.getElementById("nextProjects");
+            projects.forEach((project) => {
+                this.#handleFavoriteButtons(project);
+                this.#filterFavorite(project);
+                link.before(project);
+            });
+            if (nextLink) {
+                link.replaceWith(nextLink);
+                observer.observe(nextLink);
+            } else {
+                link.remove();
+            }
+        });
+
+        const link = document.getElementById("nextProjects");
+        if (link) {
+            observer.observe(link);
+        }
+    }
+
+    /**
+     * Shows or hides the project depending on the state of the favorite filter
+     * @param {HTMLElement} project the element of the project
+     */
+    #filterFavorite(project) {
+        if (
+            this.#favoriteSwitch.checked &&
+            project.dataset.isFavorite != "true"
+        ) {
+            project.classList.add("d-none");
+            project.classList.remove("d-block");
+        } else {
+            project.classList.add("d-block");
+            project.classList.remove("d-none");
+        }
+    }
+
     /**
      * Toggles the favorite setting for the given button
      * @param {HTMLElement} favoriteButton
@@ -79,21 +144,10 @@ export class ProjectOverviewManager {
                 document.getElementById("projectList").children[0]
             );
 
+        this.#favoriteSwitch = favoriteSwitch;
         favoriteSwitch.addEventListener("change", () => {
-            console.log("test");
             document.querySelectorAll(".project").forEach((project) => {
-                if (favoriteSwitch.checked) {
-                    if (project.dataset.isFavorite == "true") {
-                        project.classList.add("d-block");
-                        project.classList.remove("d-none");
-                    } else {
-                        project.classList.add("d-none");
-                        project.classList.remove("d-block");
-                    }
-                } else {
-                    project.classList.add("d-block");
-                    project.classList.remove("d-none");
-                }
+                this.#filterFavorite(project);
             });
         });
     }
@@ -36,17 +36,74 @@ export class SaveAndLoadHandler {
      * @returns {Promise<JSON>} A JSON representation of the project
      */
     async getProjectData() {
-        const url = this.#baseAPIUrl + "projects/" + this.#projectID;
-        return fetch(url)
+        const url = this.#baseAPIUrl + "projects/" + this.#projectID + "/";
+        // revalidate the cached project with its ETag instead of downloading it again
+        return fetch(url, {
+            cache: "no-cache",
+            headers: {
+                Accept: "application/vnd.canvas.project",
+            },
+        })
             .then((response) => {
                 if (!response.ok) {
                     throw new Error(`Response status: ${response.status}`);
                 }
-                return response.json();
+                return response.arrayBuffer();
             })
+            .then((buffer) => this.#decodeProject(buffer))
             .catch((error) => console.log(error.message));
     }
 
+    /**
+     * Decodes the binary project representation into the same structure as the JSON representation
+     * @param {ArrayBuffer} buffer the binary project representation
+     * @returns {JSON} A JSON representation of the project
+     */
+    #decodeProject(buffer) {
+        // the header length is followed by the JSON header and the heliostat columns
+        const headerLength = new DataView(buffer).getUint32(0, true);
+        const header = JSON.parse(
+            new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength))
+        );
+        const dataOffset = Math.ceil((4 + headerLength) / 4) * 4;
+
+        const columns = {};
+        header.heliostats.columns.forEach((column) => {
+            const ArrayType =
+                column.dtype === "float32" ? Float32Array : Int32Array;
+            columns[column.name] = new ArrayType(
+                buffer,
+                dataOffset + column.offset,
+                column.length
+            );
+        });
+
+        const strings = header.heliostats.strings;
+        const heliostats = new Array(header.heliostats.count);
+        for (let i = 0; i < heliostats.length; i++) {
+            heliostats[i] = {
+                id: columns.id[i],
+                name: strings[columns.name[i]],
+                position_x: columns.position[3 * i],
+                position_y: columns.position[3 * i + 1],
+                position_z: columns.position[3 * i + 2],
+                aimpoint_x: columns.aimpoint[3 * i],
+                aimpoint_y: columns.aimpoint[3 * i + 1],
+                aimpoint_z: columns.aimpoint[3 * i + 2],
+                number_of_facets: columns.number_of_facets[i],
+                kinematic_type: strings[columns.kinematic_type[i]],
+            };
+        }
+
+        return {
+            name: header.name,
+            heliostats: heliostats,
+            receivers: header.receivers,
+            lightsources: header.lightsources,
+            settings: header.settings,
+        };
+    }
+
     /**
      * Creates a databank entry for the given heliostat
      * @param {Heliostat} heliostat Is the heliostat you want an entry for
@@ -444,6 +501,79 @@ export class SaveAndLoadHandler {
             .catch((error) => console.log(error.message));
     }
 
+    // Jobs
+    /**
+     * Returns all jobs of the project, the newest first
+     * @returns {Promise<JSON>} A list of the jobs
+     */
+    async getJobs() {
+        const url = this.#baseAPIUrl + "jobs/?project=" + this.#projectID;
+
+        return fetch(url, { cache: "no-cache" })
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`Response status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .catch((error) => console.log(error.message));
+    }
+
+    /**
+     * Submits a new job working on the current state of the project
+     * @param {String} jobType the type of the job
+     * @param {Object} [parameters={}] the parameters of the job
+     * @returns {Promise<JSON>} JSON representation of the queued job
+     */
+    async submitJob(jobType, parameters = {}) {
+        const url = this.#baseAPIUrl + "jobs/";
+
+        const body = {
+            project: this.#projectID,
+            job_type: jobType,
+            parameters: parameters,
+        };
+
+        return fetch(url, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "X-CSRFToken": this.#getCookie("csrftoken"),
+            },
+            body: JSON.stringify(body),
+        })
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`Response status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .catch((error) => console.log(error.message));
+    }
+
+    /**
+     * Cancels the given job if it didn't finish yet
+     * @param {Number} jobId the id of the job
+     * @returns {Promise<JSON>} JSON representation of the cancelled job
+     */
+    async cancelJob(jobId) {
+        const url = this.#baseAPIUrl + "jobs/" + jobId + "/cancel/";
+
+        return fetch(url, {
+            method: "POST",
+            headers: {
+                "X-CSRFToken": this.#getCookie("csrftoken"),
+            },
+        })
+            .then((response) => {
+                if (!response.ok) {
+                    throw new Error(`Response status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .catch((error) => console.log(error.message));
+    }
+
     /**
      * Gets the cookie specified by the name
      * @param {String} name The name of the cookie you want to get.